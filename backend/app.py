@@ -3,16 +3,35 @@ RehabSense Backend Server
 Flask application serving the rehabilitation monitoring portal
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, g, Response, send_from_directory
+import gzip
+import hmac
 import json
 import os
+import re
+import signal
 import sys
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from datetime import date as Date, datetime
+from urllib.parse import urlencode
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from utils.inference import get_inference_engine
+from utils.inference import get_inference_engine, reload_inference_engine, set_inference_engine, ModelWatcher, MODEL_LABELS
+from utils.inference_service import InferenceClient, RemoteInference
+from utils.metrics import registry as metrics, time_stage
+from utils.profiling import RequestProfiler
+from utils.triage import TriageIndex
+from utils.deterioration import DeteriorationMonitor
+from utils.page_cache import PageCache
+from utils.columnar import PatientColumns
+from utils.admission import AdmissionController, AdmissionRejected
+from utils.single_flight import SingleFlight
+from utils.traffic_capture import TrafficCapture
+from utils.similarity import SimilarityIndex
 from recommendations.engine import get_all_recommendations, get_summary_message
 
 # Resolve absolute project paths for resources
@@ -20,7 +39,21 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 TEMPLATES_DIR = os.path.join(PROJECT_ROOT, 'frontend', 'templates')
 STATIC_DIR = os.path.join(PROJECT_ROOT, 'frontend', 'static')
 MODELS_DIR = os.path.join(PROJECT_ROOT, 'models')
-DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+DATA_DIR = os.environ.get('REHABSENSE_DATA_DIR') or os.path.join(PROJECT_ROOT, 'data')
+PROFILES_DIR = os.path.join(PROJECT_ROOT, 'profiles')
+
+# Score through a separate inference service instead of in-process models
+INFERENCE_SOCKET = os.environ.get('REHABSENSE_INFERENCE_SOCKET') or None
+
+# Load-test deployments let any generated patient log in; point them at
+# their own REHABSENSE_DATA_DIR so the fleet stays out of production triage
+LOAD_TEST = os.environ.get('REHABSENSE_LOAD_TEST') == '1'
+
+# Patient ids map to data/patients/patient_<id>.json, so keep them path-safe
+PATIENT_ID_PATTERN = re.compile(r'[A-Z0-9_]{1,32}' if LOAD_TEST else r'[AB]')
+
+# Admin routes are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get('REHABSENSE_ADMIN_TOKEN') or None
 
 app = Flask(__name__, 
             template_folder=TEMPLATES_DIR,
@@ -29,26 +62,429 @@ app.secret_key = 'rehabsense_secret_key_2026'
 
 # Initialize inference engine with absolute models path
 try:
-    inference_engine = get_inference_engine(MODELS_DIR)
-    print("✅ Inference engine loaded successfully")
+    if INFERENCE_SOCKET:
+        set_inference_engine(RemoteInference(InferenceClient(INFERENCE_SOCKET)))
+        print(f"✅ Connected to inference service at {INFERENCE_SOCKET}")
+    else:
+        get_inference_engine(MODELS_DIR)
+        print("✅ Inference engine loaded successfully")
 except Exception as e:
     print(f"❌ Error loading models: {e}")
     print("Please run training/train_all.py first")
     sys.exit(1)
 
+def reload_models():
+    """Swap in freshly trained models without restarting"""
+    engine, swapped = reload_inference_engine(MODELS_DIR)
+    if swapped:
+        print(f"🔄 Models reloaded, version {engine.version}")
+    return engine, swapped
+
+# Parent pid when running under backend/serve.py, whose arbiter reloads every worker
+arbiter_pid = None
+
+# Optional background watcher for new artifacts in models/
+model_watcher = None
+if os.environ.get('REHABSENSE_MODEL_WATCH') == '1':
+    model_watcher = ModelWatcher(
+        MODELS_DIR,
+        interval=float(os.environ.get('REHABSENSE_MODEL_WATCH_INTERVAL', '5')),
+        on_change=reload_models
+    )
+
+metrics.register_gauge(
+    'rehabsense_model_info',
+    lambda: {(('version', get_inference_engine().version),): 1},
+    'Version of the models serving requests'
+)
+
+metrics.register_gauge(
+    'rehabsense_drift_psi',
+    lambda: get_inference_engine().drift.psi_gauges(),
+    'Population stability index of live inputs against the training data'
+)
+
+profiler = RequestProfiler.from_env(PROFILES_DIR)
+
+# Opt-in sampled request capture for utils/replay.py
+traffic_capture = TrafficCapture.from_env()
+
+# Query arguments that identify a patient or carry a secret are never captured
+CAPTURE_DROPPED_ARGS = ('patient_id', 'profile', 'token')
+
+# Concurrency limits and load shedding for the inference-heavy routes
+admission = AdmissionController.from_env(os.environ)
+
+# Highest-risk patients, seeded from data/patients/ on a background thread
+triage_index = TriageIndex(capacity=int(os.environ.get('REHABSENSE_TRIAGE_CAPACITY', '100')))
+_triage_seed_lock = threading.Lock()
+_triage_seed_pid = None
+_triage_seeded = False
+
+# Per-patient change-point state for deterioration alerts
+deterioration_monitor = DeteriorationMonitor()
+
+# Early-trajectory embeddings for finding similar past patients
+similarity_index = SimilarityIndex(horizon_weeks=int(os.environ.get('REHABSENSE_SIMILARITY_WEEKS', '4')))
+
+# Rendered report pages; reports never change once written
+report_page_cache = PageCache(
+    'report_page',
+    max_bytes=int(os.environ.get('REHABSENSE_PAGE_CACHE_BYTES', 32 * 1024 * 1024)),
+    persist_dir=os.environ.get('REHABSENSE_PAGE_CACHE_DIR') or None
+)
+
+# Gzipped /api/patient/history bodies per patient file and model version
+history_cache = PageCache(
+    'history',
+    max_bytes=int(os.environ.get('REHABSENSE_HISTORY_CACHE_BYTES', 16 * 1024 * 1024))
+)
+
+# Columnar patient histories, rebuilt when the patient file changes
+PATIENT_COLUMNS_CACHE_SIZE = int(os.environ.get('REHABSENSE_PATIENT_CACHE_SIZE', '1024'))
+_patient_columns = OrderedDict()
+_patient_columns_lock = threading.Lock()
+
+# Concurrent requests for the same patient or report share one computation
+patient_columns_flight = SingleFlight('patient_columns')
+history_flight = SingleFlight('history')
+report_page_flight = SingleFlight('report_page')
+
 
 def load_patient_data(patient_id):
     """Load patient data from JSON file"""
     filepath = os.path.join(DATA_DIR, 'patients', f'patient_{patient_id}.json')
-    if os.path.exists(filepath):
-        with open(filepath, 'r') as f:
-            return json.load(f)
+    with time_stage('patient_load'):
+        if os.path.exists(filepath):
+            with open(filepath, 'r') as f:
+                return json.load(f)
     return None
 
+def patient_file_mtime(patient_id):
+    """Modification time of the patient's file, or None if it is missing"""
+    filepath = os.path.join(DATA_DIR, 'patients', f'patient_{patient_id}.json')
+    try:
+        return os.stat(filepath).st_mtime_ns
+    except OSError:
+        return None
+
+def load_patient_columns(patient_id):
+    """Load a patient as PatientColumns, built once per version of the file"""
+    mtime = patient_file_mtime(patient_id)
+    if mtime is None:
+        return None
+    
+    with _patient_columns_lock:
+        cached = _patient_columns.get(patient_id)
+        if cached is not None and cached[0] == mtime:
+            _patient_columns.move_to_end(patient_id)
+            metrics.record_cache('patient_columns', True)
+            return cached[1]
+    metrics.record_cache('patient_columns', False)
+    
+    def build():
+        patient_data = load_patient_data(patient_id)
+        if not patient_data:
+            return None
+        columns = PatientColumns.from_json(patient_data)
+        
+        with _patient_columns_lock:
+            _patient_columns[patient_id] = (mtime, columns)
+            _patient_columns.move_to_end(patient_id)
+            while len(_patient_columns) > PATIENT_COLUMNS_CACHE_SIZE:
+                _patient_columns.popitem(last=False)
+        return columns
+    
+    return patient_columns_flight.do((patient_id, mtime), build)
+
+def observe_report(patient_id, report_id, date, predictions):
+    """Feed a freshly scored report to the triage queue and deterioration monitor"""
+    triage_index.observe(patient_id, report_id, date, predictions)
+    deterioration_monitor.update(patient_id, report_id, date, predictions)
+    similarity_index.observe(patient_id, report_id, date, predictions)
+
+def device_report_key(patient_id, report_data):
+    """(report_id, ISO date) of an uploaded dated report, raising ValueError if either is bogus
+
+    Device reports feed the triage, deterioration and similarity indexes
+    like persisted ones, so the id must be this patient's and the date a
+    real, non-future day.
+    """
+    report_id = report_data['report_id']
+    if not isinstance(report_id, str) or not re.fullmatch(re.escape(patient_id) + r'_R\d{1,6}', report_id):
+        raise ValueError(f"Invalid report_id for patient {patient_id}")
+    try:
+        day = Date.fromisoformat(report_data['date'])
+    except (TypeError, ValueError):
+        raise ValueError("Invalid report date; use YYYY-MM-DD") from None
+    if day > Date.today():
+        raise ValueError("Report date is in the future")
+    return report_id, day.isoformat()
+
+def ensure_triage_seeding():
+    """Start scoring every patient into the indexes on a background thread in this process
+
+    Called once each serving process is up (after fork, for pre-forked
+    workers), and again by get_triage_index as a fallback.
+    """
+    global _triage_seed_pid
+    if _triage_seed_pid == os.getpid():
+        return
+    with _triage_seed_lock:
+        if _triage_seed_pid == os.getpid():
+            return
+        _triage_seed_pid = os.getpid()
+        threading.Thread(target=_seed_triage_index, daemon=True, name='triage-seed').start()
+
+def _seed_triage_index():
+    global _triage_seeded, _triage_seed_pid
+    start = time.perf_counter()
+    try:
+        triage_index.build(os.path.join(DATA_DIR, 'patients'), get_inference_engine(),
+                           observe=observe_report)
+    except Exception as e:
+        print(f"❌ Triage seeding failed: {e}")
+        # The next get_triage_index call tries again
+        _triage_seed_pid = None
+        return
+    _triage_seeded = True
+    print(f"✅ Triage index seeded in {time.perf_counter() - start:.1f}s")
+
+def get_triage_index():
+    """Return the triage index, or None while it is still being seeded"""
+    if not _triage_seeded:
+        ensure_triage_seeding()
+        return None
+    return triage_index
+
+def warming_response():
+    """503 for routes that need the seeded indexes before they can answer"""
+    response = json_response({'success': False, 'warming': True,
+                              'message': 'Patient index is still warming up, retry shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+def template_mtime(*names):
+    """Latest modification time of the given templates"""
+    return max(os.stat(os.path.join(TEMPLATES_DIR, name)).st_mtime_ns for name in names)
+
+def render_page(template, **context):
+    """Render a template, timed as its own stage"""
+    with time_stage('render_template'):
+        return render_template(template, **context)
+
+def json_response(payload):
+    """Serialize a JSON response, timed as its own stage"""
+    with time_stage('json_serialize'):
+        return jsonify(payload)
+
+def gzip_response(body):
+    """JSON response from gzipped bytes, decompressed for clients that can't accept it"""
+    if request.accept_encodings['gzip']:
+        response = Response(body, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(gzip.decompress(body), mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    return response
+
+def is_admin_request():
+    """Check the admin token sent in the X-Admin-Token header or ?token="""
+    token = request.headers.get('X-Admin-Token') or request.args.get('token') or ''
+    return ADMIN_TOKEN is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started"""
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def admit_request():
+    """Queue or shed requests to controlled routes beyond their concurrency limit"""
+    if admission is None or request.url_rule is None:
+        return
+    route = request.url_rule.rule
+    if not admission.controls(route):
+        return
+    try:
+        g.admission = (route, admission.acquire(route))
+    except AdmissionRejected as e:
+        response = json_response({'success': False, 'message': 'Server busy, retry later'})
+        response.status_code = e.status
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
+@app.teardown_request
+def release_admission(error=None):
+    """Free the admission slot however the request ended"""
+    admitted = g.pop('admission', None)
+    if admitted is not None:
+        admission.release(*admitted)
+
+@app.before_request
+def pin_inference_engine():
+    """Pin the current engine so a reload mid-request cannot mix versions"""
+    if model_watcher is not None:
+        model_watcher.ensure_started()
+    g.engine = get_inference_engine()
+
+@app.after_request
+def add_model_version(response):
+    """Tell clients and caches which model version produced the response"""
+    engine = g.get('engine')
+    if engine is not None:
+        response.headers['X-Model-Version'] = engine.version
+    return response
+
+@app.before_request
+def start_profiling():
+    """Start a profile capture for flagged or sampled whitelisted requests"""
+    if request.url_rule is None:
+        return
+    memory_flag = request.headers.get('X-Profile-Memory') or request.args.get('profile_memory')
+    g.profile = profiler.maybe_start(
+        request.url_rule.rule,
+        flag=request.headers.get('X-Profile') or request.args.get('profile'),
+        mode=request.headers.get('X-Profile-Mode') or request.args.get('profile_mode'),
+        trace_memory=None if memory_flag is None else memory_flag == '1'
+    )
+
+@app.after_request
+def finish_profiling(response):
+    """Write the capture for a profiled request"""
+    session_profile = g.pop('profile', None)
+    if session_profile is not None:
+        capture = session_profile.stop(request.url_rule.rule, request.path, response.status_code)
+        response.headers['X-Profile-Id'] = capture['id']
+    return response
+
+@app.teardown_request
+def abort_profiling(error=None):
+    """Still write the capture when the handler raised"""
+    session_profile = g.pop('profile', None)
+    if session_profile is not None:
+        session_profile.stop(request.url_rule.rule, request.path, 500)
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request count and latency per route"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.inc('rehabsense_http_requests_total',
+                    (('route', route), ('method', request.method),
+                     ('status', str(response.status_code))))
+        metrics.observe('rehabsense_http_request_duration_seconds',
+                        time.perf_counter() - start, (('route', route),))
+    return response
+
+@app.after_request
+def capture_traffic(response):
+    """Record sampled patients' requests, pseudonymized, for offline replay"""
+    if traffic_capture is None or request.url_rule is None:
+        return response
+    route = request.url_rule.rule
+    patient_id = session.get('patient_id')
+    if (patient_id is None or route.startswith(('/admin', '/metrics', '/static'))
+            or not traffic_capture.sampled(patient_id)):
+        return response
+    
+    path = request.path
+    if 'report_id' in (request.view_args or {}):
+        path = f"/report/{traffic_capture.pseudonymize_report_id(patient_id, request.view_args['report_id'])}"
+    args = [(name, value) for name, value in request.args.items(multi=True)
+            if name not in CAPTURE_DROPPED_ARGS]
+    if args:
+        path = f"{path}?{urlencode(args)}"
+    
+    payload = predictions = None
+    if route == '/api/predict':
+        payload = (request.get_json(silent=True) or {}).get('report_data')
+        served = (response.get_json(silent=True) or {}).get('predictions') or {}
+        predictions = {
+            name: {'prediction': result.get('prediction'), 'confidence': result.get('confidence')}
+            for name, result in served.items()
+        }
+    
+    # Runs before record_request_metrics, which pops the start time
+    start = g.get('request_start')
+    engine = g.get('engine')
+    traffic_capture.record(
+        patient_id, request.method, route, path, response.status_code,
+        time.perf_counter() - start if start is not None else 0.0,
+        engine.version if engine is not None else None,
+        payload, predictions
+    )
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text-format metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/models')
+def get_models():
+    """Serving model version and the build manifest behind it"""
+    if not is_admin_request():
+        return json_response({'success': False, 'message': 'Forbidden'}), 403
+    return json_response({
+        'success': True,
+        'version': g.engine.version,
+        'provenance': getattr(g.engine, 'provenance', None)
+    })
+
+@app.route('/admin/models/reload', methods=['POST'])
+def admin_reload_models():
+    """Load, validate and swap in the artifacts currently in models/"""
+    if not is_admin_request():
+        return json_response({'success': False, 'message': 'Forbidden'}), 403
+    previous = get_inference_engine().version
+    
+    # A pre-forked worker reloading itself would leave its siblings on the old version
+    if arbiter_pid is not None and arbiter_pid != os.getpid():
+        os.kill(arbiter_pid, signal.SIGHUP)
+        return json_response({
+            'success': True,
+            'rolling': True,
+            'previous_version': previous,
+            'message': 'Every worker is being reloaded; watch X-Model-Version for the new version'
+        }), 202
+    
+    try:
+        engine, swapped = reload_models()
+    except Exception as e:
+        return json_response({'success': False, 'message': f'Reload failed: {e}',
+                              'version': previous}), 500
+    return json_response({
+        'success': True,
+        'swapped': swapped,
+        'previous_version': previous,
+        'version': engine.version
+    })
+
+@app.route('/admin/profiles')
+def list_profiles():
+    """List recent profile captures"""
+    if not is_admin_request():
+        return json_response({'success': False, 'message': 'Forbidden'}), 403
+    limit = request.args.get('limit', 50, type=int)
+    return json_response({
+        'success': True,
+        'captures': profiler.list_captures(limit)
+    })
+
+@app.route('/admin/profiles/<filename>')
+def download_profile(filename):
+    """Download a single capture file"""
+    if not is_admin_request():
+        return json_response({'success': False, 'message': 'Forbidden'}), 403
+    return send_from_directory(profiler.output_dir, filename, as_attachment=True)
+
 @app.route('/')
 def index():
     """Home page"""
-    return render_template('index.html')
+    return render_page('index.html')
 
 @app.route('/login', methods=['POST'])
 def login():
@@ -56,12 +492,12 @@ def login():
     data = request.json
     patient_id = data.get('patient_id', '').upper()
     
-    if patient_id in ['A', 'B']:
-        session['patient_id'] = patient_id
+    if PATIENT_ID_PATTERN.fullmatch(patient_id):
         patient_data = load_patient_data(patient_id)
         
         if patient_data:
-            return jsonify({
+            session['patient_id'] = patient_id
+            return json_response({
                 'success': True,
                 'patient': {
                     'id': patient_data['patient_id'],
@@ -72,19 +508,20 @@ def login():
                 }
             })
     
-    return jsonify({'success': False, 'message': 'Invalid patient ID. Use A or B.'})
+    message = 'Unknown patient ID.' if LOAD_TEST else 'Invalid patient ID. Use A or B.'
+    return json_response({'success': False, 'message': message})
 
 @app.route('/logout')
 def logout():
     """Logout"""
     session.pop('patient_id', None)
-    return jsonify({'success': True})
+    return json_response({'success': True})
 
 @app.route('/dashboard')
 def dashboard():
     """Patient dashboard"""
     if 'patient_id' not in session:
-        return render_template('login.html')
+        return render_page('login.html')
     
     patient_id = session['patient_id']
     patient_data = load_patient_data(patient_id)
@@ -92,31 +529,44 @@ def dashboard():
     if not patient_data:
         return "Patient data not found", 404
     
-    return render_template('dashboard.html', patient=patient_data)
+    return render_page('dashboard.html', patient=patient_data)
 
 @app.route('/api/predict', methods=['POST'])
 def predict():
     """Run predictions on patient report"""
     if 'patient_id' not in session:
-        return jsonify({'success': False, 'message': 'Not logged in'})
+        return json_response({'success': False, 'message': 'Not logged in'})
     
     data = request.json
     report_data = data.get('report_data')
     
     if not report_data:
-        return jsonify({'success': False, 'message': 'No report data provided'})
+        return json_response({'success': False, 'message': 'No report data provided'})
+    
+    # Dated reports from devices update the triage queue, once validated
+    report_key = None
+    if 'report_id' in report_data and 'date' in report_data:
+        try:
+            report_key = device_report_key(session['patient_id'], report_data)
+        except ValueError as e:
+            return json_response({'success': False, 'message': str(e)})
     
     try:
         # Run all predictions
-        predictions = inference_engine.predict_all(report_data)
+        predictions = g.engine.predict_all(report_data)
+        
+        if report_key is not None:
+            observe_report(session['patient_id'], *report_key, predictions)
         
         # Get recommendations
-        recommendations = get_all_recommendations(predictions)
+        with time_stage('recommendations'):
+            recommendations = get_all_recommendations(predictions)
         
         # Get summary message
-        summary = get_summary_message(predictions)
+        with time_stage('summary'):
+            summary = get_summary_message(predictions)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'predictions': predictions,
             'recommendations': recommendations,
@@ -124,91 +574,142 @@ def predict():
         })
     
     except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
+        return json_response({'success': False, 'message': str(e)})
 
 @app.route('/api/patient/reports')
 def get_patient_reports():
     """Get all patient reports"""
     if 'patient_id' not in session:
-        return jsonify({'success': False, 'message': 'Not logged in'})
+        return json_response({'success': False, 'message': 'Not logged in'})
     
     patient_id = session['patient_id']
     patient_data = load_patient_data(patient_id)
     
     if not patient_data:
-        return jsonify({'success': False, 'message': 'Patient not found'})
+        return json_response({'success': False, 'message': 'Patient not found'})
     
-    return jsonify({
+    return json_response({
         'success': True,
         'reports': patient_data['reports']
     })
 
 @app.route('/api/patient/history')
 def get_patient_history():
-    """Get patient history with predictions"""
+    """Get patient history with predictions
+    
+    ?format=columnar returns parallel arrays per metric instead of one
+    object per report. Bodies are cached gzipped per patient file, model
+    version and format.
+    """
     if 'patient_id' not in session:
-        return jsonify({'success': False, 'message': 'Not logged in'})
+        return json_response({'success': False, 'message': 'Not logged in'})
     
     patient_id = session['patient_id']
-    patient_data = load_patient_data(patient_id)
+    columnar = request.args.get('format') == 'columnar'
+    columns = load_patient_columns(patient_id)
     
-    if not patient_data:
-        return jsonify({'success': False, 'message': 'Patient not found'})
-    
-    # Process all reports
-    history = []
-    for report in patient_data['reports']:
-        predictions = inference_engine.predict_all(report)
-        history.append({
-            'date': report['date'],
-            'report_id': report['report_id'],
-            'predictions': predictions
-        })
+    if columns is None:
+        return json_response({'success': False, 'message': 'Patient not found'})
     
-    return jsonify({
-        'success': True,
-        'history': history
-    })
+    cache_key = (patient_id, patient_file_mtime(patient_id), g.engine.version,
+                 'columnar' if columnar else 'rows')
+    body = history_cache.get_bytes(cache_key)
+    
+    if body is None:
+        def build():
+            # Score every report in one model call per modality
+            scored = g.engine.predict_columns(columns)
+            all_predictions = g.engine.format_columns(columns, scored)
+            
+            report_ids = columns.report_ids.tolist()
+            dates = list(columns.date_labels)
+            for report_id, date, predictions in zip(report_ids, dates, all_predictions):
+                observe_report(patient_id, report_id, date, predictions)
+            
+            if columnar:
+                payload = {
+                    'success': True,
+                    'format': 'columnar',
+                    'dates': dates,
+                    'report_ids': report_ids,
+                    'labels': {name: MODEL_LABELS[name] for name in scored},
+                    'metrics': g.engine.format_columnar(columns, scored)
+                }
+            else:
+                payload = {
+                    'success': True,
+                    'history': [
+                        {'date': date, 'report_id': report_id, 'predictions': predictions}
+                        for report_id, date, predictions in zip(report_ids, dates, all_predictions)
+                    ]
+                }
+            
+            with time_stage('json_serialize'):
+                raw = app.json.response(payload).get_data()
+            with time_stage('gzip'):
+                body = gzip.compress(raw, compresslevel=6)
+            # Stored under the version that actually scored, which can trail
+            # g.engine.version while inference service workers roll
+            history_cache.put_bytes(cache_key[:2] + (g.engine.scored_version,) + cache_key[3:], body)
+            return body
+        
+        body = history_flight.do(cache_key, build)
+    
+    return gzip_response(body)
 
 @app.route('/report/<report_id>')
 def view_report(report_id):
     """View specific report"""
     if 'patient_id' not in session:
-        return render_template('login.html')
+        return render_page('login.html')
     
     patient_id = session['patient_id']
-    patient_data = load_patient_data(patient_id)
-    
-    if not patient_data:
-        return "Patient not found", 404
-    
-    # Find the report
-    report = None
-    for r in patient_data['reports']:
-        if r['report_id'] == report_id:
-            report = r
-            break
-    
-    if not report:
-        return "Report not found", 404
+    cache_key = (patient_id, report_id, g.engine.version,
+                 template_mtime('report.html', 'base.html'))
+    cached = report_page_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    # Run predictions
-    predictions = inference_engine.predict_all(report)
-    recommendations = get_all_recommendations(predictions)
-    summary = get_summary_message(predictions)
+    def build():
+        patient_data = load_patient_data(patient_id)
+        
+        if not patient_data:
+            return "Patient not found", 404
+        
+        # Find the report
+        report = None
+        for r in patient_data['reports']:
+            if r['report_id'] == report_id:
+                report = r
+                break
+        
+        if not report:
+            return "Report not found", 404
+        
+        # Run predictions
+        predictions = g.engine.predict_all(report)
+        observe_report(patient_id, report['report_id'], report['date'], predictions)
+        with time_stage('recommendations'):
+            recommendations = get_all_recommendations(predictions)
+        with time_stage('summary'):
+            summary = get_summary_message(predictions)
+        
+        html = render_page('report.html',
+                           patient=patient_data,
+                           report=report,
+                           predictions=predictions,
+                           recommendations=recommendations,
+                           summary=summary)
+        report_page_cache.put(cache_key[:2] + (g.engine.scored_version,) + cache_key[3:], html)
+        return html
     
-    return render_template('report.html',
-                         patient=patient_data,
-                         report=report,
-                         predictions=predictions,
-                         recommendations=recommendations,
-                         summary=summary)
+    return report_page_flight.do(cache_key, build)
 
 @app.route('/progress')
 def progress():
     """Progress tracking page"""
     if 'patient_id' not in session:
-        return render_template('login.html')
+        return render_page('login.html')
     
     patient_id = session['patient_id']
     patient_data = load_patient_data(patient_id)
@@ -216,12 +717,81 @@ def progress():
     if not patient_data:
         return "Patient not found", 404
     
-    return render_template('progress.html', patient=patient_data)
+    return render_page('progress.html', patient=patient_data)
+
+@app.route('/api/triage')
+def get_triage():
+    """Highest-risk patients for clinician review"""
+    if not is_admin_request():
+        return json_response({'success': False, 'message': 'Forbidden'}), 403
+    
+    index = get_triage_index()
+    if index is None:
+        return warming_response()
+    
+    limit = request.args.get('limit', 20, type=int)
+    patients = [
+        dict(entry, alerts=deterioration_monitor.alerts(entry['patient_id']))
+        for entry in index.top(limit)
+    ]
+    return json_response({
+        'success': True,
+        'patients': patients
+    })
+
+@app.route('/api/patient/similar')
+def get_similar_patients():
+    """Patients whose early trajectory looked most like this one's, with how they fared"""
+    # Neighbours are other patients' ids and outcomes, so this is a clinician view
+    if not is_admin_request():
+        return json_response({'success': False, 'message': 'Forbidden'}), 403
+    
+    if request.args.get('patient_id'):
+        patient_id = request.args['patient_id']
+    elif 'patient_id' in session:
+        patient_id = session['patient_id']
+    else:
+        return json_response({'success': False, 'message': 'Pass patient_id'})
+    
+    # The triage seeding pass scores every patient into the similarity index too
+    if get_triage_index() is None:
+        return warming_response()
+    k = max(1, min(request.args.get('k', 10, type=int), 100))
+    with time_stage('similarity_search'):
+        similar = similarity_index.similar(patient_id, k)
+    
+    if similar is None:
+        return json_response({'success': False, 'message': 'No scored history for this patient'})
+    return json_response({
+        'success': True,
+        'patient_id': patient_id,
+        'horizon_weeks': similarity_index.horizon_days // 7,
+        'labels': {name: MODEL_LABELS[name] for name in ('emotion', 'breathing')},
+        'trajectory': similarity_index.trajectory(patient_id),
+        'similar': similar
+    })
+
+@app.route('/admin/drift')
+def get_drift():
+    """Live input and prediction drift against the training distributions"""
+    if not is_admin_request():
+        return json_response({'success': False, 'message': 'Forbidden'}), 403
+    
+    drift = getattr(g.engine, 'drift', None)
+    report = drift.report() if drift is not None else None
+    if report is None:
+        return json_response({'success': False,
+                              'message': 'No drift reference; run training/drift_reference.py'}), 404
+    return json_response({
+        'success': True,
+        'version': g.engine.version,
+        'modalities': report
+    })
 
 @app.route('/about')
 def about():
     """About page"""
-    return render_template('about.html')
+    return render_page('about.html')
 
 if __name__ == '__main__':
     print("\n" + "=" * 60)
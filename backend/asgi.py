@@ -0,0 +1,233 @@
+"""
+RehabSense ASGI Entry Point
+Serves the existing Flask app from an event loop, running each request on
+a bounded executor lane so heavy scoring cannot starve cheap routes
+
+Usage (any ASGI server, e.g. uvicorn):
+    uvicorn asgi:application --app-dir backend --port 8000
+
+Requests are matched against the Flask URL map. Routes that run
+ModelInference go to the inference lane, everything else (patient
+loading, static files, page renders) to the I/O lane. Each route can
+also have its own concurrency limit; excess requests wait on the event
+loop without holding a thread.
+"""
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import HTTPException
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app as flask_app, ensure_triage_seeding
+from serve import warm_up
+from utils.inference import get_inference_engine
+from utils.metrics import registry as metrics
+
+# Routes whose handlers call ModelInference
+INFERENCE_ROUTES = {
+    '/api/predict',
+    '/api/patient/history',
+    '/report/<report_id>',
+    '/api/triage',
+    '/api/patient/similar'
+}
+
+# Default per-route concurrency limits; override with
+# REHABSENSE_ASGI_ROUTE_LIMITS="/api/patient/history=4,/api/predict=16"
+DEFAULT_ROUTE_LIMITS = {
+    '/api/patient/history': 4,
+    '/report/<report_id>': 8,
+    '/api/predict': 16
+}
+
+
+def parse_route_limits(spec):
+    """Parse "rule=limit,rule=limit" into a dict"""
+    limits = {}
+    for item in spec.split(','):
+        if '=' in item:
+            rule, limit = item.rsplit('=', 1)
+            limits[rule.strip()] = int(limit)
+    return limits
+
+
+class LaneDispatcher:
+    """Runs WSGI calls on per-lane thread pools behind per-route semaphores"""
+
+    def __init__(self, wsgi_app, io_threads, inference_threads, route_limits):
+        self.wsgi_app = wsgi_app
+        self.io_threads = io_threads
+        self.inference_threads = inference_threads
+        self.route_limits = route_limits
+        self.lanes = {}
+        self.semaphores = {}
+        self.waiting = {}
+        self.adapter = wsgi_app.url_map.bind('localhost')
+
+    def start(self):
+        self.lanes = {
+            'io': ThreadPoolExecutor(self.io_threads, thread_name_prefix='asgi-io'),
+            'inference': ThreadPoolExecutor(self.inference_threads, thread_name_prefix='asgi-inference')
+        }
+        self.semaphores = {rule: asyncio.Semaphore(limit) for rule, limit in self.route_limits.items()}
+
+    def shutdown(self):
+        for executor in self.lanes.values():
+            executor.shutdown(wait=True)
+
+    def match_rule(self, method, path):
+        """Flask rule string for a request, or None if unmatched"""
+        try:
+            rule, _ = self.adapter.match(path, method=method, return_rule=True)
+        except HTTPException:
+            return None
+        return rule.rule
+
+    async def dispatch(self, environ):
+        rule = self.match_rule(environ['REQUEST_METHOD'], environ['PATH_INFO'])
+        lane = self.lanes['inference' if rule in INFERENCE_ROUTES else 'io']
+        loop = asyncio.get_running_loop()
+        semaphore = self.semaphores.get(rule)
+        if semaphore is None:
+            return await loop.run_in_executor(lane, self.call_wsgi, environ)
+
+        self.waiting[rule] = self.waiting.get(rule, 0) + 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting[rule] -= 1
+        try:
+            return await loop.run_in_executor(lane, self.call_wsgi, environ)
+        finally:
+            semaphore.release()
+
+    def call_wsgi(self, environ):
+        """Run the WSGI app to completion and buffer its response"""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = headers
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            body = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], body
+
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope into a WSGI environ (PEP 3333)"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        # The body is fully buffered, so its length is always known
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            continue
+        else:
+            key = f'HTTP_{name}'
+            # HTTP/2 splits cookies across headers; they rejoin with "; ", not ","
+            separator = '; ' if key == 'HTTP_COOKIE' else ','
+            environ[key] = f"{environ[key]}{separator}{value}" if key in environ else value
+    return environ
+
+
+class AsgiApp:
+    """ASGI 3 application wrapping the Flask app"""
+
+    def __init__(self, wsgi_app):
+        self.dispatcher = LaneDispatcher(
+            wsgi_app,
+            io_threads=int(os.environ.get('REHABSENSE_ASGI_IO_THREADS', '32')),
+            inference_threads=int(os.environ.get('REHABSENSE_ASGI_INFERENCE_THREADS',
+                                                 os.cpu_count() or 1)),
+            route_limits=dict(DEFAULT_ROUTE_LIMITS, **parse_route_limits(
+                os.environ.get('REHABSENSE_ASGI_ROUTE_LIMITS', '')))
+        )
+        self._started = False
+        metrics.register_gauge(
+            'rehabsense_asgi_waiting_requests',
+            lambda: {(('route', rule),): count for rule, count in self.dispatcher.waiting.items()},
+            'Requests waiting on a per-route concurrency limit'
+        )
+
+    def _ensure_started(self):
+        if not self._started:
+            self.dispatcher.start()
+            self._started = True
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._ensure_started()
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, warm_up, self.dispatcher.wsgi_app,
+                                           get_inference_engine())
+                ensure_triage_seeding()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._started:
+                    self.dispatcher.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        self._ensure_started()
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+
+        status, headers, body = await self.dispatcher.dispatch(build_environ(scope, b''.join(chunks)))
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in headers]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+application = AsgiApp(flask_app)
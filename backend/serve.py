@@ -0,0 +1,272 @@
+"""
+RehabSense Production Server
+Pre-fork WSGI server: models load once in the parent and are shared
+copy-on-write with the worker processes
+
+Usage:
+    python backend/serve.py --port 8000 --workers 4 --threads 8
+
+Signals (sent to the parent):
+    SIGHUP            reload models in the parent, then replace workers one at a time
+    SIGTERM / SIGINT  graceful shutdown, letting in-flight requests finish
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.inference import SMOKE_REPORT, get_inference_engine, reload_inference_engine
+
+
+def warm_up(flask_app, engine):
+    """Exercise the models and templates once so workers start hot"""
+    start = time.perf_counter()
+    engine.smoke_test()
+    # Like smoke_test, keep the synthetic batch out of drift monitoring
+    drift, engine.drift = engine.drift, None
+    try:
+        engine.predict_batch([SMOKE_REPORT] * 8)
+    finally:
+        engine.drift = drift
+    client = flask_app.test_client()
+    for path in ('/', '/about'):
+        client.get(path)
+    return time.perf_counter() - start
+
+
+class PooledWSGIServer(ThreadingMixIn, WSGIServer):
+    """WSGI server handling connections on a fixed-size thread pool"""
+
+    daemon_threads = True
+
+    def __init__(self, sock, app, threads):
+        WSGIServer.__init__(self, sock.getsockname()[:2], QuietRequestHandler,
+                            bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        host, port = sock.getsockname()[:2]
+        self.server_name = socket.getfqdn(host)
+        self.server_port = port
+        self.setup_environ()
+        self.set_app(app)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='http')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        self.pool.shutdown(wait=True)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler that only logs when access logging is enabled"""
+
+    access_log = False
+
+    def log_message(self, format, *args):
+        if self.access_log:
+            super().log_message(format, *args)
+
+
+def run_worker(sock, flask_app, threads, on_exit=None, on_start=None):
+    """Worker process body: serve until told to stop"""
+    server = PooledWSGIServer(sock, flask_app, threads)
+    # Background threads do not survive fork, so each worker starts its own
+    if on_start is not None:
+        on_start()
+
+    def stop(signum, frame):
+        # shutdown() blocks until serve_forever returns, so call it off the main thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    try:
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        server.server_close()
+        # os._exit skips atexit, so flush anything the worker was writing
+        if on_exit is not None:
+            on_exit()
+    os._exit(0)
+
+
+class Arbiter:
+    """Parent process: forks, supervises and restarts workers"""
+
+    def __init__(self, sock, flask_app, workers, threads, graceful_timeout=30.0,
+                 model_watcher=None, on_worker_exit=None, on_worker_start=None):
+        self.sock = sock
+        self.flask_app = flask_app
+        self.workers = workers
+        self.threads = threads
+        self.graceful_timeout = graceful_timeout
+        self.model_watcher = model_watcher
+        self.on_worker_exit = on_worker_exit
+        self.on_worker_start = on_worker_start
+        self.children = {}
+        self._stopping = False
+        self._reload = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.sock, self.flask_app, self.threads, self.on_worker_exit,
+                           self.on_worker_start)
+            finally:
+                os._exit(1)
+        self.children[pid] = time.monotonic()
+        return pid
+
+    def stop_worker(self, pid):
+        """Ask a worker to finish in-flight requests, then force it"""
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self.children.pop(pid, None)
+            return
+        deadline = time.monotonic() + self.graceful_timeout
+        while time.monotonic() < deadline:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            time.sleep(0.05)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.children.pop(pid, None)
+
+    def reap(self):
+        """Collect exited workers; returns how many died unexpectedly"""
+        died = 0
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if self.children.pop(pid, None) is not None:
+                died += 1
+                print(f"⚠️  Worker {pid} exited with status {status}, restarting")
+        return died
+
+    def reload_models(self):
+        """Reload models in the parent so new workers share the new version"""
+        try:
+            engine, swapped = reload_inference_engine()
+        except Exception as e:
+            print(f"❌ Model reload failed, keeping current models: {e}")
+            return False
+        if swapped:
+            warm_up(self.flask_app, engine)
+            gc.collect()
+            gc.freeze()
+            print(f"🔄 Models reloaded in parent, version {engine.version}")
+        return swapped
+
+    def rolling_restart(self):
+        """Replace each worker with a fresh fork before stopping the old one"""
+        for pid in list(self.children):
+            self.spawn()
+            self.stop_worker(pid)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        for _ in range(self.workers):
+            self.spawn()
+        print(f"✅ {self.workers} workers x {self.threads} threads (parent pid {os.getpid()})")
+
+        while not self._stopping:
+            time.sleep(0.5)
+            self.reap()
+            if self.model_watcher is not None and self.model_watcher.poll():
+                if self.reload_models():
+                    self.rolling_restart()
+            if self._reload:
+                self._reload = False
+                print("🔄 Graceful restart")
+                self.reload_models()
+                self.rolling_restart()
+            # Replace workers that died, with a short backoff against crash loops
+            while not self._stopping and len(self.children) < self.workers:
+                self.spawn()
+                time.sleep(0.1)
+
+        print("Shutting down workers...")
+        for pid in list(self.children):
+            self.stop_worker(pid)
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_reload(self, signum, frame):
+        self._reload = True
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Run RehabSense with pre-forked workers')
+    parser.add_argument('--host', default=os.environ.get('REHABSENSE_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('REHABSENSE_PORT', '8000')))
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('REHABSENSE_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('REHABSENSE_THREADS', '8')))
+    parser.add_argument('--graceful-timeout', type=float, default=30.0)
+    parser.add_argument('--backlog', type=int, default=1024)
+    parser.add_argument('--access-log', action='store_true')
+    parser.add_argument('--no-warmup', action='store_true')
+    args = parser.parse_args()
+
+    # Import in the parent so the models are loaded exactly once
+    try:
+        import app as backend
+    except SystemExit:
+        print("❌ Backend failed to start; no workers forked")
+        sys.exit(1)
+    flask_app = backend.app
+
+    # The parent watches models/ and rolls workers, instead of each worker reloading
+    model_watcher, backend.model_watcher = backend.model_watcher, None
+    backend.arbiter_pid = os.getpid()
+
+    if not args.no_warmup:
+        elapsed = warm_up(flask_app, get_inference_engine())
+        print(f"✅ Warm-up finished in {elapsed * 1000:.0f} ms")
+
+    QuietRequestHandler.access_log = args.access_log
+
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog, reuse_port=False)
+    sock.set_inheritable(True)
+    print(f"Listening on http://{args.host}:{args.port}")
+
+    # Move everything allocated so far out of the GC's reach so the
+    # collector does not dirty (and copy) the shared pages in each worker
+    gc.collect()
+    gc.freeze()
+
+    capture = backend.traffic_capture
+    Arbiter(sock, flask_app, args.workers, args.threads, args.graceful_timeout,
+            model_watcher, capture.close if capture is not None else None,
+            backend.ensure_triage_seeding).run()
+    sock.close()
+
+
+if __name__ == '__main__':
+    main()
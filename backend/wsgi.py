@@ -0,0 +1,21 @@
+"""
+RehabSense WSGI Entry Point
+For external WSGI servers; preload so models are shared across workers, e.g.
+    gunicorn --preload --workers 4 --threads 8 --chdir backend wsgi:application
+"""
+
+import gc
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app as application
+from serve import warm_up
+from utils.inference import get_inference_engine
+
+warm_up(application, get_inference_engine())
+
+# Keep the preloaded heap out of the collector so forked workers share it
+gc.collect()
+gc.freeze()
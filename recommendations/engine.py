@@ -444,6 +444,22 @@ def get_all_recommendations(predictions):
     
     return recommendations
 
+def is_issue(modality, prediction):
+    """Check whether a single modality prediction is a focus area"""
+    if modality == 'heartbeat':
+        return prediction['status'] != 'Normal'
+    if modality == 'glucose':
+        return prediction['range'] != 'Normal'
+    if modality == 'breathing':
+        return prediction['status'] != 'Normal'
+    if modality == 'speech':
+        return prediction['pattern'] != 'Normal Speech'
+    if modality == 'emotion':
+        return prediction['state'] in ['Stressed', 'Sad']
+    if modality == 'posture':
+        return prediction['posture'] != 'Good Posture'
+    return False
+
 def get_summary_message(predictions):
     """Generate overall health summary message"""
     issues = []
@@ -451,37 +467,37 @@ def get_summary_message(predictions):
     
     # Check each prediction
     if 'heartbeat' in predictions:
-        if predictions['heartbeat']['status'] != 'Normal':
+        if is_issue('heartbeat', predictions['heartbeat']):
             issues.append('heart rhythm')
         else:
             strengths.append('heart health')
     
     if 'glucose' in predictions:
-        if predictions['glucose']['range'] != 'Normal':
+        if is_issue('glucose', predictions['glucose']):
             issues.append('blood glucose')
         else:
             strengths.append('glucose control')
     
     if 'breathing' in predictions:
-        if predictions['breathing']['status'] != 'Normal':
+        if is_issue('breathing', predictions['breathing']):
             issues.append('breathing pattern')
         else:
             strengths.append('breathing')
     
     if 'speech' in predictions:
-        if predictions['speech']['pattern'] != 'Normal Speech':
+        if is_issue('speech', predictions['speech']):
             issues.append('speech clarity')
         else:
             strengths.append('communication')
     
     if 'emotion' in predictions:
-        if predictions['emotion']['state'] in ['Stressed', 'Sad']:
+        if is_issue('emotion', predictions['emotion']):
             issues.append('emotional wellbeing')
         else:
             strengths.append('emotional state')
     
     if 'posture' in predictions:
-        if predictions['posture']['posture'] != 'Good Posture':
+        if is_issue('posture', predictions['posture']):
             issues.append('posture')
         else:
             strengths.append('posture')
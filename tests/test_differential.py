@@ -0,0 +1,52 @@
+"""
+Differential Test Suite
+Runs utils/differential.py's checks under pytest, one test per inference path
+
+Each engine must return scikit-learn's labels, confidences and posture
+scores on the randomized and boundary cases, and stay within its latency
+budget when one is set.
+
+Usage (from the project root, after training the models):
+    python -m pytest tests/test_differential.py
+    REHABSENSE_DIFFERENTIAL_BUDGETS="predict_batch=200,cascade=150" python -m pytest tests/test_differential.py
+
+REHABSENSE_DIFFERENTIAL_ROWS and REHABSENSE_DIFFERENTIAL_ROW_CASES size the
+cases, and REHABSENSE_INFERENCE_SOCKET enables the remote engine.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.differential import DEFAULT_ROW_CASES, DEFAULT_ROWS, ENGINES, PROJECT_ROOT, parse_budgets, run
+from utils.inference import MODEL_FILES
+
+MODELS_DIR = os.path.join(PROJECT_ROOT, 'models')
+ROWS = int(os.environ.get('REHABSENSE_DIFFERENTIAL_ROWS', DEFAULT_ROWS))
+ROW_CASES = int(os.environ.get('REHABSENSE_DIFFERENTIAL_ROW_CASES', DEFAULT_ROW_CASES))
+BUDGETS = parse_budgets(os.environ.get('REHABSENSE_DIFFERENTIAL_BUDGETS', ''))
+
+pytestmark = pytest.mark.skipif(
+    not all(os.path.exists(os.path.join(MODELS_DIR, filename)) for filename in MODEL_FILES.values()),
+    reason='models not trained; run training/train_all.py'
+)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_engine_matches_scikit_learn(engine):
+    result = run(MODELS_DIR, [engine], ROWS, row_cases=ROW_CASES,
+                 socket_path=os.environ.get('REHABSENSE_INFERENCE_SOCKET'), budgets=BUDGETS)
+    if engine in result['skipped']:
+        pytest.skip(result['skipped'][engine])
+
+    entry = result['engines'][engine]
+    failing = {
+        name: stats for name, stats in entry['modalities'].items()
+        if stats['label_mismatches'] or stats['deviations']
+    }
+    assert entry['matches'], f"{engine} differs from scikit-learn: {failing}"
+    assert entry['within_budget'], (f"{engine} took {entry['us_per_report']} us/report, "
+                                    f"budget {entry['budget_us']}")
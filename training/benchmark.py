@@ -0,0 +1,202 @@
+"""
+Estimator Benchmark
+Trains candidate estimators per modality on the production split and
+ranks them by accuracy within a serving latency budget
+
+Usage (from the project root, like the training scripts):
+    python training/benchmark.py --latency-budget-ms 1.0
+    python training/benchmark.py --modalities glucose speech --output-dir benchmarks
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+# Add training and project directories to path
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from train_heartbeat import build_heartbeat_model
+from train_glucose import build_glucose_model
+from train_breathing import build_breathing_model
+from train_speech import build_speech_model
+from train_emotion import build_emotion_model
+from train_posture import build_posture_model
+from train_chunked import DATASETS
+from utils.inference import MODEL_FEATURES, PROBA_MODELS
+
+# Unfitted production estimator per modality
+PRODUCTION_MODELS = {
+    'heartbeat': build_heartbeat_model,
+    'glucose': build_glucose_model,
+    'breathing': build_breathing_model,
+    'speech': build_speech_model,
+    'emotion': build_emotion_model,
+    'posture': build_posture_model
+}
+
+# Alternatives tried for every modality alongside the production estimator
+CANDIDATES = {
+    'logistic_regression': lambda: Pipeline([
+        ('scaler', StandardScaler()),
+        ('logreg', LogisticRegression(max_iter=1000, random_state=42))
+    ]),
+    'decision_tree': lambda: DecisionTreeClassifier(max_depth=8, min_samples_leaf=5, random_state=42),
+    'hist_gradient_boosting': lambda: HistGradientBoostingClassifier(max_iter=100, random_state=42),
+    'random_forest_small': lambda: RandomForestClassifier(n_estimators=30, max_depth=8, random_state=42),
+    'knn': lambda: Pipeline([
+        ('scaler', StandardScaler()),
+        ('knn', KNeighborsClassifier(n_neighbors=7))
+    ])
+}
+
+BATCH_ROWS = 10000
+
+
+def serve(model, modality, X):
+    """Do the work ModelInference does per request: predict, plus predict_proba if used"""
+    predictions = model.predict(X)
+    if modality in PROBA_MODELS and hasattr(model, 'predict_proba'):
+        model.predict_proba(X)
+    return predictions
+
+
+def benchmark_estimator(name, model, modality, split, single_rows):
+    """Fit one estimator and measure quality, latency, size and load time"""
+    X_train, X_test, y_train, y_test = split
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+
+    y_pred = serve(model, modality, X_test)
+
+    # Single-row latency over distinct test rows
+    rng = np.random.default_rng(0)
+    latencies = []
+    for i in rng.integers(0, len(X_test), single_rows):
+        row = X_test[i:i + 1]
+        start = time.perf_counter()
+        serve(model, modality, row)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+
+    batch = X_test[rng.integers(0, len(X_test), BATCH_ROWS)]
+    start = time.perf_counter()
+    serve(model, modality, batch)
+    batch_seconds = time.perf_counter() - start
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    artifact = buffer.getvalue()
+    start = time.perf_counter()
+    joblib.load(io.BytesIO(artifact))
+    load_seconds = time.perf_counter() - start
+
+    return {
+        'estimator': name,
+        'accuracy': round(float(accuracy_score(y_test, y_pred)), 4),
+        'macro_f1': round(float(f1_score(y_test, y_pred, average='macro')), 4),
+        'train_ms': round(train_seconds * 1000, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'batch_rows_per_s': round(BATCH_ROWS / batch_seconds),
+        'artifact_kb': round(len(artifact) / 1024, 1),
+        'load_ms': round(load_seconds * 1000, 2)
+    }
+
+
+def benchmark_modality(modality, single_rows, latency_budget_ms):
+    """Rank the production estimator and the alternatives for one modality"""
+    path, label = DATASETS[modality]
+    build_current = PRODUCTION_MODELS[modality]
+    df = pd.read_csv(path)
+    # Models are served with NumPy rows, so benchmark them the same way
+    X = df[MODEL_FEATURES[modality]].to_numpy(dtype=float)
+    y = df[label].to_numpy()
+    split = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    results = [benchmark_estimator('current', build_current(), modality, split, single_rows)]
+    for name, build in CANDIDATES.items():
+        results.append(benchmark_estimator(name, build(), modality, split, single_rows))
+
+    for result in results:
+        result['within_budget'] = result['p99_ms'] <= latency_budget_ms
+
+    # Best macro-F1 among estimators that meet the budget, faster on ties
+    results.sort(key=lambda r: (not r['within_budget'], -r['macro_f1'], r['p99_ms']))
+    recommended = results[0]
+    current = next(r for r in results if r['estimator'] == 'current')
+    if not recommended['within_budget']:
+        reason = f"no candidate meets the {latency_budget_ms} ms p99 budget; most accurate shown"
+    elif recommended is current:
+        reason = f"production estimator is the most accurate within {latency_budget_ms} ms p99"
+    else:
+        reason = (f"best macro-F1 within {latency_budget_ms} ms p99: {recommended['macro_f1']} "
+                  f"at {recommended['p99_ms']} ms, vs current {current['macro_f1']} "
+                  f"at {current['p99_ms']} ms")
+    return {'recommended': recommended['estimator'], 'reason': reason, 'results': results}
+
+
+def write_markdown(path, leaderboard, latency_budget_ms):
+    columns = ['estimator', 'accuracy', 'macro_f1', 'train_ms', 'p50_ms', 'p99_ms',
+               'batch_rows_per_s', 'artifact_kb', 'load_ms', 'within_budget']
+    lines = ['# Estimator Leaderboard', '',
+             f'Single-row p99 budget: {latency_budget_ms} ms. '
+             f'Batch throughput measured on {BATCH_ROWS:,} rows.', '']
+    for modality, entry in leaderboard.items():
+        lines += [f"## {modality}", '',
+                  f"Recommended: **{entry['recommended']}** - {entry['reason']}", '',
+                  '| ' + ' | '.join(columns) + ' |',
+                  '|' + '---|' * len(columns)]
+        for result in entry['results']:
+            lines.append('| ' + ' | '.join(str(result[column]) for column in columns) + ' |')
+        lines.append('')
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines))
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Benchmark candidate estimators per modality')
+    parser.add_argument('--modalities', nargs='+', choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument('--latency-budget-ms', type=float, default=2.0,
+                        help='Single-row p99 latency allowed per model')
+    parser.add_argument('--single-rows', type=int, default=500, help='Rows timed one at a time')
+    parser.add_argument('--output-dir', default='benchmarks')
+    args = parser.parse_args()
+
+    leaderboard = {}
+    for modality in args.modalities:
+        print(f"Benchmarking {modality}...")
+        leaderboard[modality] = benchmark_modality(modality, args.single_rows, args.latency_budget_ms)
+        for result in leaderboard[modality]['results']:
+            print(f"  {result['estimator']:<24} F1 {result['macro_f1']:.4f}  "
+                  f"p99 {result['p99_ms']:>7.3f} ms  {result['batch_rows_per_s']:>9} rows/s"
+                  f"{'' if result['within_budget'] else '  (over budget)'}")
+        print(f"  ➜ {leaderboard[modality]['recommended']}: {leaderboard[modality]['reason']}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, 'leaderboard.json'), 'w') as f:
+        json.dump({'latency_budget_ms': args.latency_budget_ms, 'modalities': leaderboard}, f, indent=2)
+    write_markdown(os.path.join(args.output_dir, 'leaderboard.md'), leaderboard, args.latency_budget_ms)
+    print(f"\n✅ Leaderboard written to {args.output_dir}/leaderboard.json and leaderboard.md")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Build Cache
+Content hashes of everything that goes into each trained artifact, kept in
+models/manifest.json so train_all.py only rebuilds what changed
+
+A build step's key is the SHA-256 of its inputs: the training CSVs, the
+scripts that train it, its hyperparameters and the library versions. A
+step is fresh when the manifest holds the same key and its outputs still
+hash to what the manifest recorded. The manifest also records the model
+version ModelInference derives from the six model files, which is how
+the server knows the manifest describes the artifacts it loaded.
+"""
+
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.inference import MANIFEST_FILE, load_manifest, models_digest
+
+HASH_BLOCK_BYTES = 1024 * 1024
+
+_file_hashes = {}
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file, memoized per (path, size, mtime) for this run"""
+    stat = os.stat(path)
+    cache_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if cache_key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+                digest.update(block)
+        _file_hashes[cache_key] = digest.hexdigest()
+    return _file_hashes[cache_key]
+
+
+def library_versions():
+    """Versions of everything that can change a fitted model's bytes or behaviour"""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scikit-learn': sklearn.__version__,
+        'joblib': joblib.__version__
+    }
+
+
+def estimator_params(estimator):
+    """An unfitted estimator's hyperparameters as comparable strings"""
+    return {name: repr(value) for name, value in sorted(estimator.get_params(deep=True).items())}
+
+
+def step_inputs(data, scripts, params):
+    """Inputs of one build step: files are recorded by content hash"""
+    return {
+        'data': {path: file_sha256(path) for path in data},
+        'scripts': {path: file_sha256(path) for path in scripts},
+        'params': params,
+        'libraries': library_versions()
+    }
+
+
+def input_key(inputs):
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class BuildCache:
+    """Tracks which artifacts in models_dir are up to date with their inputs"""
+
+    def __init__(self, models_dir='models', force=False):
+        self.models_dir = models_dir
+        self.force = force
+        self.manifest = load_manifest(models_dir) or {'version': None, 'artifacts': {}}
+        self.rebuilt = []
+        self.skipped = []
+
+    def fresh(self, name, inputs):
+        """Whether step name was built from exactly these inputs and its outputs are intact"""
+        if self.force:
+            return False
+        entry = self.manifest['artifacts'].get(name)
+        if entry is None or entry.get('key') != input_key(inputs):
+            return False
+        for filename, sha256 in entry['outputs'].items():
+            path = os.path.join(self.models_dir, filename)
+            if not os.path.exists(path) or file_sha256(path) != sha256:
+                return False
+        return True
+
+    def build(self, name, inputs, outputs, func):
+        """Run func unless step name is fresh, then record what it produced"""
+        if self.fresh(name, inputs):
+            print(f"⏭️  {name}: inputs unchanged, skipping")
+            self.skipped.append(name)
+            return False
+
+        start = time.perf_counter()
+        func()
+        self.manifest['artifacts'][name] = {
+            'key': input_key(inputs),
+            'inputs': inputs,
+            'outputs': {
+                filename: file_sha256(os.path.join(self.models_dir, filename))
+                for filename in outputs
+            },
+            'built_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'seconds': round(time.perf_counter() - start, 1)
+        }
+        self.rebuilt.append(name)
+        # Saved after every step, so an interrupted run keeps what it finished
+        self.save()
+        return True
+
+    def save(self):
+        """Write the manifest atomically, stamped with the current model version"""
+        try:
+            self.manifest['version'] = models_digest(self.models_dir).hexdigest()[:12]
+        except FileNotFoundError:
+            self.manifest['version'] = None
+        self.manifest['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        path = os.path.join(self.models_dir, MANIFEST_FILE)
+        os.makedirs(self.models_dir, exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,108 @@
+"""
+Drift Reference Builder
+Saves per-feature training histograms and label distributions next to
+the models, for utils/drift.py to compare live traffic against
+
+Bin edges are the deciles of a uniform sample of each feature, so every
+reference bin holds about a tenth of the training rows; discrete features
+get one bin per value. The CSVs are streamed, so memory stays bounded.
+
+Usage (from the project root, like the training scripts):
+    python training/drift_reference.py
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add training and project directories to path
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from train_chunked import DATASETS
+from utils.drift import REFERENCE_FILE
+from utils.inference import MODEL_FEATURES, MODEL_LABELS
+
+NUM_BINS = 10
+SAMPLE_ROWS = 100000
+CHUNK_ROWS = 100000
+
+
+def sample_rows(path, columns, seed=42):
+    """Uniform sample of up to SAMPLE_ROWS rows, keeping the smallest random keys"""
+    rng = np.random.default_rng(seed)
+    sample = np.empty((0, len(columns)))
+    keys = np.empty(0)
+    for block in pd.read_csv(path, usecols=columns, chunksize=CHUNK_ROWS):
+        sample = np.vstack([sample, block[columns].to_numpy(dtype=float)])
+        keys = np.concatenate([keys, rng.random(len(block))])
+        if len(keys) > SAMPLE_ROWS:
+            keep = np.argpartition(keys, SAMPLE_ROWS)[:SAMPLE_ROWS]
+            sample, keys = sample[keep], keys[keep]
+    return sample
+
+
+def bin_edges(values):
+    """Interior decile cut points, one per distinct value for discrete features"""
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, NUM_BINS + 1)[1:-1]))
+    distinct = np.unique(values)
+    if len(distinct) <= NUM_BINS:
+        # bisect_right puts each value in its own bin
+        edges = distinct
+    return edges.tolist()
+
+
+def build_modality(modality):
+    """Reference histograms for one modality's features and labels"""
+    path, label = DATASETS[modality]
+    features = MODEL_FEATURES[modality]
+    sample = sample_rows(path, features)
+    edges = {feature: bin_edges(sample[:, j]) for j, feature in enumerate(features)}
+
+    counts = {feature: np.zeros(len(edges[feature]) + 1, dtype=np.int64) for feature in features}
+    labels = np.zeros(len(MODEL_LABELS[modality]), dtype=np.int64)
+    for block in pd.read_csv(path, usecols=features + [label], chunksize=CHUNK_ROWS):
+        for feature in features:
+            binned = np.searchsorted(edges[feature], block[feature].to_numpy(dtype=float), side='right')
+            counts[feature] += np.bincount(binned, minlength=len(counts[feature]))
+        labels += np.bincount(block[label].to_numpy(dtype=np.int64), minlength=len(labels))[:len(labels)]
+
+    return {
+        'rows': int(labels.sum()),
+        'features': {
+            feature: {'edges': edges[feature], 'counts': counts[feature].tolist()}
+            for feature in features
+        },
+        'labels': labels.tolist()
+    }
+
+
+def build_drift_reference(models_dir='models'):
+    """Write the drift reference for every modality"""
+    reference = {'bins': NUM_BINS, 'modalities': {}}
+    for modality in DATASETS:
+        reference['modalities'][modality] = build_modality(modality)
+        print(f"  {modality}: {reference['modalities'][modality]['rows']} rows")
+
+    os.makedirs(models_dir, exist_ok=True)
+    path = os.path.join(models_dir, REFERENCE_FILE)
+    with open(path, 'w') as f:
+        json.dump(reference, f)
+    print(f"✅ Drift reference saved to {path}")
+    return reference
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Save training histograms for drift monitoring')
+    parser.add_argument('--models-dir', default='models')
+    args = parser.parse_args()
+    build_drift_reference(args.models_dir)
+
+
+if __name__ == '__main__':
+    main()
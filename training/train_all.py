@@ -1,52 +1,115 @@
 """
 Master Training Script
 Trains all six RehabSense AI models
+
+Models whose training data, scripts, hyperparameters and library versions
+are unchanged since the last run (per models/manifest.json) are skipped;
+pass --force to rebuild everything.
 """
 
+import argparse
 import sys
 import os
+from functools import partial
 
-# Add training directory to path
+# Add training and project directories to path
 sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from train_heartbeat import build_heartbeat_model, train_heartbeat_model
+from train_glucose import build_glucose_model, train_glucose_model
+from train_breathing import build_breathing_model, train_breathing_model
+from train_speech import build_speech_model, train_speech_model
+from train_emotion import build_emotion_model, train_emotion_model
+from train_posture import build_posture_model, train_posture_model
+from train_chunked import DATASETS, INCREMENTAL, build_incremental, build_member, train_chunked_model
+from drift_reference import NUM_BINS, SAMPLE_ROWS, build_drift_reference
+from train_cascade import MIN_AGREEMENT, MIN_SPEEDUP, SCREEN_DEPTH, train_cascade
+from build_cache import BuildCache, estimator_params, step_inputs
+from utils.inference import CASCADE_FILE, MODEL_FEATURES, MODEL_FILES
+from utils.drift import REFERENCE_FILE
+from utils.differential import run as run_differential
+
+# In-memory trainer and unfitted estimator per modality
+TRAINERS = {
+    'heartbeat': (train_heartbeat_model, build_heartbeat_model),
+    'glucose': (train_glucose_model, build_glucose_model),
+    'breathing': (train_breathing_model, build_breathing_model),
+    'speech': (train_speech_model, build_speech_model),
+    'emotion': (train_emotion_model, build_emotion_model),
+    'posture': (train_posture_model, build_posture_model)
+}
+
+def model_inputs(modality, chunked, memory_budget_mb):
+    """Everything one modality's model is built from"""
+    if chunked:
+        estimator = build_incremental(modality) if modality in INCREMENTAL else build_member(modality, 1)
+        scripts = ['training/train_chunked.py', 'training/train_posture.py', 'utils/block_ensemble.py']
+        params = {
+            'mode': 'chunked',
+            'memory_budget_mb': memory_budget_mb,
+            'features': MODEL_FEATURES[modality],
+            'estimator': estimator_params(estimator)
+        }
+    else:
+        scripts = [f'training/train_{modality}.py']
+        params = {'mode': 'in-memory', 'estimator': estimator_params(TRAINERS[modality][1]())}
+    return step_inputs([DATASETS[modality][0]], scripts, params)
 
-from train_heartbeat import train_heartbeat_model
-from train_glucose import train_glucose_model
-from train_breathing import train_breathing_model
-from train_speech import train_speech_model
-from train_emotion import train_emotion_model
-from train_posture import train_posture_model
+def check_cascade(models_dir='models'):
+    """Fail unless the cascade returns the full models' labels on the differential cases"""
+    # Same cases as `python -m utils.differential --engines cascade`
+    result = run_differential(models_dir, ['cascade'])
+    entry = result['engines'].get('cascade')
+    if entry is None or entry['passed']:
+        print("✅ Cascade matches the full models on the differential cases")
+        return
+    failing = {name: stats['label_mismatches'] for name, stats in entry['modalities'].items()
+               if stats['label_mismatches'] or stats['deviations']}
+    # Never leave screens on disk that change served labels
+    os.remove(os.path.join(models_dir, CASCADE_FILE))
+    raise RuntimeError(f"Cascade differs from the full models ({failing} label mismatches); "
+                       f"removed {CASCADE_FILE}")
 
-def train_all_models():
-    """Train all six models sequentially"""
+def train_all_models(chunked=False, memory_budget_mb=256, force=False):
+    """Train all six models sequentially, skipping those whose inputs are unchanged"""
     print("\n" + "=" * 60)
     print("REHABSENSE MODEL TRAINING")
     print("=" * 60)
     print("\nTraining all six AI models...\n")
     
+    cache = BuildCache('models', force)
+    datasets = [path for path, _ in DATASETS.values()]
+    
     try:
-        # Model 1: Heartbeat
-        train_heartbeat_model()
-        print("\n")
-        
-        # Model 2: Glucose
-        train_glucose_model()
-        print("\n")
-        
-        # Model 3: Breathing
-        train_breathing_model()
-        print("\n")
-        
-        # Model 4: Speech
-        train_speech_model()
-        print("\n")
+        for modality in DATASETS:
+            if chunked:
+                # Stream the CSVs in blocks sized to the memory budget
+                train = partial(train_chunked_model, modality, memory_budget_mb)
+            else:
+                train = TRAINERS[modality][0]
+            if cache.build(modality, model_inputs(modality, chunked, memory_budget_mb),
+                           [MODEL_FILES[modality]], train):
+                print("\n")
         
-        # Model 5: Emotion
-        train_emotion_model()
-        print("\n")
+        # Training histograms for live drift monitoring
+        drift_inputs = step_inputs(datasets, ['training/drift_reference.py'], {
+            'bins': NUM_BINS,
+            'sample_rows': SAMPLE_ROWS,
+            'features': MODEL_FEATURES
+        })
+        if cache.build('drift_reference', drift_inputs, [REFERENCE_FILE], build_drift_reference):
+            print("\n")
         
-        # Model 6: Posture
-        train_posture_model()
-        print("\n")
+        # First-stage screens for the optional cascade mode, which mimic the saved models
+        cascade_inputs = step_inputs(
+            datasets + [os.path.join('models', filename) for filename in MODEL_FILES.values()],
+            ['training/train_cascade.py'],
+            {'depth': SCREEN_DEPTH, 'min_agreement': MIN_AGREEMENT, 'min_speedup': MIN_SPEEDUP}
+        )
+        if cache.build('cascade', cascade_inputs, [CASCADE_FILE], train_cascade):
+            print("\n")
+        check_cascade()
         
         print("=" * 60)
         print("✅ ALL MODELS TRAINED SUCCESSFULLY!")
@@ -58,6 +121,12 @@ def train_all_models():
         print("  - speech_model.pkl")
         print("  - emotion_model.pkl")
         print("  - posture_model.pkl")
+        print("  - drift_reference.json")
+        print("  - cascade.pkl")
+        print("  - manifest.json")
+        print(f"\nRebuilt: {', '.join(cache.rebuilt) or 'nothing'}")
+        print(f"Up to date: {', '.join(cache.skipped) or 'nothing'}")
+        print(f"Model version: {cache.manifest['version']}")
         print("\nYou can now run the web application!")
         
     except Exception as e:
@@ -65,4 +134,11 @@ def train_all_models():
         raise
 
 if __name__ == '__main__':
-    train_all_models()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Train all RehabSense models')
+    parser.add_argument('--chunked', action='store_true',
+                        help='Stream training data in blocks instead of loading it whole')
+    parser.add_argument('--memory-budget-mb', type=float, default=256)
+    parser.add_argument('--force', action='store_true',
+                        help='Retrain every model even if its inputs are unchanged')
+    args = parser.parse_args()
+    train_all_models(args.chunked, args.memory_budget_mb, args.force)
\ No newline at end of file
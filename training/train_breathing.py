@@ -13,6 +13,13 @@ from sklearn.pipeline import Pipeline
 import joblib
 import os
 
+def build_breathing_model():
+    """Unfitted breathing irregularity estimator, shared with training/benchmark.py"""
+    return Pipeline([
+        ('scaler', StandardScaler()),
+        ('svm', SVC(kernel='rbf', C=1.0, gamma='scale', random_state=42))
+    ])
+
 def train_breathing_model():
     """Train breathing irregularity detection model"""
     print("=" * 60)
@@ -32,10 +39,7 @@ def train_breathing_model():
     )
     
     # Create pipeline with scaling and SVM
-    model = Pipeline([
-        ('scaler', StandardScaler()),
-        ('svm', SVC(kernel='rbf', C=1.0, gamma='scale', random_state=42))
-    ])
+    model = build_breathing_model()
     
     model.fit(X_train, y_train)
     
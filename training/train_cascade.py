@@ -0,0 +1,181 @@
+"""
+Cascade Screen Training
+Fits a shallow decision tree per modality that mimics the production model,
+for ModelInference's cascade mode to answer confidently normal inputs
+without running the full model
+
+Each screen learns the saved production model's predictions (not the raw
+labels), so agreement is measured against what would have been served.
+The report gives, per confidence threshold, the share of holdout rows the
+screen answers, its agreement with the full model on those rows, and the
+measured single-row speedup. The holdout rarely lands near a smooth
+model's decision boundary, so each screen is also run on the probes of
+utils/differential.py: generated rows plus boundary rows on the split
+thresholds of both the full model and the screen. Only screens that meet
+the agreement and speedup floors at the serving threshold, and answer no
+probe differently from the full model, are saved; other modalities keep
+running their full model. Heartbeat and glucose serve predict_proba
+confidences that a screen cannot reproduce, so they are never screened.
+
+Usage (from the project root, after the models are trained):
+    python training/train_cascade.py
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeClassifier
+
+# Add training and project directories to path
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from train_chunked import DATASETS
+from utils.differential import boundary_rows, random_rows
+from utils.inference import CASCADE_FILE, MODEL_FEATURES, MODEL_LABELS, NORMAL_LABELS, PROBA_MODELS
+
+SCREEN_DEPTH = 6
+THRESHOLDS = (0.9, 0.95, 0.98, 0.99, 1.0)
+TIMED_ROWS = 200
+
+# A screen is kept only if, at the serving threshold, it agrees with the
+# full model this often on the rows it answers and makes scoring this much faster
+MIN_AGREEMENT = 0.99
+MIN_SPEEDUP = 1.1
+
+# Generated rows per modality, and split thresholds per feature, probed
+# for disagreement with the full model
+PROBE_ROWS = 20000
+PROBE_THRESHOLDS = 256
+PROBE_SEED = 7
+
+
+def screen_accepts(screen, normal, X, threshold):
+    """Rows the screen answers itself: a normal label at leaf purity >= threshold"""
+    proba = screen.predict_proba(X)
+    labels = screen.classes_[np.argmax(proba, axis=1)]
+    return (proba.max(axis=1) >= threshold) & np.isin(labels, normal), labels
+
+
+def single_row_ms(predict, X):
+    """Mean milliseconds per single-row call over the first TIMED_ROWS rows"""
+    rows = X[:TIMED_ROWS]
+    start = time.perf_counter()
+    for i in range(len(rows)):
+        predict(rows[i:i + 1])
+    return (time.perf_counter() - start) / len(rows) * 1000
+
+
+def train_screen(modality, models_dir='models', threshold=0.99, probe_sample=None):
+    """Fit one modality's screen and measure it against the production model"""
+    path, label = DATASETS[modality]
+    df = pd.read_csv(path)
+    X = df[MODEL_FEATURES[modality]].to_numpy(dtype=float)
+    y = df[label].to_numpy()
+    X_train, X_test, _, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    model = joblib.load(os.path.join(models_dir, f'{modality}_model.pkl'))
+    screen = DecisionTreeClassifier(max_depth=SCREEN_DEPTH, random_state=42)
+    screen.fit(X_train, model.predict(X_train))
+
+    normal = [MODEL_LABELS[modality].index(name) for name in NORMAL_LABELS[modality]]
+    full = model.predict(X_test)
+    full_ms = single_row_ms(model.predict, X_test)
+    screen_ms = single_row_ms(screen.predict_proba, X_test)
+
+    # Trees do not extrapolate, so rows outside the training range are escalated
+    low, high = X_train.min(axis=0), X_train.max(axis=0)
+    in_range = ((X_test >= low) & (X_test <= high)).all(axis=1)
+
+    if probe_sample is None:
+        probe_sample = random_rows(PROBE_ROWS, PROBE_SEED)[modality]
+    probes = np.vstack([
+        probe_sample,
+        boundary_rows(model, probe_sample, PROBE_THRESHOLDS),
+        boundary_rows(screen, probe_sample, PROBE_THRESHOLDS)
+    ])
+    probe_accepted, probe_labels = screen_accepts(screen, normal, probes, threshold)
+    probe_accepted &= ((probes >= low) & (probes <= high)).all(axis=1)
+    probe_disagreements = int((probe_labels[probe_accepted] != model.predict(probes[probe_accepted])).sum())
+
+    report = []
+    for candidate in sorted(set(THRESHOLDS) | {threshold}):
+        accepted, labels = screen_accepts(screen, normal, X_test, candidate)
+        accepted &= in_range
+        coverage = float(accepted.mean())
+        agreement = float((labels[accepted] == full[accepted]).mean()) if accepted.any() else None
+        # Every row pays for the screen; escalated rows also pay for the full model
+        cascade_ms = screen_ms + (1 - coverage) * full_ms
+        report.append({
+            'threshold': candidate,
+            'coverage': round(coverage, 4),
+            'agreement': None if agreement is None else round(agreement, 4),
+            'speedup': round(full_ms / cascade_ms, 2)
+        })
+    serving = next(row for row in report if row['threshold'] == threshold)
+    return {
+        'screen': screen,
+        'normal': normal,
+        'low': low,
+        'high': high,
+        'full_ms': round(full_ms, 3),
+        'screen_ms': round(screen_ms, 3),
+        'report': report,
+        'probes': len(probes),
+        'probe_disagreements': probe_disagreements,
+        'useful': (serving['agreement'] is not None and serving['agreement'] >= MIN_AGREEMENT
+                   and serving['speedup'] >= MIN_SPEEDUP and probe_disagreements == 0)
+    }
+
+
+def train_cascade(models_dir='models', threshold=0.99):
+    """Train every modality's screen and save the useful ones together"""
+    print("=" * 60)
+    print("Training cascade screens")
+    print("=" * 60)
+
+    probe_samples = random_rows(PROBE_ROWS, PROBE_SEED)
+    cascade = {}
+    for modality in DATASETS:
+        if modality in PROBA_MODELS:
+            print(f"\n{modality}: not screened, its confidence comes from predict_proba")
+            continue
+        entry = train_screen(modality, models_dir, threshold, probe_samples[modality])
+        print(f"\n{modality}: full model {entry['full_ms']} ms/row, screen {entry['screen_ms']} ms/row")
+        for row in entry['report']:
+            print(f"  threshold {row['threshold']:<5} answers {row['coverage'] * 100:5.1f}%  "
+                  f"agreement {row['agreement'] if row['agreement'] is not None else '-':<6}  "
+                  f"speedup {row['speedup']}x")
+        print(f"  probes: {entry['probe_disagreements']} of {entry['probes']} answered differently "
+              f"at threshold {threshold}")
+        if entry['useful']:
+            cascade[modality] = entry
+            print(f"  ➜ screen kept at threshold {threshold}")
+        else:
+            print(f"  ➜ no screen: needs agreement >= {MIN_AGREEMENT}, speedup >= {MIN_SPEEDUP}x "
+                  f"and no probe disagreements at threshold {threshold}")
+
+    path = os.path.join(models_dir, CASCADE_FILE)
+    joblib.dump(cascade, path)
+    print(f"\n✅ Cascade screens for {', '.join(cascade) or 'no modalities'} saved to {path}")
+    return cascade
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Train cascade screens for the production models')
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--threshold', type=float, default=0.99,
+                        help='Screen confidence the cascade will be served with (REHABSENSE_CASCADE_THRESHOLD)')
+    args = parser.parse_args()
+    train_cascade(args.models_dir, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""
+Out-of-Core Training
+Trains the six models from CSVs streamed in fixed-size blocks, so peak
+memory follows --memory-budget-mb rather than the dataset size
+
+Modalities with linear production models (speech) or models that would
+have to hold every row (emotion's KNN, breathing's kernel SVM) learn
+incrementally with SGD over a scaler fitted in a first pass. Tree models
+(heartbeat, glucose, posture) become a soft-voting BlockEnsemble with one
+member per block. Validation streams a holdout drawn per block.
+
+Usage (from the project root, like the training scripts):
+    python training/train_chunked.py --memory-budget-mb 256
+    python training/train_all.py --chunked --memory-budget-mb 256
+"""
+
+import argparse
+import math
+import os
+import resource
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Add training and project directories to path
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from train_posture import build_posture_model
+from utils.block_ensemble import BlockEnsemble
+from utils.inference import MODEL_FEATURES, MODEL_LABELS
+
+# Training CSV and label column per modality
+DATASETS = {
+    'heartbeat': ('data/training/heartbeat_train.csv', 'label'),
+    'glucose': ('data/training/glucose_train.csv', 'glucose_range'),
+    'breathing': ('data/training/breathing_train.csv', 'label'),
+    'speech': ('data/training/speech_train.csv', 'label'),
+    'emotion': ('data/training/emotion_train.csv', 'label'),
+    'posture': ('data/training/posture_train.csv', 'label')
+}
+
+INCREMENTAL = ('breathing', 'speech', 'emotion')
+
+# Working copies pandas and NumPy make of each parsed block
+PARSE_OVERHEAD = 10
+MIN_BLOCK_ROWS = 1000
+
+HOLDOUT_FRACTION = 0.2
+
+
+def block_rows_for_budget(memory_budget_mb, n_columns):
+    """Rows per block so one parsed block and its copies fit in the budget"""
+    row_bytes = n_columns * 8 * PARSE_OVERHEAD
+    return max(MIN_BLOCK_ROWS, int(memory_budget_mb * 1024 * 1024 // row_bytes))
+
+
+def iter_blocks(modality, block_rows, seed=42):
+    """Yield (index, X_train, y_train, X_holdout, y_holdout) per block
+
+    The holdout split depends only on the block index and seed, so every
+    pass over the file sees the same rows on each side.
+    """
+    path, label = DATASETS[modality]
+    features = MODEL_FEATURES[modality]
+    reader = pd.read_csv(path, usecols=features + [label], chunksize=block_rows)
+    for index, block in enumerate(reader):
+        X = block[features].to_numpy(dtype=np.float64)
+        y = block[label].to_numpy()
+        holdout = np.random.default_rng([seed, index]).random(len(block)) < HOLDOUT_FRACTION
+        yield index, X[~holdout], y[~holdout], X[holdout], y[holdout]
+
+
+def build_incremental(modality):
+    """SGD stand-in for each modality's production estimator"""
+    if modality == 'breathing':
+        # Linear hinge loss in place of the RBF SVC
+        return SGDClassifier(loss='hinge', alpha=1e-4, random_state=42)
+    return SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+
+
+def build_member(modality, n_members):
+    """One block's ensemble member, sized so the whole ensemble stays near production cost"""
+    if modality == 'heartbeat':
+        return RandomForestClassifier(n_estimators=max(4, 100 // n_members), max_depth=10,
+                                      random_state=42, class_weight='balanced')
+    if modality == 'glucose':
+        return HistGradientBoostingClassifier(max_iter=max(10, 100 // n_members), max_depth=5,
+                                              learning_rate=0.1, random_state=42)
+    return build_posture_model()
+
+
+def train_chunked_model(modality, memory_budget_mb=256, epochs=3, max_members=16):
+    """Train and save one modality's model out of core"""
+    print("=" * 60)
+    print(f"Chunked training: {modality}")
+    print("=" * 60)
+
+    n_columns = len(MODEL_FEATURES[modality]) + 1
+    block_rows = block_rows_for_budget(memory_budget_mb, n_columns)
+
+    # Pass 1: block count, classes and feature scaling on the training rows
+    scaler = StandardScaler()
+    classes = set()
+    n_blocks = n_train = 0
+    for _, X_train, y_train, _, _ in iter_blocks(modality, block_rows):
+        n_blocks += 1
+        n_train += len(y_train)
+        classes.update(np.unique(y_train).tolist())
+        if len(y_train):
+            scaler.partial_fit(X_train)
+    classes = np.array(sorted(classes))
+    print(f"{n_train} training rows in {n_blocks} blocks of up to {block_rows} rows")
+
+    # Pass 2: fit
+    if modality in INCREMENTAL:
+        estimator = build_incremental(modality)
+        for epoch in range(epochs):
+            rng = np.random.default_rng(epoch)
+            for _, X_train, y_train, _, _ in iter_blocks(modality, block_rows):
+                if not len(y_train):
+                    continue
+                order = rng.permutation(len(y_train))
+                estimator.partial_fit(scaler.transform(X_train[order]), y_train[order], classes=classes)
+        model = Pipeline([('scaler', scaler), ('sgd', estimator)])
+    else:
+        # With more blocks than members, members learn from evenly spaced blocks
+        stride = math.ceil(n_blocks / max_members)
+        n_members = math.ceil(n_blocks / stride)
+        members = []
+        for index, X_train, y_train, _, _ in iter_blocks(modality, block_rows):
+            if index % stride or not len(y_train):
+                continue
+            member = build_member(modality, n_members)
+            member.fit(X_train, y_train)
+            members.append(member)
+        model = BlockEnsemble(members, classes)
+        print(f"{len(members)} ensemble members")
+
+    # Pass 3: streamed holdout validation
+    confusion = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    for _, _, _, X_holdout, y_holdout in iter_blocks(modality, block_rows):
+        if not len(y_holdout):
+            continue
+        predicted = model.predict(X_holdout)
+        np.add.at(confusion, (np.searchsorted(classes, y_holdout), np.searchsorted(classes, predicted)), 1)
+
+    accuracy, macro_f1 = confusion_scores(confusion)
+    print(f"\nHoldout rows: {int(confusion.sum())}")
+    print(f"Model Accuracy: {accuracy:.4f}")
+    print(f"Macro F1: {macro_f1:.4f}")
+    print_recall(modality, classes, confusion)
+    print(f"Peak RSS: {peak_rss_mb():.0f} MB")
+
+    os.makedirs('models', exist_ok=True)
+    path = f'models/{modality}_model.pkl'
+    joblib.dump(model, path)
+    print(f"\n✅ Model saved to {path}")
+    return model
+
+
+def confusion_scores(confusion):
+    """Accuracy and macro-F1 from a confusion matrix"""
+    total = confusion.sum()
+    true_positive = np.diag(confusion).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.nan_to_num(true_positive / confusion.sum(axis=0))
+        recall = np.nan_to_num(true_positive / confusion.sum(axis=1))
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+    return (true_positive.sum() / total if total else 0.0), f1.mean()
+
+
+def print_recall(modality, classes, confusion):
+    labels = MODEL_LABELS[modality]
+    support = confusion.sum(axis=1)
+    for i, cls in enumerate(classes):
+        recall = confusion[i, i] / support[i] if support[i] else 0.0
+        print(f"  {labels[int(cls)]:<24} recall {recall:.3f}  support {int(support[i])}")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Train RehabSense models out of core')
+    parser.add_argument('--modalities', nargs='+', choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument('--memory-budget-mb', type=float, default=256)
+    parser.add_argument('--epochs', type=int, default=3, help='Passes for incremental models')
+    parser.add_argument('--max-members', type=int, default=16, help='Ensemble members for tree models')
+    args = parser.parse_args()
+
+    for modality in args.modalities:
+        train_chunked_model(modality, args.memory_budget_mb, args.epochs, args.max_members)
+        print("\n")
+
+
+if __name__ == '__main__':
+    main()
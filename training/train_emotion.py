@@ -13,6 +13,17 @@ from sklearn.pipeline import Pipeline
 import joblib
 import os
 
+def build_emotion_model():
+    """Unfitted emotional state estimator, shared with training/benchmark.py"""
+    return Pipeline([
+        ('scaler', StandardScaler()),
+        ('knn', KNeighborsClassifier(
+            n_neighbors=7,
+            weights='distance',
+            metric='euclidean'
+        ))
+    ])
+
 def train_emotion_model():
     """Train emotional state detection model"""
     print("=" * 60)
@@ -32,14 +43,7 @@ def train_emotion_model():
     )
     
     # Create pipeline with scaling and KNN
-    model = Pipeline([
-        ('scaler', StandardScaler()),
-        ('knn', KNeighborsClassifier(
-            n_neighbors=7,
-            weights='distance',
-            metric='euclidean'
-        ))
-    ])
+    model = build_emotion_model()
     
     model.fit(X_train, y_train)
     
@@ -11,6 +11,15 @@ from sklearn.metrics import classification_report, accuracy_score
 import joblib
 import os
 
+def build_glucose_model():
+    """Unfitted glucose range estimator, shared with training/benchmark.py"""
+    return GradientBoostingClassifier(
+        n_estimators=100,
+        max_depth=5,
+        learning_rate=0.1,
+        random_state=42
+    )
+
 def train_glucose_model():
     """Train blood glucose estimation model"""
     print("=" * 60)
@@ -30,12 +39,7 @@ def train_glucose_model():
     )
     
     # Train Gradient Boosting model
-    model = GradientBoostingClassifier(
-        n_estimators=100,
-        max_depth=5,
-        learning_rate=0.1,
-        random_state=42
-    )
+    model = build_glucose_model()
     
     model.fit(X_train, y_train)
     
@@ -11,6 +11,15 @@ from sklearn.metrics import classification_report, accuracy_score
 import joblib
 import os
 
+def build_heartbeat_model():
+    """Unfitted heartbeat abnormality estimator, shared with training/benchmark.py"""
+    return RandomForestClassifier(
+        n_estimators=100,
+        max_depth=10,
+        random_state=42,
+        class_weight='balanced'
+    )
+
 def train_heartbeat_model():
     """Train heartbeat abnormality detection model"""
     print("=" * 60)
@@ -30,12 +39,7 @@ def train_heartbeat_model():
     )
     
     # Train Random Forest model
-    model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=10,
-        random_state=42,
-        class_weight='balanced'
-    )
+    model = build_heartbeat_model()
     
     model.fit(X_train, y_train)
     
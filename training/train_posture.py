@@ -11,6 +11,16 @@ from sklearn.metrics import classification_report, accuracy_score
 import joblib
 import os
 
+def build_posture_model():
+    """Unfitted posture quality estimator, shared with training/benchmark.py"""
+    return DecisionTreeClassifier(
+        max_depth=8,
+        min_samples_split=10,
+        min_samples_leaf=5,
+        random_state=42,
+        class_weight='balanced'
+    )
+
 def train_posture_model():
     """Train posture detection model"""
     print("=" * 60)
@@ -30,13 +40,7 @@ def train_posture_model():
     )
     
     # Train Decision Tree model
-    model = DecisionTreeClassifier(
-        max_depth=8,
-        min_samples_split=10,
-        min_samples_leaf=5,
-        random_state=42,
-        class_weight='balanced'
-    )
+    model = build_posture_model()
     
     model.fit(X_train, y_train)
     
@@ -13,6 +13,18 @@ from sklearn.pipeline import Pipeline
 import joblib
 import os
 
+def build_speech_model():
+    """Unfitted speech pattern estimator, shared with training/benchmark.py"""
+    return Pipeline([
+        ('scaler', StandardScaler()),
+        ('logreg', LogisticRegression(
+            multi_class='multinomial',
+            solver='lbfgs',
+            max_iter=1000,
+            random_state=42
+        ))
+    ])
+
 def train_speech_model():
     """Train speech pattern analysis model"""
     print("=" * 60)
@@ -32,15 +44,7 @@ def train_speech_model():
     )
     
     # Create pipeline with scaling and Logistic Regression
-    model = Pipeline([
-        ('scaler', StandardScaler()),
-        ('logreg', LogisticRegression(
-            multi_class='multinomial',
-            solver='lbfgs',
-            max_iter=1000,
-            random_state=42
-        ))
-    ])
+    model = build_speech_model()
     
     model.fit(X_train, y_train)
     
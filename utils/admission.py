@@ -0,0 +1,184 @@
+"""
+Admission Control Module
+Per-route concurrency limits with bounded, deadline-limited wait queues
+
+Requests beyond a route's concurrency limit wait in a priority queue
+shared by all controlled routes, so interactive clinician views are
+served ahead of bulk device uploads when capacity frees up. A request
+that finds its route's queue full is rejected at once (429); one that
+waits past its route's deadline is rejected then (503). Both carry a
+Retry-After estimated from the queue depth and recent service times.
+"""
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+
+from utils.metrics import registry as metrics
+
+# priority: lower is served first; limit: concurrent requests;
+# queue: requests allowed to wait; deadline: seconds a request may wait
+DEFAULT_POLICIES = {
+    '/api/patient/history': {'priority': 0, 'limit': 4, 'queue': 32, 'deadline': 2.0},
+    '/report/<report_id>': {'priority': 0, 'limit': 4, 'queue': 32, 'deadline': 2.0},
+    '/api/triage': {'priority': 0, 'limit': 1, 'queue': 4, 'deadline': 10.0},
+    '/api/predict': {'priority': 1, 'limit': 8, 'queue': 64, 'deadline': 1.0}
+}
+
+# Weight of the newest request in the moving service-time average
+SERVICE_TIME_ALPHA = 0.2
+
+
+def parse_policies(spec):
+    """Parse "rule=limit:queue:deadline,..." overrides into policy dicts"""
+    overrides = {}
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        rule, values = item.rsplit('=', 1)
+        limit, queue, deadline = values.split(':')
+        overrides[rule.strip()] = {'limit': int(limit), 'queue': int(queue), 'deadline': float(deadline)}
+    return overrides
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, route, reason, retry_after):
+        super().__init__(f"{route} rejected: {reason}")
+        self.route = route
+        self.reason = reason
+        self.retry_after = retry_after
+        # A full queue means the client is sending too much; a missed
+        # deadline means the server is too slow right now
+        self.status = 429 if reason == 'queue_full' else 503
+
+
+class _Waiter:
+    __slots__ = ('route', 'event', 'granted', 'cancelled')
+
+    def __init__(self, route):
+        self.route = route
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class AdmissionController:
+    """Admits, queues or rejects requests to the controlled routes"""
+
+    def __init__(self, capacity, policies):
+        self.capacity = capacity
+        self.policies = policies
+        self._lock = threading.Lock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._active_total = 0
+        self._active = {route: 0 for route in policies}
+        self._queued = {route: 0 for route in policies}
+        self._service_time = {route: None for route in policies}
+
+        metrics.register_gauge(
+            'rehabsense_admission_queue_depth',
+            lambda: {(('route', route),): count for route, count in self._queued.items()},
+            'Requests waiting for admission per route'
+        )
+        metrics.register_gauge(
+            'rehabsense_admission_in_flight',
+            lambda: {(('route', route),): count for route, count in self._active.items()},
+            'Admitted requests currently running per route'
+        )
+        metrics.describe('rehabsense_admission_rejections_total', 'Requests shed by admission control')
+        metrics.describe('rehabsense_admission_wait_seconds', 'Time spent queued before admission')
+
+    @classmethod
+    def from_env(cls, environ):
+        """Build from REHABSENSE_ADMISSION_* settings; None when disabled"""
+        if environ.get('REHABSENSE_ADMISSION', '1') == '0':
+            return None
+        policies = {route: dict(policy) for route, policy in DEFAULT_POLICIES.items()}
+        for route, override in parse_policies(environ.get('REHABSENSE_ADMISSION_ROUTES', '')).items():
+            policies.setdefault(route, {'priority': 0}).update(override)
+        # Shared by all controlled routes, so priority decides who gets a freed slot
+        capacity = int(environ.get('REHABSENSE_ADMISSION_CAPACITY', '0')) or max(4, 2 * (os.cpu_count() or 1))
+        return cls(capacity, policies)
+
+    def controls(self, route):
+        return route in self.policies
+
+    def _can_run(self, route):
+        return (self._active_total < self.capacity
+                and self._active[route] < self.policies[route]['limit'])
+
+    def _start(self, route):
+        self._active_total += 1
+        self._active[route] += 1
+
+    def _dispatch(self):
+        """Grant freed capacity to waiters in priority order (caller holds the lock)"""
+        skipped = []
+        while self._heap and self._active_total < self.capacity:
+            entry = heapq.heappop(self._heap)
+            waiter = entry[2]
+            if waiter.cancelled:
+                continue
+            if not self._can_run(waiter.route):
+                skipped.append(entry)
+                continue
+            self._queued[waiter.route] -= 1
+            self._start(waiter.route)
+            waiter.granted = True
+            waiter.event.set()
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+
+    def retry_after(self, route):
+        """Seconds until the route's current queue should have drained"""
+        policy = self.policies[route]
+        service_time = self._service_time[route] or policy['deadline']
+        return max(1, math.ceil((self._queued[route] + 1) * service_time / policy['limit']))
+
+    def _reject(self, route, reason):
+        metrics.inc('rehabsense_admission_rejections_total', (('route', route), ('reason', reason)))
+        return AdmissionRejected(route, reason, self.retry_after(route))
+
+    def acquire(self, route):
+        """Block until admitted; returns the admission time or raises AdmissionRejected"""
+        policy = self.policies[route]
+        start = time.perf_counter()
+        with self._lock:
+            waiter = _Waiter(route)
+            self._queued[route] += 1
+            heapq.heappush(self._heap, (policy['priority'], next(self._seq), waiter))
+            self._dispatch()
+            if waiter.granted:
+                metrics.observe('rehabsense_admission_wait_seconds', 0.0, (('route', route),))
+                return start
+            if self._queued[route] > policy['queue']:
+                waiter.cancelled = True
+                self._queued[route] -= 1
+                raise self._reject(route, 'queue_full')
+
+        waiter.event.wait(policy['deadline'])
+        with self._lock:
+            if not waiter.granted:
+                waiter.cancelled = True
+                self._queued[route] -= 1
+                raise self._reject(route, 'deadline')
+        admitted = time.perf_counter()
+        metrics.observe('rehabsense_admission_wait_seconds', admitted - start, (('route', route),))
+        return admitted
+
+    def release(self, route, admitted):
+        """Free the request's slot and record how long it ran"""
+        elapsed = time.perf_counter() - admitted
+        with self._lock:
+            self._active_total -= 1
+            self._active[route] -= 1
+            previous = self._service_time[route]
+            self._service_time[route] = elapsed if previous is None else (
+                SERVICE_TIME_ALPHA * elapsed + (1 - SERVICE_TIME_ALPHA) * previous)
+            self._dispatch()
@@ -0,0 +1,29 @@
+"""
+Block Ensemble Module
+Soft-voting ensemble of classifiers each fitted on one block of rows
+
+Produced by training/train_chunked.py for modalities whose estimators
+cannot learn incrementally. Lives in utils so saved models load anywhere
+ModelInference does.
+"""
+
+import numpy as np
+
+
+class BlockEnsemble:
+    """Averages member probabilities over the full set of classes"""
+
+    def __init__(self, members, classes):
+        self.members = members
+        self.classes_ = np.asarray(classes)
+
+    def predict_proba(self, X):
+        proba = np.zeros((len(X), len(self.classes_)))
+        for member in self.members:
+            # A block may not contain every class
+            columns = np.searchsorted(self.classes_, member.classes_)
+            proba[:, columns] += member.predict_proba(X)
+        return proba / len(self.members)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,241 @@
+"""
+Columnar Patient Module
+Structure-of-arrays representation of a patient's report history
+
+Each (modality, field) pair becomes one contiguous NumPy array, with
+report ids and dates alongside, so history-wide work is vector work
+instead of walking per-report dicts. Conversion to and from the JSON
+patient shape is lossless: values a column cannot hold exactly (an int in
+a float field, a bool, a string or an explicit null) are kept aside per
+row, reports laid out differently from the canonical key and field order
+keep their layout, and dates keep their original strings next to the
+parsed day used for filtering.
+"""
+
+import numpy as np
+
+
+def parse_days(dates):
+    """datetime64[D] of each date's leading YYYY-MM-DD, NaT where it does not parse"""
+    prefixes = [str(date)[:10] for date in dates]
+    try:
+        return np.array(prefixes, dtype='datetime64[D]')
+    except ValueError:
+        days = np.full(len(prefixes), np.datetime64('NaT'), dtype='datetime64[D]')
+        for i, prefix in enumerate(prefixes):
+            try:
+                days[i] = np.datetime64(prefix, 'D')
+            except ValueError:
+                pass
+        return days
+
+
+class PatientColumns:
+    """One patient's reports stored as parallel arrays"""
+
+    def __init__(self, info, report_ids, dates, modalities, columns,
+                 masks=None, extras=None, raw=None, layouts=None, date_labels=None):
+        self.info = info
+        self.report_ids = report_ids
+        self.dates = dates
+        self.modalities = modalities
+        self.columns = columns
+        self.masks = masks or {}
+        self.extras = extras or {}
+        # {(modality, field): {row: value}} for values the column holds only approximately
+        self.raw = raw or {}
+        # {row: ((key, fields or None), ...)} for reports laid out differently from to_json's default
+        self.layouts = layouts or {}
+        # Dates as given; self.dates holds the parsed days
+        self.date_labels = date_labels if date_labels is not None else dates.astype(str)
+
+    def __len__(self):
+        return len(self.report_ids)
+
+    @classmethod
+    def from_json(cls, patient_data):
+        """Build columns from the patient JSON shape"""
+        reports = patient_data['reports']
+        n = len(reports)
+        info = {key: value for key, value in patient_data.items() if key != 'reports'}
+
+        # Modalities and fields in order of first appearance
+        modalities = {}
+        extras = {}
+        for i, report in enumerate(reports):
+            for key, value in report.items():
+                if key in ('report_id', 'date'):
+                    continue
+                if isinstance(value, dict):
+                    fields = modalities.setdefault(key, [])
+                    for field in value:
+                        if field not in fields:
+                            fields.append(field)
+                else:
+                    extras.setdefault(i, {})[key] = value
+
+        columns = {}
+        masks = {}
+        raw = {}
+        for modality, fields in modalities.items():
+            for field in fields:
+                values = [report.get(modality, {}).get(field) for report in reports]
+                present = np.array([value is not None for value in values])
+                observed = [value for value in values if value is not None]
+                is_int = all(type(v) is int for v in observed)
+                column = np.zeros(n, dtype=np.int64) if is_int else np.full(n, np.nan)
+                if is_int:
+                    column[present] = observed
+                else:
+                    kept = {}
+                    for i, value in enumerate(values):
+                        if value is None:
+                            if isinstance(reports[i].get(modality), dict) and field in reports[i][modality]:
+                                kept[i] = None
+                            continue
+                        if type(value) is float:
+                            column[i] = value
+                            continue
+                        # ints, bools and anything else round-trip from here
+                        kept[i] = value
+                        if isinstance(value, (int, float)):
+                            column[i] = float(value)
+                    if kept:
+                        raw[(modality, field)] = kept
+                columns[(modality, field)] = column
+                if not present.all():
+                    masks[(modality, field)] = present
+
+        layouts = {}
+        for i, report in enumerate(reports):
+            layout = tuple(
+                (key, tuple(value) if isinstance(value, dict) and key not in ('report_id', 'date') else None)
+                for key, value in report.items()
+            )
+            if layout != cls._default_layout(modalities, report, extras.get(i, {})):
+                layouts[i] = layout
+
+        date_labels = [report['date'] for report in reports]
+        return cls(
+            info,
+            np.array([report['report_id'] for report in reports], dtype=str),
+            parse_days(date_labels),
+            {modality: tuple(fields) for modality, fields in modalities.items()},
+            columns,
+            masks,
+            extras,
+            raw,
+            layouts,
+            np.array(date_labels, dtype=object)
+        )
+
+    @staticmethod
+    def _default_layout(modalities, report, extras):
+        """The layout to_json gives a report when none is recorded for it"""
+        layout = [('report_id', None), ('date', None)]
+        for modality, fields in modalities.items():
+            values = report.get(modality)
+            if isinstance(values, dict):
+                present = tuple(field for field in fields if values.get(field) is not None)
+                if present:
+                    layout.append((modality, present))
+        layout.extend((key, None) for key in extras)
+        return tuple(layout)
+
+    def to_json(self):
+        """Rebuild the patient JSON shape"""
+        reports = []
+        as_python = {key: column.tolist() for key, column in self.columns.items()}
+        masks = {key: mask.tolist() for key, mask in self.masks.items()}
+        report_ids = self.report_ids.tolist()
+        dates = list(self.date_labels)
+
+        def value(modality, field, i):
+            kept = self.raw.get((modality, field))
+            return kept[i] if kept is not None and i in kept else as_python[(modality, field)][i]
+
+        for i in range(len(self)):
+            extras = self.extras.get(i, {})
+            layout = self.layouts.get(i)
+            if layout is not None:
+                fixed = {'report_id': report_ids[i], 'date': dates[i]}
+                reports.append({
+                    key: (fixed[key] if key in fixed else extras[key]) if fields is None
+                    else {field: value(key, field, i) for field in fields}
+                    for key, fields in layout
+                })
+                continue
+
+            report = {'report_id': report_ids[i], 'date': dates[i]}
+            for modality, fields in self.modalities.items():
+                values = {}
+                for field in fields:
+                    key = (modality, field)
+                    if key in masks and not masks[key][i]:
+                        continue
+                    values[field] = value(modality, field, i)
+                if values:
+                    report[modality] = values
+            report.update(extras)
+            reports.append(report)
+        return dict(self.info, reports=reports)
+
+    def modality_mask(self, modality):
+        """Rows where the modality has every field present"""
+        mask = np.ones(len(self), dtype=bool)
+        for field in self.modalities.get(modality, ()):
+            if (modality, field) in self.masks:
+                mask &= self.masks[(modality, field)]
+        return mask
+
+    def feature_matrix(self, modality, features):
+        """(rows, features) matrix for the reports carrying the modality
+
+        Returns (matrix, row indices), or (None, None) when the modality
+        or any requested feature is absent.
+        """
+        if modality not in self.modalities:
+            return None, None
+        if any(feature not in self.modalities[modality] for feature in features):
+            return None, None
+        rows = np.flatnonzero(self.modality_mask(modality))
+        matrix = np.column_stack(
+            [self.columns[(modality, feature)][rows].astype(float) for feature in features]
+        )
+        return matrix, rows
+
+    def take(self, indices):
+        """New PatientColumns holding only the given report positions"""
+        indices = np.asarray(indices, dtype=np.intp)
+        positions = {int(old): new for new, old in enumerate(indices)}
+        return PatientColumns(
+            self.info,
+            self.report_ids[indices],
+            self.dates[indices],
+            self.modalities,
+            {key: column[indices] for key, column in self.columns.items()},
+            {key: mask[indices] for key, mask in self.masks.items()},
+            {positions[i]: extra for i, extra in self.extras.items() if i in positions},
+            {
+                key: {positions[i]: value for i, value in kept.items() if i in positions}
+                for key, kept in self.raw.items()
+            },
+            {positions[i]: layout for i, layout in self.layouts.items() if i in positions},
+            self.date_labels[indices]
+        )
+
+    def between(self, start=None, end=None):
+        """Reports dated within [start, end]"""
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.dates >= np.datetime64(start, 'D')
+        if end is not None:
+            mask &= self.dates <= np.datetime64(end, 'D')
+        return self.take(np.flatnonzero(mask))
+
+    @property
+    def nbytes(self):
+        """Bytes held by the column arrays"""
+        return (sum(column.nbytes for column in self.columns.values())
+                + sum(mask.nbytes for mask in self.masks.values())
+                + self.dates.nbytes + self.report_ids.nbytes)
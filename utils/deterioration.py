@@ -0,0 +1,249 @@
+"""
+Deterioration Detection Module
+One-sided CUSUM change-point tests over scored patient histories
+
+The batch detector runs over padded (patients x reports) arrays so a
+whole cohort is one vectorized pass per report position; the monitor
+keeps the same statistics per patient and updates them in O(1).
+
+Usage:
+    python -m utils.deterioration cohort_scores/ --output alerts.ndjson
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+# direction: +1 alarms on increases, -1 on decreases
+# sigma: expected report-to-report spread used to standardize the signal
+# k: allowance (in sigmas) absorbed each report, h: alarm threshold
+# reference: fixed in-control mean; None means the patient's own baseline
+SIGNALS = {
+    'heart_rate': {'direction': 1, 'sigma': 8.0, 'k': 0.5, 'h': 4.0, 'reference': None},
+    'posture_score': {'direction': -1, 'sigma': 10.0, 'k': 0.5, 'h': 4.0, 'reference': None},
+    'distress': {'direction': 1, 'sigma': 0.5, 'k': 0.25, 'h': 2.0, 'reference': 0.25}
+}
+
+# Reports used to estimate each patient's own baseline
+BASELINE_REPORTS = 3
+
+# Emotion predictions counted as distress (Stressed, Sad)
+DISTRESS_STATES = (2, 3)
+
+
+def report_signals(predictions):
+    """Extract the monitored signals from one predict_all result"""
+    heartbeat = predictions.get('heartbeat')
+    posture = predictions.get('posture')
+    emotion = predictions.get('emotion')
+    return {
+        'heart_rate': heartbeat['heart_rate'] if heartbeat else np.nan,
+        'posture_score': posture['score'] if posture else np.nan,
+        'distress': float(emotion['prediction'] in DISTRESS_STATES) if emotion else np.nan
+    }
+
+
+def build_signal_arrays(histories):
+    """Pad per-patient lists of predict_all results into (patients x reports) arrays"""
+    max_len = max((len(history) for history in histories), default=0)
+    arrays = {name: np.full((len(histories), max_len), np.nan) for name in SIGNALS}
+    for row, history in enumerate(histories):
+        for col, predictions in enumerate(history):
+            for name, value in report_signals(predictions).items():
+                arrays[name][row, col] = value
+    return arrays
+
+
+def pad_columns(patient_ids, values):
+    """Scatter flat per-report values into padded rows, one row per patient
+
+    patient_ids must already be grouped and ordered by report date.
+    Returns (unique patient ids, padded array).
+    """
+    patients, starts, counts = np.unique(patient_ids, return_index=True, return_counts=True)
+    order = np.argsort(starts)
+    patients, starts, counts = patients[order], starts[order], counts[order]
+    rows = np.repeat(np.arange(len(patients)), counts)
+    cols = np.arange(len(patient_ids)) - np.repeat(starts, counts)
+    padded = np.full((len(patients), counts.max() if len(counts) else 0), np.nan)
+    padded[rows, cols] = values
+    return patients, padded
+
+
+def detect_deterioration(arrays, baseline_reports=BASELINE_REPORTS):
+    """Run the CUSUM tests across all patients at once
+
+    Returns per signal a dict with the final statistic, whether it is in
+    alarm, and the first report index that crossed the threshold (-1 if none).
+    """
+    results = {}
+    for name, params in SIGNALS.items():
+        values = arrays[name]
+        n_patients, n_reports = values.shape
+        observed = ~np.isnan(values)
+
+        if params['reference'] is None:
+            # Mean of each patient's first few observed reports
+            seen = np.cumsum(observed, axis=1)
+            in_baseline = observed & (seen <= baseline_reports)
+            count = in_baseline.sum(axis=1)
+            with np.errstate(invalid='ignore'):
+                mu = np.where(in_baseline, values, 0.0).sum(axis=1) / count
+        else:
+            in_baseline = np.zeros_like(observed)
+            mu = np.full(n_patients, params['reference'])
+
+        z = params['direction'] * (values - mu[:, None]) / params['sigma'] - params['k']
+        active = observed & ~in_baseline & ~np.isnan(mu)[:, None]
+
+        statistic = np.zeros(n_patients)
+        first_alarm = np.full(n_patients, -1)
+        for col in range(n_reports):
+            step = active[:, col]
+            statistic = np.where(step, np.maximum(0.0, statistic + np.where(step, z[:, col], 0.0)), statistic)
+            crossed = step & (statistic > params['h']) & (first_alarm < 0)
+            first_alarm[crossed] = col
+
+        results[name] = {
+            'statistic': statistic,
+            'alarm': statistic > params['h'],
+            'first_alarm': first_alarm
+        }
+    return results
+
+
+class DeteriorationMonitor:
+    """Per-patient incremental CUSUM state, updated in O(1) per report"""
+
+    def __init__(self, baseline_reports=BASELINE_REPORTS):
+        self.baseline_reports = baseline_reports
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def update(self, patient_id, report_id, date, predictions):
+        """Fold one report into the patient's statistics; older reports are ignored"""
+        signals = report_signals(predictions)
+        with self._lock:
+            state = self._states.get(patient_id)
+            if state is None:
+                state = self._states[patient_id] = {
+                    'last': None,
+                    'reports': 0,
+                    'signals': {name: {'n': 0, 'total': 0.0, 'statistic': 0.0, 'first_alarm': -1}
+                                for name in SIGNALS}
+                }
+            if state['last'] is not None and (date, report_id) <= state['last']:
+                return
+            state['last'] = (date, report_id)
+            index = state['reports']
+            state['reports'] += 1
+
+            for name, params in SIGNALS.items():
+                value = signals[name]
+                if value != value:
+                    continue
+                tracked = state['signals'][name]
+                if params['reference'] is None and tracked['n'] < self.baseline_reports:
+                    tracked['n'] += 1
+                    tracked['total'] += value
+                    continue
+                mu = params['reference'] if params['reference'] is not None else tracked['total'] / tracked['n']
+                z = params['direction'] * (value - mu) / params['sigma'] - params['k']
+                tracked['statistic'] = max(0.0, tracked['statistic'] + z)
+                if tracked['statistic'] > params['h'] and tracked['first_alarm'] < 0:
+                    tracked['first_alarm'] = index
+
+    def alerts(self, patient_id):
+        """Signals currently in alarm for a patient"""
+        with self._lock:
+            state = self._states.get(patient_id)
+            if state is None:
+                return []
+            return [
+                {'signal': name, 'statistic': round(tracked['statistic'], 3)}
+                for name, tracked in state['signals'].items()
+                if tracked['statistic'] > SIGNALS[name]['h']
+            ]
+
+
+def load_scored_shards(scores_dir):
+    """Load .npz shards from utils.score_cohort into padded arrays"""
+    shards = [np.load(path) for path in sorted(glob.glob(os.path.join(scores_dir, 'part-*.npz')))]
+    if not shards:
+        return np.array([]), {name: np.empty((0, 0)) for name in SIGNALS}
+
+    def column(key):
+        return np.concatenate([shard[key] for shard in shards])
+
+    patient_ids = column('patient_id')
+    emotion = column('emotion.prediction').astype(float)
+    emotion[emotion < 0] = np.nan
+    flat = {
+        'heart_rate': column('heartbeat.heart_rate'),
+        'posture_score': column('posture.score'),
+        'distress': np.where(np.isnan(emotion), np.nan, np.isin(emotion, DISTRESS_STATES))
+    }
+
+    # Group reports by patient, oldest first
+    order = np.lexsort((column('report_id'), column('date'), patient_ids))
+    arrays = {}
+    patients = None
+    for name, values in flat.items():
+        patients, arrays[name] = pad_columns(patient_ids[order], values[order])
+    return patients, arrays
+
+
+def load_scored_ndjson(path):
+    """Load NDJSON output from utils.score_cohort into padded arrays"""
+    histories = {}
+    with open(path, 'r') as f:
+        for line in f:
+            record = json.loads(line)
+            histories.setdefault(record['patient_id'], []).append(
+                (record['date'], record['report_id'], record['predictions'])
+            )
+    patients = sorted(histories)
+    ordered = [[item[2] for item in sorted(histories[pid], key=lambda r: r[:2])] for pid in patients]
+    return np.array(patients), build_signal_arrays(ordered)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Flag deteriorating patients from cohort scores')
+    parser.add_argument('scores', help='NDJSON file or .npz shard directory from utils.score_cohort')
+    parser.add_argument('--output', default='-', help='Alert NDJSON path (default stdout)')
+    args = parser.parse_args()
+
+    if os.path.isdir(args.scores):
+        patients, arrays = load_scored_shards(args.scores)
+    else:
+        patients, arrays = load_scored_ndjson(args.scores)
+    results = detect_deterioration(arrays)
+
+    flagged = np.zeros(len(patients), dtype=bool)
+    for result in results.values():
+        flagged |= result['alarm']
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        for row in np.flatnonzero(flagged):
+            alerts = [
+                {'signal': name,
+                 'statistic': round(float(result['statistic'][row]), 3),
+                 'first_alarm_report': int(result['first_alarm'][row])}
+                for name, result in results.items() if result['alarm'][row]
+            ]
+            out.write(json.dumps({'patient_id': str(patients[row]), 'alerts': alerts}) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"⚠️  {int(flagged.sum())} of {len(patients)} patients deteriorating", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,431 @@
+"""
+Differential Testing Harness
+Checks every inference path against the saved models' own scikit-learn
+predict/predict_proba on randomized and boundary inputs
+
+Random rows are drawn from the utils/generate_data.py distributions for
+both patient types. Boundary rows move one feature at a time, from the
+median row, to its observed minimum and maximum, zero, far outside the
+range, and onto the split thresholds of tree models and the nearest
+doubles either side of them. Each engine must return the reference label
+for every row, and confidences (and posture scores) within --tolerance.
+Engines scoring one report per call see an evenly spaced subset of the
+cases (--row-cases), since a forest costs milliseconds per call.
+Any mismatch exits with status 1, so the harness gates CI and the rollout
+of a fast path. --budget sets a per-engine latency ceiling in us/report;
+an engine slower than its budget fails the run too, making it a
+performance gate. tests/test_differential.py runs the same checks under
+pytest, one test per engine.
+
+Usage:
+    python -m utils.differential
+    python -m utils.differential --rows 20000 --engines predict_batch cascade --output differential.json
+    python -m utils.differential --engines remote --socket /tmp/rehabsense-inference.sock
+    python -m utils.differential --engines predict_batch cascade --budget predict_batch=200 cascade=150
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.inference as inference
+from utils.columnar import PatientColumns
+from utils.generate_data import (generate_breathing_data, generate_emotion_data, generate_glucose_data,
+                                 generate_heartbeat_data, generate_posture_data, generate_speech_data)
+from utils.inference import (CASCADE_FILE, DEFAULT_CONFIDENCE, MODEL_FEATURES, PROBA_MODELS,
+                             FanoutExecutor, ModelInference, load_cascade)
+from utils.prediction_cache import PredictionCache
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+GENERATORS = {
+    'heartbeat': generate_heartbeat_data,
+    'glucose': generate_glucose_data,
+    'breathing': generate_breathing_data,
+    'speech': generate_speech_data,
+    'emotion': generate_emotion_data,
+    'posture': generate_posture_data
+}
+
+ENGINES = ('predict_all', 'prediction_cache', 'fanout', 'predict_batch', 'predict_columns',
+           'cascade', 'remote')
+
+# Engines that score one report per call
+ROW_ENGINES = ('predict_all', 'prediction_cache', 'fanout')
+
+# Multiples of a feature's observed span placed beyond either end of it
+OUTSIDE_SPANS = (0.5, 10.0)
+
+MAX_EXAMPLES = 5
+
+# Defaults shared by the command line, train_all.py and the pytest suite
+DEFAULT_ROWS = 5000
+DEFAULT_ROW_CASES = 500
+DEFAULT_SEED = 42
+DEFAULT_THRESHOLDS = 256
+DEFAULT_TOLERANCE = 1e-9
+
+
+def parse_budgets(items):
+    """{engine: us/report} from "engine=us" items (or one comma-separated string)"""
+    if isinstance(items, str):
+        items = items.split(',')
+    budgets = {}
+    for item in items:
+        if not item.strip():
+            continue
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in ENGINES or not value:
+            raise ValueError(f"Bad budget {item!r}; use engine=us with engine one of {', '.join(ENGINES)}")
+        budgets[name] = float(value)
+    return budgets
+
+
+def random_rows(n, seed):
+    """{modality: matrix} of n rows from the generators, half per patient type"""
+    np.random.seed(seed)
+    rows = {}
+    for name, generate in GENERATORS.items():
+        parts = [generate(max(2, n // 2), patient_type)[MODEL_FEATURES[name]] for patient_type in
+                 ('normal', 'improving')]
+        rows[name] = np.vstack([part.to_numpy(dtype=float) for part in parts])[:n]
+    return rows
+
+
+def _trees(model):
+    """(feature, threshold) arrays of every raw-feature tree inside a model"""
+    if hasattr(model, 'tree_'):
+        split = model.tree_.feature >= 0
+        yield model.tree_.feature[split], model.tree_.threshold[split]
+    for member in np.ravel(np.asarray(getattr(model, 'estimators_', []), dtype=object)):
+        yield from _trees(member)
+    for member in getattr(model, 'members', []):
+        yield from _trees(member)
+    for predictors in getattr(model, '_predictors', []):
+        for predictor in predictors:
+            nodes = predictor.nodes[~predictor.nodes['is_leaf'].astype(bool)]
+            yield nodes['feature_idx'], nodes['num_threshold']
+
+
+def tree_thresholds(model, n_features, limit):
+    """Up to limit distinct split thresholds per feature, evenly spread"""
+    found = [[] for _ in range(n_features)]
+    for features, thresholds in _trees(model):
+        for j in range(n_features):
+            found[j].append(thresholds[features == j])
+    spread = []
+    for values in found:
+        values = np.unique(np.concatenate(values)) if values else np.empty(0)
+        if len(values) > limit:
+            values = values[np.linspace(0, len(values) - 1, limit).astype(int)]
+        spread.append(values)
+    return spread
+
+
+def boundary_rows(model, sample, threshold_limit):
+    """Rows moving one feature of the median row onto its edge values"""
+    base = np.median(sample, axis=0)
+    low, high = sample.min(axis=0), sample.max(axis=0)
+    thresholds = tree_thresholds(model, sample.shape[1], threshold_limit)
+
+    rows = [low, high]
+    for j in range(sample.shape[1]):
+        span = max(high[j] - low[j], 1.0)
+        values = [low[j], high[j], 0.0]
+        values += [low[j] - k * span for k in OUTSIDE_SPANS] + [high[j] + k * span for k in OUTSIDE_SPANS]
+        values += [np.nextafter(low[j], -np.inf), np.nextafter(high[j], np.inf)]
+        for threshold in thresholds[j]:
+            values += [threshold, np.nextafter(threshold, -np.inf), np.nextafter(threshold, np.inf)]
+        block = np.repeat(base[None, :], len(values), axis=0)
+        block[:, j] = values
+        rows.append(block)
+    return np.vstack(rows)
+
+
+def build_cases(reference, n, seed, threshold_limit):
+    """{modality: matrix} of random then boundary rows"""
+    sampled = random_rows(n, seed)
+    return {
+        name: np.vstack([X, boundary_rows(reference.models[name], X, threshold_limit)])
+        for name, X in sampled.items()
+    }
+
+
+def subsample(cases, limit):
+    """Evenly spaced rows of each modality's cases, at most limit each"""
+    return {
+        name: X[np.unique(np.linspace(0, len(X) - 1, min(limit, len(X))).astype(int))]
+        for name, X in cases.items()
+    }
+
+
+def build_reports(cases):
+    """Report dicts carrying row i of every modality that has one"""
+    reports = []
+    for i in range(max(len(X) for X in cases.values())):
+        report = {'report_id': f'DIFF_R{i:06d}', 'date': '2026-01-01'}
+        for name, X in cases.items():
+            if i < len(X):
+                report[name] = dict(zip(MODEL_FEATURES[name], X[i].tolist()))
+        reports.append(report)
+    return reports
+
+
+def reference_outputs(reference, cases):
+    """Labels, confidences and posture scores straight from scikit-learn"""
+    outputs = {}
+    for name, X in cases.items():
+        model = reference.models[name]
+        labels = model.predict(X)
+        if name in PROBA_MODELS and hasattr(model, 'predict_proba'):
+            proba = model.predict_proba(X)
+            confidences = proba[np.arange(len(X)), np.searchsorted(model.classes_, labels)]
+        else:
+            confidences = np.full(len(X), DEFAULT_CONFIDENCE)
+        scores = None
+        if name == 'posture':
+            scores = np.array([reference._calculate_posture_score(*row) for row in X.tolist()])
+        outputs[name] = (labels, confidences, scores)
+    return outputs
+
+
+def collect(results, cases):
+    """Per-modality (labels, confidences, scores) from predict_all-shaped results"""
+    outputs = {}
+    for name, X in cases.items():
+        parts = [results[i][name] for i in range(len(X))]
+        outputs[name] = (
+            np.array([part['prediction'] for part in parts]),
+            np.array([part['confidence'] for part in parts], dtype=float),
+            np.array([part['score'] for part in parts], dtype=float) if name == 'posture' else None
+        )
+    return outputs
+
+
+@contextlib.contextmanager
+def fast_paths(cache=None, fanout=None):
+    """Install the process-wide prediction cache and fan-out pool for one engine"""
+    saved = inference._prediction_cache, inference._fanout
+    inference._prediction_cache, inference._fanout = cache, fanout
+    try:
+        yield
+    finally:
+        inference._prediction_cache, inference._fanout = saved
+
+
+def run_predict_all(engine, reports, cases):
+    with fast_paths():
+        return collect([engine.predict_all(report) for report in reports], cases)
+
+
+def run_prediction_cache(engine, reports, cases):
+    """Second pass over the reports, served from a cache the first pass filled"""
+    with fast_paths(cache=PredictionCache(max_entries=7 * len(reports), ttl=3600)):
+        for report in reports:
+            engine.predict_all(report)
+        return collect([engine.predict_all(report) for report in reports], cases)
+
+
+def run_fanout(engine, reports, cases, threads=4):
+    with fast_paths(fanout=FanoutExecutor(threads)):
+        return collect([engine.predict_all(report) for report in reports], cases)
+
+
+def run_predict_batch(engine, reports, cases, batch_size=1000):
+    with fast_paths():
+        results = []
+        for start in range(0, len(reports), batch_size):
+            results.extend(engine.predict_batch(reports[start:start + batch_size]))
+        return collect(results, cases)
+
+
+def run_predict_columns(engine, reports, cases):
+    """Columnar scoring as served by the history API"""
+    columns = PatientColumns.from_json({'patient_id': 'DIFF', 'reports': reports})
+    with fast_paths():
+        metrics = engine.format_columnar(columns, engine.predict_columns(columns))
+    outputs = {}
+    for name, X in cases.items():
+        arrays = metrics[name]
+        outputs[name] = (
+            np.array(arrays['prediction'][:len(X)]),
+            np.array(arrays['confidence'][:len(X)], dtype=float),
+            np.array(arrays['score'][:len(X)], dtype=float) if name == 'posture' else None
+        )
+    return outputs
+
+
+def compare(reference, outputs, cases, tolerance):
+    """Mismatch counts and the first few differing rows per modality"""
+    report = {}
+    for name, (labels, confidences, scores) in reference.items():
+        got_labels, got_confidences, got_scores = outputs[name]
+        label_mismatch = got_labels != labels
+        confidence_delta = np.abs(got_confidences - confidences)
+        deviates = confidence_delta > tolerance
+        score_delta = np.zeros(len(labels))
+        if scores is not None:
+            score_delta = np.abs(got_scores - scores)
+            deviates |= score_delta > tolerance
+        failing = np.flatnonzero(label_mismatch | deviates)
+        report[name] = {
+            'rows': len(labels),
+            'label_mismatches': int(label_mismatch.sum()),
+            'deviations': int(deviates.sum()),
+            'max_confidence_delta': float(confidence_delta.max()) if len(labels) else 0.0,
+            'max_score_delta': float(score_delta.max()) if len(labels) else 0.0,
+            'examples': [
+                {
+                    'row': int(i),
+                    'features': dict(zip(MODEL_FEATURES[name], cases[name][i].tolist())),
+                    'reference': [int(labels[i]), float(confidences[i])],
+                    'engine': [int(got_labels[i]), float(got_confidences[i])]
+                }
+                for i in failing[:MAX_EXAMPLES]
+            ]
+        }
+    return report
+
+
+def load_engines(models_dir, names, socket_path):
+    """{engine name: (ModelInference, runner)}, skipping engines that cannot run here"""
+    engine = ModelInference(models_dir)
+    # Keep the harness's synthetic rows out of drift monitoring
+    engine.drift = None
+    engines = {}
+    skipped = {}
+    for name in names:
+        if name == 'cascade':
+            path = os.path.join(models_dir, CASCADE_FILE)
+            if not os.path.exists(path):
+                skipped[name] = f'no {CASCADE_FILE}; run training/train_cascade.py'
+                continue
+            cascade = ModelInference(models_dir)
+            cascade.drift = None
+            cascade.cascade = load_cascade(path)
+            engines[name] = (cascade, run_predict_batch)
+        elif name == 'remote':
+            if not socket_path:
+                skipped[name] = 'no --socket given'
+                continue
+            from utils.inference_service import InferenceClient, RemoteInference
+            remote = RemoteInference(InferenceClient(socket_path))
+            if remote.version != engine.version:
+                skipped[name] = f'service runs version {remote.version}, not {engine.version}'
+                continue
+            engines[name] = (remote, run_predict_batch)
+        else:
+            engines[name] = (engine, globals()[f'run_{name}'])
+    return engine, engines, skipped
+
+
+def run(models_dir, names, rows=DEFAULT_ROWS, seed=DEFAULT_SEED, threshold_limit=DEFAULT_THRESHOLDS,
+        tolerance=DEFAULT_TOLERANCE, row_cases=DEFAULT_ROW_CASES, socket_path=None, budgets=None):
+    """Score the cases on every engine and compare each with the reference and its budget"""
+    budgets = budgets or {}
+    reference_engine, engines, skipped = load_engines(models_dir, names, socket_path)
+    cases = build_cases(reference_engine, rows, seed, threshold_limit)
+
+    start = time.perf_counter()
+    reference = reference_outputs(reference_engine, cases)
+    reference_seconds = time.perf_counter() - start
+
+    case_sets = {'all': (cases, build_reports(cases), reference)}
+    if any(name in ROW_ENGINES for name in engines):
+        sampled = subsample(cases, row_cases)
+        case_sets['rows'] = (sampled, build_reports(sampled), reference_outputs(reference_engine, sampled))
+
+    result = {
+        'version': reference_engine.version,
+        'cases': {name: len(X) for name, X in cases.items()},
+        'reports': len(case_sets['all'][1]),
+        'tolerance': tolerance,
+        'reference_seconds': round(reference_seconds, 3),
+        'engines': {},
+        'skipped': skipped
+    }
+    for name, (engine, runner) in engines.items():
+        engine_cases, reports, expected = case_sets['rows' if name in ROW_ENGINES else 'all']
+        start = time.perf_counter()
+        outputs = runner(engine, reports, engine_cases)
+        elapsed = time.perf_counter() - start
+        modalities = compare(expected, outputs, engine_cases, tolerance)
+        matches = not any(entry['label_mismatches'] or entry['deviations'] for entry in modalities.values())
+        us_per_report = round(elapsed / len(reports) * 1e6, 1)
+        budget = budgets.get(name)
+        within_budget = budget is None or us_per_report <= budget
+        result['engines'][name] = {
+            'passed': matches and within_budget,
+            'matches': matches,
+            'within_budget': within_budget,
+            'budget_us': budget,
+            'reports': len(reports),
+            'seconds': round(elapsed, 3),
+            'us_per_report': us_per_report,
+            'modalities': modalities
+        }
+    result['passed'] = all(entry['passed'] for entry in result['engines'].values())
+    return result
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Check RehabSense inference paths against scikit-learn')
+    parser.add_argument('--models-dir', default=os.path.join(PROJECT_ROOT, 'models'))
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES))
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help='Random rows per modality')
+    parser.add_argument('--row-cases', type=int, default=DEFAULT_ROW_CASES,
+                        help='Cases per modality for engines scoring one report per call')
+    parser.add_argument('--thresholds', type=int, default=DEFAULT_THRESHOLDS,
+                        help='Tree split thresholds probed per feature')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Largest allowed confidence or posture score deviation')
+    parser.add_argument('--budget', nargs='+', default=[], metavar='ENGINE=US',
+                        help='Fail an engine slower than this many us/report')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--socket', default=os.environ.get('REHABSENSE_INFERENCE_SOCKET'),
+                        help='Inference service socket for the remote engine')
+    parser.add_argument('--output', default=None, help='Write the full report as JSON')
+    args = parser.parse_args()
+    try:
+        budgets = parse_budgets(args.budget)
+    except ValueError as e:
+        parser.error(str(e))
+
+    result = run(args.models_dir, args.engines, args.rows, args.seed, args.thresholds,
+                 args.tolerance, args.row_cases, args.socket, budgets)
+
+    print(f"Models {result['version']}: {result['reports']} reports, cases per modality "
+          + ', '.join(f"{name} {count}" for name, count in result['cases'].items()))
+    print(f"Reference scikit-learn predict/predict_proba: {result['reference_seconds']}s\n")
+    for name, entry in result['engines'].items():
+        budget = f" (budget {entry['budget_us']:g})" if entry['budget_us'] is not None else ''
+        print(f"{'✅' if entry['passed'] else '❌'} {name:<18} {entry['reports']:>7} reports "
+              f"{entry['seconds']:>8}s {entry['us_per_report']:>10} us/report{budget}")
+        if not entry['within_budget']:
+            print(f"     over budget: {entry['us_per_report']} us/report > {entry['budget_us']:g}")
+        for modality, stats in entry['modalities'].items():
+            if stats['label_mismatches'] or stats['deviations']:
+                print(f"     {modality:<10} {stats['label_mismatches']} label mismatches, "
+                      f"{stats['deviations']} deviations (max confidence delta "
+                      f"{stats['max_confidence_delta']:.3g}, max score delta {stats['max_score_delta']:.3g})")
+    for name, reason in result['skipped'].items():
+        print(f"⏭️  {name:<18} skipped: {reason}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    sys.exit(0 if result['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
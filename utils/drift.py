@@ -0,0 +1,186 @@
+"""
+Drift Monitor Module
+Streaming fixed-bin histograms of live model inputs and predicted labels,
+compared against reference histograms saved at train time
+
+Each feature keeps one count per reference bin, so memory is constant
+however much traffic passes through. A single-row update is a bisect over
+about ten bin edges and a list increment per feature. Counts are updated
+without a lock: a rare lost increment under concurrent scoring is an
+acceptable price for staying on the hot path.
+"""
+
+import json
+import math
+import os
+from bisect import bisect_right
+
+import numpy as np
+
+# Written next to the model artifacts by training/drift_reference.py
+REFERENCE_FILE = 'drift_reference.json'
+
+# Population stability index thresholds, as commonly used for credit models
+PSI_WARN = 0.1
+PSI_DRIFT = 0.25
+
+# Observations needed before a score is meaningful
+MIN_SAMPLES = 100
+
+# Floor for empty bins so PSI stays finite
+EPSILON = 1e-4
+
+
+def psi(expected, actual):
+    """Population stability index between two count vectors"""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    e = np.maximum(expected / max(expected.sum(), 1), EPSILON)
+    a = np.maximum(actual / max(actual.sum(), 1), EPSILON)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks(expected, actual):
+    """Kolmogorov-Smirnov statistic between two binned distributions"""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    e = np.cumsum(expected) / max(expected.sum(), 1)
+    a = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(a - e)))
+
+
+def psi_gauges(report):
+    """{labels: psi} for every feature and label distribution of a report with enough samples"""
+    gauges = {}
+    for name, entry in report.items():
+        for feature, scores in entry['features'].items():
+            if scores['samples'] >= MIN_SAMPLES and math.isfinite(scores['psi']):
+                gauges[(('modality', name), ('feature', feature))] = scores['psi']
+        if entry['labels']['samples'] >= MIN_SAMPLES:
+            gauges[(('modality', name), ('feature', 'predicted_label'))] = entry['labels']['psi']
+    return gauges
+
+
+def status(score, n):
+    if n < MIN_SAMPLES:
+        return 'insufficient_data'
+    if score >= PSI_DRIFT:
+        return 'drift'
+    if score >= PSI_WARN:
+        return 'warn'
+    return 'stable'
+
+
+class DriftMonitor:
+    """Live input and prediction histograms for every model"""
+
+    def __init__(self, reference):
+        self.reference = reference
+        # Per modality: [(feature, edges, live counts)] in model column order
+        self._features = {}
+        self._edge_arrays = {}
+        self._labels = {}
+        for name, entry in reference['modalities'].items():
+            self._features[name] = [
+                (feature, spec['edges'], [0] * len(spec['counts']))
+                for feature, spec in entry['features'].items()
+            ]
+            self._edge_arrays[name] = [np.asarray(spec['edges']) for spec in entry['features'].values()]
+            self._labels[name] = [0] * len(entry['labels'])
+
+    @classmethod
+    def load(cls, models_dir):
+        """Monitor for the reference saved with the models, or None if there is none"""
+        path = os.path.join(models_dir, REFERENCE_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def observe(self, name, X, predictions):
+        """Count one scored feature matrix and its predicted labels"""
+        sketches = self._features.get(name)
+        if sketches is None:
+            return
+        labels = self._labels[name]
+        if len(X) == 1:
+            for value, (_, edges, counts) in zip(X[0].tolist(), sketches):
+                counts[bisect_right(edges, value)] += 1
+            label = int(predictions[0])
+            if 0 <= label < len(labels):
+                labels[label] += 1
+            return
+
+        for j, ((_, _, counts), edges) in enumerate(zip(sketches, self._edge_arrays[name])):
+            binned = np.bincount(np.searchsorted(edges, X[:, j], side='right'), minlength=len(counts))
+            for i, count in enumerate(binned.tolist()):
+                counts[i] += count
+        binned = np.bincount(np.asarray(predictions, dtype=np.int64), minlength=len(labels))
+        for i, count in enumerate(binned[:len(labels)].tolist()):
+            labels[i] += count
+
+    def drain(self):
+        """Live counts since the last drain, as {modality: {'features': [...], 'labels': [...]}}
+
+        Inference service workers hand these to the parent, which merges
+        every worker's traffic into one monitor.
+        """
+        drained = {}
+        for name, sketches in self._features.items():
+            features = []
+            for _, _, counts in sketches:
+                features.append(list(counts))
+                counts[:] = [0] * len(counts)
+            labels = self._labels[name]
+            drained[name] = {'features': features, 'labels': list(labels)}
+            labels[:] = [0] * len(labels)
+        return drained
+
+    def merge(self, drained):
+        """Add counts from another monitor's drain() over the same reference"""
+        for name, entry in drained.items():
+            sketches = self._features.get(name)
+            if sketches is None:
+                continue
+            for (_, _, counts), extra in zip(sketches, entry['features']):
+                for i, count in enumerate(extra[:len(counts)]):
+                    counts[i] += count
+            labels = self._labels[name]
+            for i, count in enumerate(entry['labels'][:len(labels)]):
+                labels[i] += count
+
+    def report(self):
+        """PSI and KS per feature and PSI of the predicted labels, per modality"""
+        modalities = {}
+        for name, sketches in self._features.items():
+            reference = self.reference['modalities'][name]
+            features = {}
+            for feature, _, counts in sketches:
+                expected = reference['features'][feature]['counts']
+                n = sum(counts)
+                score = psi(expected, counts)
+                features[feature] = {
+                    'samples': n,
+                    'psi': round(score, 4),
+                    'ks': round(ks(expected, counts), 4),
+                    'status': status(score, n)
+                }
+            expected = reference['labels']
+            counts = self._labels[name]
+            n = sum(counts)
+            score = psi(expected, counts)
+            modalities[name] = {
+                'features': features,
+                'labels': {
+                    'samples': n,
+                    'psi': round(score, 4),
+                    'status': status(score, n),
+                    'reference': [round(c / max(sum(expected), 1), 4) for c in expected],
+                    'live': [round(c / n, 4) if n else None for c in counts]
+                }
+            }
+        return modalities
+
+    def psi_gauges(self):
+        """{labels: psi} for every feature and label distribution with enough samples"""
+        return psi_gauges(self.report())
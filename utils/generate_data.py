@@ -204,6 +204,23 @@ def generate_patient_profile(patient_id, patient_type='normal', n_reports=10):
     
     return profile
 
+def generate_fleet(patients_dir, n_patients, n_reports=12, prefix='LT', seed=None):
+    """Write a fleet of synthetic patients, returning their ids"""
+    if seed is not None:
+        np.random.seed(seed)
+    os.makedirs(patients_dir, exist_ok=True)
+    
+    patient_ids = []
+    for i in range(n_patients):
+        patient_id = f'{prefix}{i:05d}'
+        patient_type = 'improving' if np.random.random() < 0.5 else 'normal'
+        profile = generate_patient_profile(patient_id, patient_type, n_reports=n_reports)
+        with open(os.path.join(patients_dir, f'patient_{patient_id}.json'), 'w') as f:
+            json.dump(profile, f, indent=2)
+        patient_ids.append(patient_id)
+    
+    return patient_ids
+
 def main():
     """Generate all datasets"""
     os.makedirs('data/training', exist_ok=True)
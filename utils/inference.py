@@ -3,10 +3,187 @@ Inference Module
 Loads trained models and performs predictions
 """
 
+import hashlib
 import joblib
+import json
 import numpy as np
 import pandas as pd
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.drift import DriftMonitor
+from utils.metrics import registry as metrics, time_stage
+from utils.prediction_cache import PredictionCache
+
+# Model input features per modality, in training column order
+MODEL_FEATURES = {
+    'heartbeat': ['heart_rate', 'rr_interval_variance'],
+    'glucose': ['age', 'bmi', 'meal_timing', 'activity_level'],
+    'breathing': ['breathing_rate', 'breath_depth', 'rest_vs_exercise'],
+    'speech': ['speech_rate', 'pause_frequency', 'pitch_variability'],
+    'emotion': ['text_sentiment', 'voice_emotion', 'facial_emotion'],
+    'posture': ['head_tilt', 'shoulder_alignment', 'spine_angle']
+}
+
+# Class labels per modality, indexed by model prediction
+MODEL_LABELS = {
+    'heartbeat': ['Normal', 'Bradycardia', 'Tachycardia', 'Irregular'],
+    'glucose': ['Low', 'Normal', 'High'],
+    'breathing': ['Normal', 'Shallow Breathing', 'Irregular', 'Apnea Risk'],
+    'speech': ['Normal Speech', 'Slurred/Slow', 'Stressed Speech'],
+    'emotion': ['Happy', 'Neutral', 'Stressed', 'Sad'],
+    'posture': ['Good Posture', 'Forward Head Posture', 'Slouched Sitting']
+}
+
+# Synthetic mid-range report used to smoke-test and warm up models
+SMOKE_REPORT = {
+    'heartbeat': {'heart_rate': 75.0, 'rr_interval_variance': 0.05},
+    'glucose': {'age': 50, 'bmi': 25.0, 'meal_timing': 1, 'activity_level': 1},
+    'breathing': {'breathing_rate': 16.0, 'breath_depth': 0.5, 'rest_vs_exercise': 0},
+    'speech': {'speech_rate': 150.0, 'pause_frequency': 0.15, 'pitch_variability': 0.3},
+    'emotion': {'text_sentiment': 0.5, 'voice_emotion': 0.5, 'facial_emotion': 0.5},
+    'posture': {'head_tilt': 0.0, 'shoulder_alignment': 0.0, 'spine_angle': 90.0}
+}
+
+# Result fields per modality and the (feature, type) each is taken from,
+# matching ModelInference._format_result
+RESULT_FIELDS = {
+    'heartbeat': {'heart_rate': ('heart_rate', float), 'rr_variance': ('rr_interval_variance', float)},
+    'glucose': {'age': ('age', int), 'bmi': ('bmi', float),
+                'meal_timing': ('meal_timing', int), 'activity_level': ('activity_level', int)},
+    'breathing': {'breathing_rate': ('breathing_rate', float), 'breath_depth': ('breath_depth', float)},
+    'speech': {'speech_rate': ('speech_rate', float), 'pause_frequency': ('pause_frequency', float)},
+    'emotion': {'text_sentiment': ('text_sentiment', float), 'voice_emotion': ('voice_emotion', float),
+                'facial_emotion': ('facial_emotion', float)},
+    'posture': {'head_tilt': ('head_tilt', float), 'shoulder_alignment': ('shoulder_alignment', float),
+                'spine_angle': ('spine_angle', float)}
+}
+
+# Models whose confidence comes from predict_proba
+PROBA_MODELS = ('heartbeat', 'glucose')
+DEFAULT_CONFIDENCE = 0.85
+
+# Labels that are not a focus area, matching recommendations.engine.is_issue
+NORMAL_LABELS = {
+    'heartbeat': ['Normal'],
+    'glucose': ['Normal'],
+    'breathing': ['Normal'],
+    'speech': ['Normal Speech'],
+    'emotion': ['Happy', 'Neutral'],
+    'posture': ['Good Posture']
+}
+
+# Optional first-stage screens written by training/train_cascade.py
+CASCADE_FILE = 'cascade.pkl'
+CASCADE_ENABLED = os.environ.get('REHABSENSE_CASCADE') == '1'
+CASCADE_THRESHOLD = float(os.environ.get('REHABSENSE_CASCADE_THRESHOLD', '0.99'))
+
+# Saved artifact per modality, in version digest order
+MODEL_FILES = {
+    'heartbeat': 'heartbeat_model.pkl',
+    'glucose': 'glucose_model.pkl',
+    'breathing': 'breathing_model.pkl',
+    'speech': 'speech_model.pkl',
+    'emotion': 'emotion_model.pkl',
+    'posture': 'posture_model.pkl'
+}
+
+# Build provenance written by training/train_all.py
+MANIFEST_FILE = 'manifest.json'
+
+def models_digest(models_dir):
+    """SHA-256 over the six model artifacts, the basis of the model version"""
+    digest = hashlib.sha256()
+    for filename in MODEL_FILES.values():
+        path = os.path.join(models_dir, filename)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file not found: {path}")
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest
+
+def load_manifest(models_dir):
+    """The build manifest in models_dir, or None if there is none"""
+    path = os.path.join(models_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def load_cascade(path):
+    """Screens from a cascade file that are safe to serve
+
+    A screen cannot reproduce a PROBA_MODELS confidence, and entries
+    without a training range predate the range check, so both are dropped
+    and those modalities run their full model.
+    """
+    cascade = {}
+    for name, entry in joblib.load(path).items():
+        if name in PROBA_MODELS:
+            print(f"⚠️  Ignoring cascade screen for {name}: its confidence comes from the full model")
+        elif 'low' not in entry or 'high' not in entry:
+            print(f"⚠️  Ignoring cascade screen for {name}: no training range, retrain with "
+                  f"training/train_cascade.py")
+        else:
+            cascade[name] = entry
+    return cascade
+
+def posture_scores(head_tilt, shoulder_alignment, spine_angle):
+    """Vectorized ModelInference._calculate_posture_score over arrays"""
+    head_dev = np.abs(head_tilt - 0) / 30
+    shoulder_dev = np.abs(shoulder_alignment - 0) / 20
+    spine_dev = np.abs(spine_angle - 90) / 30
+    avg_dev = (head_dev + shoulder_dev + spine_dev) / 3
+    return np.maximum(0, 100 - (avg_dev * 100))
+
+# Single-report results shared by every engine in the process; keys carry
+# the model version, so entries from before a reload are never served
+_prediction_cache = PredictionCache.from_env()
+
+class FanoutExecutor:
+    """Bounded thread pool for scoring one report's modalities concurrently
+    
+    Threads only overlap where scikit-learn and NumPy release the GIL, so
+    at best a report takes as long as its slowest model instead of the sum
+    of all six, and only on a multi-core host. A task finding no free slot
+    runs on the calling thread instead, so a saturated pool degrades to
+    sequential scoring rather than queueing behind other requests.
+    """
+    
+    def __init__(self, threads):
+        self.threads = threads
+        self._pid = None
+        self._lock = threading.Lock()
+        metrics.describe('rehabsense_predict_fanout_inline_total',
+                         'Models scored on the request thread because the fan-out pool was busy')
+    
+    @classmethod
+    def from_env(cls):
+        """Build from REHABSENSE_PREDICT_FANOUT_THREADS; None when unset or 0"""
+        threads = int(os.environ.get('REHABSENSE_PREDICT_FANOUT_THREADS', '0'))
+        return cls(threads) if threads > 0 else None
+    
+    def submit(self, func, *args):
+        """Return a future, or None if the caller should run func itself"""
+        # Pool threads do not survive fork, so pre-forked workers build their own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(max_workers=self.threads,
+                                                    thread_name_prefix='predict-fanout')
+                    self._slots = threading.BoundedSemaphore(self.threads)
+                    self._pid = os.getpid()
+        if not self._slots.acquire(blocking=False):
+            metrics.inc('rehabsense_predict_fanout_inline_total')
+            return None
+        future = self._pool.submit(func, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+# Optional concurrent fan-out of the models inside predict_all
+_fanout = FanoutExecutor.from_env()
 
 class ModelInference:
     """Handles loading and inference for all six models"""
@@ -14,143 +191,181 @@ class ModelInference:
     def __init__(self, models_dir='models'):
         self.models_dir = models_dir
         self.models = {}
+        self.version = None
+        self.drift = None
+        self.cascade = None
+        self.provenance = None
         self.load_models()
     
     def load_models(self):
         """Load all trained models"""
-        model_files = {
-            'heartbeat': 'heartbeat_model.pkl',
-            'glucose': 'glucose_model.pkl',
-            'breathing': 'breathing_model.pkl',
-            'speech': 'speech_model.pkl',
-            'emotion': 'emotion_model.pkl',
-            'posture': 'posture_model.pkl'
-        }
+        # Version is a digest of the artifacts, so caches can key on it
+        digest = models_digest(self.models_dir)
         
-        for name, filename in model_files.items():
-            path = os.path.join(self.models_dir, filename)
-            if os.path.exists(path):
-                self.models[name] = joblib.load(path)
+        for name, filename in MODEL_FILES.items():
+            self.models[name] = joblib.load(os.path.join(self.models_dir, filename))
+        
+        # The manifest describes these artifacts only if it was written for the same digest
+        manifest = load_manifest(self.models_dir)
+        if manifest is not None:
+            if manifest.get('version') == digest.hexdigest()[:12]:
+                self.provenance = manifest
             else:
-                raise FileNotFoundError(f"Model file not found: {path}")
-    
-    def predict_heartbeat(self, heart_rate, rr_interval_variance):
-        """Predict heartbeat abnormality"""
-        X = np.array([[heart_rate, rr_interval_variance]])
-        prediction = self.models['heartbeat'].predict(X)[0]
+                print(f"⚠️  {MANIFEST_FILE} was written for version {manifest.get('version')}, "
+                      f"not the models in {self.models_dir}; ignoring it")
         
-        labels = ['Normal', 'Bradycardia', 'Tachycardia', 'Irregular']
-        status = labels[prediction]
+        # Screened results can differ from the full models', so they version differently
+        cascade_path = os.path.join(self.models_dir, CASCADE_FILE)
+        if CASCADE_ENABLED and os.path.exists(cascade_path):
+            with open(cascade_path, 'rb') as f:
+                digest.update(f.read())
+            digest.update(repr(CASCADE_THRESHOLD).encode('utf-8'))
+            self.cascade = load_cascade(cascade_path)
+            metrics.describe('rehabsense_cascade_rows_total',
+                             'Rows answered by the cascade screen or escalated to the full model')
         
-        # Calculate confidence/score
-        if hasattr(self.models['heartbeat'], 'predict_proba'):
-            proba = self.models['heartbeat'].predict_proba(X)[0]
-            confidence = float(proba[prediction])
-        else:
-            confidence = 0.85
+        self.version = digest.hexdigest()[:12]
         
-        return {
-            'status': status,
-            'prediction': int(prediction),
-            'confidence': confidence,
-            'heart_rate': float(heart_rate),
-            'rr_variance': float(rr_interval_variance)
-        }
+        # Live input histograms, when a train-time reference was saved
+        self.drift = DriftMonitor.load(self.models_dir)
     
-    def predict_glucose(self, age, bmi, meal_timing, activity_level):
-        """Predict glucose range"""
-        X = np.array([[age, bmi, meal_timing, activity_level]])
-        prediction = self.models['glucose'].predict(X)[0]
-        
-        labels = ['Low', 'Normal', 'High']
-        range_label = labels[prediction]
-        
-        if hasattr(self.models['glucose'], 'predict_proba'):
-            proba = self.models['glucose'].predict_proba(X)[0]
-            confidence = float(proba[prediction])
+    @property
+    def scored_version(self):
+        """Version of the models that produced this thread's latest scores"""
+        return self.version
+    
+    def smoke_test(self):
+        """Check every model returns a valid label for a synthetic report"""
+        # The synthetic report is not live traffic, so keep it out of drift
+        drift, self.drift = self.drift, None
+        try:
+            single = self.predict_all(SMOKE_REPORT)
+            batch = self.predict_batch([SMOKE_REPORT])[0]
+        finally:
+            self.drift = drift
+        for name, labels in MODEL_LABELS.items():
+            if name not in single or not 0 <= single[name]['prediction'] < len(labels):
+                raise ValueError(f"Smoke test failed for {name} model: {single.get(name)}")
+        if single != batch:
+            raise ValueError("Smoke test failed: batch and single predictions differ")
+        return single
+    
+    def _score(self, name, X):
+        """Run one model on a feature matrix, returning predictions and confidences"""
+        if self.cascade is not None and name in self.cascade:
+            predictions, confidences = self._score_cascade(name, X)
         else:
-            confidence = 0.85
+            predictions, confidences = self._score_full(name, X)
         
-        return {
-            'range': range_label,
-            'prediction': int(prediction),
-            'confidence': confidence,
-            'age': int(age),
-            'bmi': float(bmi),
-            'meal_timing': int(meal_timing),
-            'activity_level': int(activity_level)
-        }
-    
-    def predict_breathing(self, breathing_rate, breath_depth, rest_vs_exercise):
-        """Predict breathing irregularity"""
-        X = np.array([[breathing_rate, breath_depth, rest_vs_exercise]])
-        prediction = self.models['breathing'].predict(X)[0]
+        if self.drift is not None:
+            self.drift.observe(name, X, predictions)
         
-        labels = ['Normal', 'Shallow Breathing', 'Irregular', 'Apnea Risk']
-        status = labels[prediction]
+        return predictions, confidences
+    
+    def _score_cascade(self, name, X):
+        """Answer confidently normal rows from the screen, escalating the rest to the full model"""
+        entry = self.cascade[name]
+        proba = entry['screen'].predict_proba(X)
+        best = np.argmax(proba, axis=1)
+        predictions = entry['screen'].classes_[best]
+        purity = proba[np.arange(len(X)), best]
+        accepted = (purity >= CASCADE_THRESHOLD) & np.isin(predictions, entry['normal'])
+        # Trees do not extrapolate, so rows outside the training range are escalated
+        accepted &= ((X >= entry['low']) & (X <= entry['high'])).all(axis=1)
+        escalated = np.flatnonzero(~accepted)
         
-        confidence = 0.85
+        metrics.inc('rehabsense_cascade_rows_total', (('modality', name), ('stage', 'screen')),
+                    len(X) - len(escalated))
+        metrics.inc('rehabsense_cascade_rows_total', (('modality', name), ('stage', 'escalated')),
+                    len(escalated))
         
-        return {
-            'status': status,
-            'prediction': int(prediction),
-            'confidence': confidence,
-            'breathing_rate': float(breathing_rate),
-            'breath_depth': float(breath_depth)
-        }
+        confidences = np.full(len(X), DEFAULT_CONFIDENCE)
+        if len(escalated):
+            full_predictions, full_confidences = self._score_full(name, X[escalated])
+            predictions = predictions.copy()
+            predictions[escalated] = full_predictions
+            confidences[escalated] = full_confidences
+        return predictions, confidences
     
-    def predict_speech(self, speech_rate, pause_frequency, pitch_variability):
-        """Predict speech pattern"""
-        X = np.array([[speech_rate, pause_frequency, pitch_variability]])
-        prediction = self.models['speech'].predict(X)[0]
+    def _score_full(self, name, X):
+        """Run the full model on a feature matrix"""
+        model = self.models[name]
+        predictions = model.predict(X)
         
-        labels = ['Normal Speech', 'Slurred/Slow', 'Stressed Speech']
-        pattern = labels[prediction]
-        
-        confidence = 0.85
+        # Calculate confidence/score
+        if name in PROBA_MODELS and hasattr(model, 'predict_proba'):
+            proba = model.predict_proba(X)
+            confidences = proba[np.arange(len(predictions)), predictions]
+        else:
+            confidences = np.full(len(predictions), DEFAULT_CONFIDENCE)
         
-        return {
-            'pattern': pattern,
-            'prediction': int(prediction),
-            'confidence': confidence,
-            'speech_rate': float(speech_rate),
-            'pause_frequency': float(pause_frequency)
-        }
+        return predictions, confidences
     
-    def predict_emotion(self, text_sentiment, voice_emotion, facial_emotion):
-        """Predict emotional state"""
-        X = np.array([[text_sentiment, voice_emotion, facial_emotion]])
-        prediction = self.models['emotion'].predict(X)[0]
+    def _format_result(self, name, row, prediction, confidence):
+        """Build the result dict for one modality from its raw feature row"""
+        label = MODEL_LABELS[name][prediction]
+        confidence = float(confidence)
         
-        labels = ['Happy', 'Neutral', 'Stressed', 'Sad']
-        state = labels[prediction]
+        if name == 'heartbeat':
+            heart_rate, rr_interval_variance = row
+            return {
+                'status': label,
+                'prediction': int(prediction),
+                'confidence': confidence,
+                'heart_rate': float(heart_rate),
+                'rr_variance': float(rr_interval_variance)
+            }
         
-        confidence = 0.85
+        if name == 'glucose':
+            age, bmi, meal_timing, activity_level = row
+            return {
+                'range': label,
+                'prediction': int(prediction),
+                'confidence': confidence,
+                'age': int(age),
+                'bmi': float(bmi),
+                'meal_timing': int(meal_timing),
+                'activity_level': int(activity_level)
+            }
         
-        return {
-            'state': state,
-            'prediction': int(prediction),
-            'confidence': confidence,
-            'text_sentiment': float(text_sentiment),
-            'voice_emotion': float(voice_emotion),
-            'facial_emotion': float(facial_emotion)
-        }
-    
-    def predict_posture(self, head_tilt, shoulder_alignment, spine_angle):
-        """Predict posture quality"""
-        X = np.array([[head_tilt, shoulder_alignment, spine_angle]])
-        prediction = self.models['posture'].predict(X)[0]
+        if name == 'breathing':
+            breathing_rate, breath_depth, _ = row
+            return {
+                'status': label,
+                'prediction': int(prediction),
+                'confidence': confidence,
+                'breathing_rate': float(breathing_rate),
+                'breath_depth': float(breath_depth)
+            }
+        
+        if name == 'speech':
+            speech_rate, pause_frequency, _ = row
+            return {
+                'pattern': label,
+                'prediction': int(prediction),
+                'confidence': confidence,
+                'speech_rate': float(speech_rate),
+                'pause_frequency': float(pause_frequency)
+            }
         
-        labels = ['Good Posture', 'Forward Head Posture', 'Slouched Sitting']
-        posture_type = labels[prediction]
+        if name == 'emotion':
+            text_sentiment, voice_emotion, facial_emotion = row
+            return {
+                'state': label,
+                'prediction': int(prediction),
+                'confidence': confidence,
+                'text_sentiment': float(text_sentiment),
+                'voice_emotion': float(voice_emotion),
+                'facial_emotion': float(facial_emotion)
+            }
+        
+        head_tilt, shoulder_alignment, spine_angle = row
         
         # Calculate posture score (0-100)
         score = self._calculate_posture_score(head_tilt, shoulder_alignment, spine_angle)
         
-        confidence = 0.85
-        
         return {
-            'posture': posture_type,
+            'posture': label,
             'prediction': int(prediction),
             'score': float(score),
             'confidence': confidence,
@@ -159,6 +374,49 @@ class ModelInference:
             'spine_angle': float(spine_angle)
         }
     
+    def _predict_one(self, name, *row):
+        """Score a single feature row for one modality"""
+        key = None
+        if _prediction_cache is not None:
+            key = _prediction_cache.key(self.version, name, row)
+            cached = _prediction_cache.get(key) if key is not None else None
+            if cached is not None:
+                # Hits never reach _score, but they are still served traffic
+                if self.drift is not None:
+                    self.drift.observe(name, np.array([row]), (cached['prediction'],))
+                return cached
+        
+        X = np.array([row])
+        predictions, confidences = self._score(name, X)
+        result = self._format_result(name, row, predictions[0], confidences[0])
+        if key is not None:
+            _prediction_cache.put(_prediction_cache.key(self.scored_version, name, row), result)
+        return result
+    
+    def predict_heartbeat(self, heart_rate, rr_interval_variance):
+        """Predict heartbeat abnormality"""
+        return self._predict_one('heartbeat', heart_rate, rr_interval_variance)
+    
+    def predict_glucose(self, age, bmi, meal_timing, activity_level):
+        """Predict glucose range"""
+        return self._predict_one('glucose', age, bmi, meal_timing, activity_level)
+    
+    def predict_breathing(self, breathing_rate, breath_depth, rest_vs_exercise):
+        """Predict breathing irregularity"""
+        return self._predict_one('breathing', breathing_rate, breath_depth, rest_vs_exercise)
+    
+    def predict_speech(self, speech_rate, pause_frequency, pitch_variability):
+        """Predict speech pattern"""
+        return self._predict_one('speech', speech_rate, pause_frequency, pitch_variability)
+    
+    def predict_emotion(self, text_sentiment, voice_emotion, facial_emotion):
+        """Predict emotional state"""
+        return self._predict_one('emotion', text_sentiment, voice_emotion, facial_emotion)
+    
+    def predict_posture(self, head_tilt, shoulder_alignment, spine_angle):
+        """Predict posture quality"""
+        return self._predict_one('posture', head_tilt, shoulder_alignment, spine_angle)
+    
     def _calculate_posture_score(self, head_tilt, shoulder_alignment, spine_angle):
         """Calculate posture score from 0-100"""
         # Ideal values
@@ -181,70 +439,275 @@ class ModelInference:
     
     def predict_all(self, patient_data):
         """Run all predictions on patient data"""
+        if _fanout is not None:
+            return self._predict_all_fanout(patient_data)
+        
         results = {}
         
         # Heartbeat
         if 'heartbeat' in patient_data:
             hb = patient_data['heartbeat']
-            results['heartbeat'] = self.predict_heartbeat(
-                hb['heart_rate'],
-                hb['rr_interval_variance']
-            )
+            with time_stage('predict_heartbeat'):
+                results['heartbeat'] = self.predict_heartbeat(
+                    hb['heart_rate'],
+                    hb['rr_interval_variance']
+                )
         
         # Glucose
         if 'glucose' in patient_data:
             gl = patient_data['glucose']
-            results['glucose'] = self.predict_glucose(
-                gl['age'],
-                gl['bmi'],
-                gl['meal_timing'],
-                gl['activity_level']
-            )
+            with time_stage('predict_glucose'):
+                results['glucose'] = self.predict_glucose(
+                    gl['age'],
+                    gl['bmi'],
+                    gl['meal_timing'],
+                    gl['activity_level']
+                )
         
         # Breathing
         if 'breathing' in patient_data:
             br = patient_data['breathing']
-            results['breathing'] = self.predict_breathing(
-                br['breathing_rate'],
-                br['breath_depth'],
-                br['rest_vs_exercise']
-            )
+            with time_stage('predict_breathing'):
+                results['breathing'] = self.predict_breathing(
+                    br['breathing_rate'],
+                    br['breath_depth'],
+                    br['rest_vs_exercise']
+                )
         
         # Speech
         if 'speech' in patient_data:
             sp = patient_data['speech']
-            results['speech'] = self.predict_speech(
-                sp['speech_rate'],
-                sp['pause_frequency'],
-                sp['pitch_variability']
-            )
+            with time_stage('predict_speech'):
+                results['speech'] = self.predict_speech(
+                    sp['speech_rate'],
+                    sp['pause_frequency'],
+                    sp['pitch_variability']
+                )
         
         # Emotion
         if 'emotion' in patient_data:
             em = patient_data['emotion']
-            results['emotion'] = self.predict_emotion(
-                em['text_sentiment'],
-                em['voice_emotion'],
-                em['facial_emotion']
-            )
+            with time_stage('predict_emotion'):
+                results['emotion'] = self.predict_emotion(
+                    em['text_sentiment'],
+                    em['voice_emotion'],
+                    em['facial_emotion']
+                )
         
         # Posture
         if 'posture' in patient_data:
             ps = patient_data['posture']
-            results['posture'] = self.predict_posture(
-                ps['head_tilt'],
-                ps['shoulder_alignment'],
-                ps['spine_angle']
-            )
+            with time_stage('predict_posture'):
+                results['posture'] = self.predict_posture(
+                    ps['head_tilt'],
+                    ps['shoulder_alignment'],
+                    ps['spine_angle']
+                )
+        
+        return results
+    
+    def _timed_predict(self, name, row):
+        with time_stage(f'predict_{name}'):
+            return self._predict_one(name, *row)
+    
+    def _predict_all_fanout(self, patient_data):
+        """predict_all with the modalities scored concurrently on the fan-out pool"""
+        names = [name for name in MODEL_FEATURES if name in patient_data]
+        rows = {name: [patient_data[name][feature] for feature in MODEL_FEATURES[name]] for name in names}
+        
+        # The first modality runs here while the pool works on the rest
+        futures = {name: _fanout.submit(self._timed_predict, name, rows[name]) for name in names[1:]}
+        
+        # Merge in the sequential order, whatever order models finish in
+        results = {}
+        for name in names:
+            future = futures.get(name)
+            results[name] = future.result() if future is not None else self._timed_predict(name, rows[name])
+        return results
+    
+    def _score_many(self, matrices):
+        """Score {modality: feature matrix}, returning {modality: (predictions, confidences)}"""
+        scored = {}
+        for name, X in matrices.items():
+            with time_stage(f'batch_predict_{name}'):
+                scored[name] = self._score(name, X)
+        return scored
+    
+    def predict_columns(self, columns):
+        """Score a PatientColumns directly, one model call per modality
+        
+        Returns {modality: {'rows', 'prediction', 'confidence'}} arrays,
+        plus 'score' for posture, without building per-report dicts.
+        """
+        matrices = {}
+        row_indices = {}
+        for name, features in MODEL_FEATURES.items():
+            X, rows = columns.feature_matrix(name, features)
+            if X is None or not len(rows):
+                continue
+            matrices[name] = X
+            row_indices[name] = rows
+        
+        scored = {}
+        for name, (predictions, confidences) in self._score_many(matrices).items():
+            scored[name] = {'rows': row_indices[name], 'prediction': predictions, 'confidence': confidences}
+            if name == 'posture':
+                X = matrices[name]
+                scored[name]['score'] = posture_scores(X[:, 0], X[:, 1], X[:, 2])
+        return scored
+    
+    def format_columns(self, columns, scored):
+        """Expand predict_columns output into per-report predict_all dicts"""
+        results = [{} for _ in range(len(columns))]
+        for name, features in MODEL_FEATURES.items():
+            if name not in scored:
+                continue
+            values = [columns.columns[(name, feature)].tolist() for feature in features]
+            part = scored[name]
+            for row, prediction, confidence in zip(part['rows'].tolist(), part['prediction'], part['confidence']):
+                feature_row = [column[row] for column in values]
+                results[row][name] = self._format_result(name, feature_row, prediction, confidence)
+        return results
+    
+    def format_columnar(self, columns, scored):
+        """Expand predict_columns output into parallel per-metric arrays
+        
+        Predictions stay as integer codes into MODEL_LABELS; reports
+        without a modality hold None in its arrays.
+        """
+        n = len(columns)
+        metrics = {}
+        for name, part in scored.items():
+            rows = part['rows'].tolist()
+            arrays = {
+                'prediction': part['prediction'].astype(int).tolist(),
+                'confidence': part['confidence'].astype(float).tolist()
+            }
+            if name == 'posture':
+                arrays['score'] = part['score'].astype(float).tolist()
+            for field, (feature, cast) in RESULT_FIELDS[name].items():
+                arrays[field] = columns.columns[(name, feature)][part['rows']].astype(cast).tolist()
+            
+            metrics[name] = {}
+            for field, values in arrays.items():
+                padded = [None] * n
+                for row, value in zip(rows, values):
+                    padded[row] = value
+                metrics[name][field] = padded
+        return metrics
+    
+    def predict_batch(self, reports):
+        """Run all predictions on many reports, one model call per modality"""
+        results = [{} for _ in reports]
+        
+        matrices = {}
+        batches = {}
+        for name, features in MODEL_FEATURES.items():
+            indices = [i for i, report in enumerate(reports) if name in report]
+            if not indices:
+                continue
+            
+            rows = [[reports[i][name][feature] for feature in features] for i in indices]
+            matrices[name] = np.array(rows, dtype=float)
+            batches[name] = (indices, rows)
+        
+        for name, (predictions, confidences) in self._score_many(matrices).items():
+            indices, rows = batches[name]
+            for i, row, prediction, confidence in zip(indices, rows, predictions, confidences):
+                results[i][name] = self._format_result(name, row, prediction, confidence)
         
         return results
 
 # Singleton instance
 _inference_engine = None
+_reload_lock = threading.Lock()
 
 def get_inference_engine(models_dir='models'):
     """Get or create inference engine singleton"""
     global _inference_engine
     if _inference_engine is None:
         _inference_engine = ModelInference(models_dir)
-    return _inference_engine
\ No newline at end of file
+    return _inference_engine
+
+def set_inference_engine(engine):
+    """Install an engine as the singleton, e.g. a remote inference client"""
+    global _inference_engine
+    _inference_engine = engine
+    return engine
+
+def reload_inference_engine(models_dir=None):
+    """Load fresh artifacts, smoke-test them and swap the singleton
+    
+    The swap is a single reference assignment, so requests that already
+    hold the old engine finish on it. Engines that score elsewhere reload
+    through their own reload() instead. Returns (engine, swapped).
+    """
+    global _inference_engine
+    with _reload_lock:
+        current = _inference_engine
+        if current is not None and hasattr(current, 'reload'):
+            return current, current.reload()
+        models_dir = models_dir or (current.models_dir if current else 'models')
+        candidate = ModelInference(models_dir)
+        candidate.smoke_test()
+        if current is not None and candidate.version == current.version:
+            return current, False
+        _inference_engine = candidate
+    return candidate, True
+
+class ModelWatcher:
+    """Polls the models directory and reports settled artifact changes"""
+    
+    def __init__(self, models_dir, interval=5.0, on_change=None):
+        self.models_dir = models_dir
+        self.interval = interval
+        self.on_change = on_change
+        self._signature = self._snapshot()
+        self._pending = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def _snapshot(self):
+        """(name, size, mtime) of every model artifact"""
+        signature = []
+        for name in sorted(os.listdir(self.models_dir)):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.models_dir, name))
+                signature.append((name, stat.st_size, stat.st_mtime_ns))
+        return tuple(signature)
+    
+    def poll(self):
+        """Return True once a change has been stable for one full interval"""
+        try:
+            signature = self._snapshot()
+        except OSError:
+            return False
+        if signature == self._signature:
+            self._pending = None
+            return False
+        # Wait for the files to stop changing before reporting (copies in progress)
+        if signature != self._pending:
+            self._pending = signature
+            return False
+        self._signature = signature
+        self._pending = None
+        return True
+    
+    def ensure_started(self):
+        """Start the polling thread in this process if not already running"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, daemon=True, name='model-watcher').start()
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if self.poll() and self.on_change is not None:
+                try:
+                    self.on_change()
+                except Exception as e:
+                    print(f"❌ Model reload failed, keeping current models: {e}")
@@ -0,0 +1,701 @@
+"""
+Inference Service Module
+Runs ModelInference in a pool of worker processes behind a Unix socket
+
+Web processes write feature matrices into a shared memory segment and
+send only a small JSON header over the socket; a worker scores the
+matrices in place and writes predictions and confidences back into the
+same segment. Model evaluation then runs on every core instead of behind
+one web process's GIL, and web and inference capacity scale separately.
+
+Workers hand their drift counts to the parent on every health ping, so
+the service's drift report covers the traffic of all workers.
+
+Usage:
+    python -m utils.inference_service --socket /tmp/rehabsense-inference.sock --workers 4
+    python -m utils.inference_service --socket /tmp/rehabsense-inference.sock --check
+
+Point the backend at the service with REHABSENSE_INFERENCE_SOCKET.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.drift import psi_gauges
+from utils.inference import ModelInference, ModelWatcher, get_inference_engine, reload_inference_engine
+from utils.metrics import time_stage
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_SOCKET = '/tmp/rehabsense-inference.sock'
+
+# Shared memory segments a worker keeps mapped between requests
+WORKER_SEGMENT_CACHE = 32
+
+
+class InferenceServiceError(RuntimeError):
+    """Raised when the inference service cannot score a request"""
+
+
+def send_frame(sock, payload):
+    """Send one length-prefixed JSON message"""
+    data = json.dumps(payload).encode('utf-8')
+    sock.sendall(struct.pack('!I', len(data)) + data)
+
+
+def recv_frame(sock):
+    """Receive one length-prefixed JSON message, or None if the peer closed"""
+    header = _recv_exact(sock, 4)
+    if header is None:
+        return None
+    (length,) = struct.unpack('!I', header)
+    data = _recv_exact(sock, length)
+    if data is None:
+        return None
+    return json.loads(data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def segment_layout(matrices):
+    """Byte offsets of each input matrix and its (rows, 2) output block"""
+    layout = []
+    offset = 0
+    for name, X in matrices.items():
+        rows, features = X.shape
+        layout.append({'model': name, 'rows': rows, 'features': features, 'offset': offset})
+        offset += rows * (features + 2) * 8
+    return layout, offset
+
+
+def _segment_views(buf, part):
+    """Input matrix and output block views for one layout entry"""
+    rows, features, offset = part['rows'], part['features'], part['offset']
+    X = np.ndarray((rows, features), dtype=np.float64, buffer=buf, offset=offset)
+    out = np.ndarray((rows, 2), dtype=np.float64, buffer=buf, offset=offset + X.nbytes)
+    return X, out
+
+
+def _attach_segment(segments, name):
+    """Map a client's segment, keeping recent mappings open"""
+    segment = segments.get(name)
+    if segment is not None:
+        segments.move_to_end(name)
+        return segment
+    segment = shared_memory.SharedMemory(name=name)
+    # The client owns the segment; don't let this process's tracker unlink it
+    resource_tracker.unregister(segment._name, 'shared_memory')
+    segments[name] = segment
+    while len(segments) > WORKER_SEGMENT_CACHE:
+        _, evicted = segments.popitem(last=False)
+        evicted.close()
+    return segment
+
+
+def _worker_main(conn, engine):
+    """Worker process body: score requests from the service until told to stop"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    segments = OrderedDict()
+    # Counts inherited from the parent are already in the parent's monitor
+    if engine.drift is not None:
+        engine.drift.drain()
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        if request['op'] == 'ping':
+            drift = engine.drift.drain() if engine.drift is not None else None
+            conn.send({'ok': True, 'version': engine.version, 'pid': os.getpid(), 'drift': drift})
+            continue
+        try:
+            buf = _attach_segment(segments, request['segment']).buf
+            for part in request['models']:
+                X, out = _segment_views(buf, part)
+                predictions, confidences = engine._score(part['model'], X)
+                out[:, 0] = predictions
+                out[:, 1] = confidences
+                del X, out
+            conn.send({'ok': True, 'version': engine.version})
+        except Exception as e:
+            conn.send({'ok': False, 'error': f"{type(e).__name__}: {e}"})
+    for segment in segments.values():
+        segment.close()
+    os._exit(0)
+
+
+class WorkerHandle:
+    """One worker process and the pipe used to talk to it"""
+
+    def __init__(self, process, conn, generation):
+        self.process = process
+        self.conn = conn
+        self.generation = generation
+        self.failed = False
+
+
+class InferenceService:
+    """Supervises scoring workers and serves clients on a Unix socket"""
+
+    def __init__(self, socket_path, models_dir, workers, request_timeout=30.0,
+                 health_interval=5.0, model_watcher=None):
+        self.socket_path = socket_path
+        self.models_dir = models_dir
+        self.workers = workers
+        self.request_timeout = request_timeout
+        self.health_interval = health_interval
+        self.model_watcher = model_watcher
+        self.context = multiprocessing.get_context('fork')
+        self.handles = []
+        self.idle = queue.Queue()
+        self.generation = 0
+        self.restarts = 0
+        self.sock = None
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._reload = False
+
+    @property
+    def engine(self):
+        return get_inference_engine(self.models_dir)
+
+    def spawn(self):
+        """Fork a worker sharing the parent's loaded models"""
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=_worker_main, args=(child_conn, self.engine),
+                                       daemon=True)
+        process.start()
+        child_conn.close()
+        handle = WorkerHandle(process, parent_conn, self.generation)
+        with self._lock:
+            self.handles.append(handle)
+        self.idle.put(handle)
+        return handle
+
+    def retire(self, handle):
+        """Stop a worker and forget it"""
+        handle.failed = True
+        with self._lock:
+            if handle in self.handles:
+                self.handles.remove(handle)
+        try:
+            handle.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        handle.process.join(1.0)
+        if handle.process.is_alive():
+            handle.process.kill()
+            handle.process.join()
+        handle.conn.close()
+
+    def checkout(self):
+        """Take an idle, healthy worker"""
+        deadline = time.monotonic() + self.request_timeout
+        while True:
+            try:
+                handle = self.idle.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise InferenceServiceError("No inference worker became available") from None
+            if not handle.failed:
+                return handle
+
+    def call(self, request):
+        """Send a request to a worker and wait for its reply"""
+        handle = self.checkout()
+        try:
+            handle.conn.send(request)
+            if not handle.conn.poll(self.request_timeout):
+                raise TimeoutError(f"worker {handle.process.pid} timed out")
+            reply = handle.conn.recv()
+        except (EOFError, OSError, TimeoutError) as e:
+            # The supervisor replaces failed workers
+            handle.failed = True
+            raise InferenceServiceError(f"Inference worker failed: {e}") from e
+        self.idle.put(handle)
+        # 'version' is the worker's models; during a reload it can trail the service's
+        reply['service_version'] = self.engine.version
+        return reply
+
+    def health(self):
+        """Pool status reported to clients and --check"""
+        with self._lock:
+            handles = list(self.handles)
+        alive = sum(1 for handle in handles if handle.process.is_alive() and not handle.failed)
+        return {
+            'ok': True,
+            'healthy': alive == self.workers,
+            'version': self.engine.version,
+            'workers': self.workers,
+            'alive': alive,
+            'idle': self.idle.qsize(),
+            'restarts': self.restarts
+        }
+
+    def drift_report(self):
+        """Drift across all workers, as of their last health ping"""
+        engine = self.engine
+        return {
+            'ok': True,
+            'version': engine.version,
+            'report': engine.drift.report() if engine.drift is not None else None
+        }
+
+    def models(self):
+        """Version and build provenance of the service's models"""
+        engine = self.engine
+        return {'ok': True, 'version': engine.version, 'provenance': engine.provenance}
+
+    def reload(self):
+        """Load new models in the parent; workers are replaced as they go idle"""
+        engine, swapped = reload_inference_engine(self.models_dir)
+        if swapped:
+            with self._lock:
+                self.generation += 1
+            print(f"🔄 Models reloaded in inference service, version {engine.version}")
+        return swapped
+
+    def supervise(self):
+        """Restart dead or failed workers and roll workers from older model versions"""
+        with self._lock:
+            handles = list(self.handles)
+        replaced = False
+        for handle in handles:
+            if handle.failed or not handle.process.is_alive():
+                print(f"⚠️  Inference worker {handle.process.pid} died, restarting")
+                self.retire(handle)
+                self.restarts += 1
+                self.spawn()
+                replaced = True
+        if replaced:
+            self._drain_idle(keep=lambda handle: True)
+
+        # Replace idle workers still holding an older model version;
+        # busy ones are picked up once they finish
+        with self._lock:
+            stale = any(handle.generation != self.generation for handle in self.handles)
+        if stale:
+            for handle in self._drain_idle(keep=lambda handle: handle.generation == self.generation):
+                self.retire(handle)
+                self.spawn()
+
+    def _drain_idle(self, keep):
+        """Drop failed workers from the idle queue; return the ones keep() rejects"""
+        idle = []
+        while True:
+            try:
+                idle.append(self.idle.get_nowait())
+            except queue.Empty:
+                break
+        rejected = []
+        for handle in idle:
+            if handle.failed:
+                continue
+            if keep(handle):
+                self.idle.put(handle)
+            else:
+                rejected.append(handle)
+        return rejected
+
+    def ping_idle(self):
+        """Health-check idle workers with a round trip and collect their drift counts"""
+        engine = self.engine
+        with self._lock:
+            count = len(self.handles)
+        for _ in range(count):
+            try:
+                handle = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                handle.conn.send({'op': 'ping'})
+                if not handle.conn.poll(min(self.request_timeout, 5.0)):
+                    raise TimeoutError
+                reply = handle.conn.recv()
+            except (EOFError, OSError, TimeoutError):
+                handle.failed = True
+                continue
+            self.idle.put(handle)
+            # Counts from workers still on older models don't belong in the new reference
+            if reply.get('drift') and engine.drift is not None and reply['version'] == engine.version:
+                engine.drift.merge(reply['drift'])
+
+    def bind(self):
+        """Listen on the Unix socket, replacing a stale socket file"""
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)
+            else:
+                raise InferenceServiceError(f"Inference service already running on {self.socket_path}")
+            finally:
+                probe.close()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        self.sock.listen(128)
+
+    def handle_client(self, conn):
+        """Serve one client connection until it closes"""
+        with conn:
+            while True:
+                try:
+                    request = recv_frame(conn)
+                except OSError:
+                    return
+                if request is None:
+                    return
+                op = request.get('op')
+                try:
+                    if op == 'score':
+                        reply = self.call(request)
+                    elif op == 'health':
+                        reply = self.health()
+                    elif op == 'drift':
+                        reply = self.drift_report()
+                    elif op == 'models':
+                        reply = self.models()
+                    elif op == 'reload':
+                        swapped = self.reload()
+                        reply = {'ok': True, 'swapped': swapped, 'version': self.engine.version}
+                    else:
+                        reply = {'ok': False, 'error': f"Unknown op: {op}"}
+                except Exception as e:
+                    reply = {'ok': False, 'error': str(e)}
+                try:
+                    send_frame(conn, reply)
+                except OSError:
+                    return
+
+    def accept_loop(self):
+        while not self._stopping:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.handle_client, args=(conn,), daemon=True).start()
+
+    def run(self):
+        """Start workers and serve until SIGTERM/SIGINT; SIGHUP reloads models"""
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        # Fork workers before any client threads exist
+        for _ in range(self.workers):
+            self.spawn()
+        self.bind()
+        threading.Thread(target=self.accept_loop, daemon=True, name='inference-accept').start()
+        print(f"✅ Inference service: {self.workers} workers on {self.socket_path} "
+              f"(version {self.engine.version})")
+
+        last_ping = time.monotonic()
+        while not self._stopping:
+            time.sleep(0.5)
+            if self._reload or (self.model_watcher is not None and self.model_watcher.poll()):
+                self._reload = False
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"❌ Model reload failed, keeping current models: {e}")
+            if time.monotonic() - last_ping >= self.health_interval:
+                self.ping_idle()
+                last_ping = time.monotonic()
+            self.supervise()
+
+        print("Shutting down inference workers...")
+        self.sock.close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+        with self._lock:
+            handles = list(self.handles)
+        for handle in handles:
+            self.retire(handle)
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_reload(self, signum, frame):
+        self._reload = True
+
+
+def _release_segment(segment):
+    segment.close()
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class _ClientState:
+    """Per-thread connection and segment; the segment is freed with it"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.sock = None
+        self.segment = None
+        self.finalizer = None
+        self.scored_version = None
+
+
+class InferenceClient:
+    """Thread-safe client; each thread keeps its own connection and segment"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.version = None
+        self._local = threading.local()
+
+    def _state(self):
+        state = getattr(self._local, 'state', None)
+        # Connections and segments are not shared across a fork
+        if state is None or state.pid != os.getpid():
+            state = self._local.state = _ClientState()
+        return state
+
+    def _connect(self, state):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise InferenceServiceError(f"Cannot reach inference service at {self.socket_path}: {e}") from e
+        state.sock = sock
+        return sock
+
+    def _discard(self, state, segment=False):
+        """Close this thread's connection and optionally give up its segment"""
+        if state.sock is not None:
+            state.sock.close()
+            state.sock = None
+        if segment and state.segment is not None:
+            state.finalizer()
+            state.segment = None
+
+    def _segment(self, state, size):
+        """This thread's shared memory segment, grown to fit"""
+        segment = state.segment
+        if segment is None or segment.size < size:
+            if segment is not None:
+                state.finalizer()
+            capacity = max(64 * 1024, 1 << (size - 1).bit_length())
+            segment = shared_memory.SharedMemory(create=True, size=capacity)
+            state.segment = segment
+            state.finalizer = weakref.finalize(state, _release_segment, segment)
+        return segment
+
+    def request(self, payload):
+        """Send one request, resending only if a reused connection had already closed
+
+        Once a request has been sent it may have run, so a timeout or a
+        dropped reply is never retried; the thread's segment is given up
+        too, since a worker may still be writing into it.
+        """
+        state = self._state()
+        for attempt in range(2):
+            reused = state.sock is not None
+            sock = state.sock or self._connect(state)
+            try:
+                send_frame(sock, payload)
+            except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError) as e:
+                # An incomplete frame is never executed by the service
+                self._discard(state)
+                if reused and attempt == 0:
+                    continue
+                raise InferenceServiceError(f"Inference service closed the connection: {e}") from e
+            except OSError as e:
+                self._discard(state, segment=True)
+                raise InferenceServiceError(f"Inference request failed: {e}") from e
+            try:
+                reply = recv_frame(sock)
+            except OSError as e:
+                self._discard(state, segment=True)
+                raise InferenceServiceError(f"Inference request failed: {e}") from e
+            if reply is None:
+                self._discard(state, segment=True)
+                raise InferenceServiceError("Inference service closed the connection")
+            break
+        if not reply.get('ok'):
+            raise InferenceServiceError(reply.get('error', 'Inference service error'))
+        version = reply.get('service_version', reply.get('version'))
+        if version is not None:
+            self.version = version
+        return reply
+
+    def score(self, matrices):
+        """Score {modality: matrix}, returning {modality: (predictions, confidences)}"""
+        matrices = {name: X for name, X in matrices.items() if len(X)}
+        if not matrices:
+            return {}
+        layout, size = segment_layout(matrices)
+        state = self._state()
+        segment = self._segment(state, size)
+        for part in layout:
+            X, _ = _segment_views(segment.buf, part)
+            X[:] = matrices[part['model']]
+            del X
+        reply = self.request({'op': 'score', 'segment': segment.name, 'models': layout})
+        state.scored_version = reply['version']
+
+        scored = {}
+        for part in layout:
+            _, out = _segment_views(segment.buf, part)
+            scored[part['model']] = (out[:, 0].astype(np.int64), out[:, 1].copy())
+            del out
+        return scored
+
+    @property
+    def scored_version(self):
+        """Version of the worker that answered this thread's latest score"""
+        state = self._state()
+        return state.scored_version or self.version
+
+    def health(self):
+        return self.request({'op': 'health'})
+
+    def drift(self):
+        return self.request({'op': 'drift'})['report']
+
+    def models(self):
+        return self.request({'op': 'models'})
+
+    def reload(self):
+        return self.request({'op': 'reload'})
+
+    def close(self):
+        """Close this thread's connection and segment"""
+        self._discard(self._state(), segment=True)
+
+
+class RemoteDrift:
+    """The inference service's drift monitor, seen from a web process"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def report(self):
+        """The service's report, or None when it has no drift reference"""
+        return self.client.drift()
+
+    def psi_gauges(self):
+        report = self.report()
+        return psi_gauges(report) if report is not None else {}
+
+
+class RemoteInference(ModelInference):
+    """ModelInference whose models run in an InferenceService
+
+    Formatting, recommendations and everything downstream stay in the web
+    process; only the feature matrices cross the socket, one round trip
+    per predict_all, predict_batch or predict_columns call. Drift and
+    provenance are the service's; the cascade, if any, runs in its workers.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.models_dir = None
+        self.models = {}
+        self.cascade = None
+        self.drift = RemoteDrift(client)
+        client.health()
+
+    @property
+    def version(self):
+        return self.client.version
+
+    @property
+    def scored_version(self):
+        return self.client.scored_version
+
+    @property
+    def provenance(self):
+        return self.client.models()['provenance']
+
+    def _score(self, name, X):
+        return self.client.score({name: X})[name]
+
+    def _score_many(self, matrices):
+        with time_stage('remote_score'):
+            return self.client.score(matrices)
+
+    def predict_all(self, patient_data):
+        return self.predict_batch([patient_data])[0]
+
+    def reload(self):
+        """Ask the service to reload its models; returns whether the version changed"""
+        return self.client.reload()['swapped']
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Run RehabSense model inference in worker processes')
+    parser.add_argument('--socket', default=os.environ.get('REHABSENSE_INFERENCE_SOCKET', DEFAULT_SOCKET))
+    parser.add_argument('--models-dir', default=os.path.join(PROJECT_ROOT, 'models'))
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('REHABSENSE_INFERENCE_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request worker timeout (s)')
+    parser.add_argument('--health-interval', type=float, default=5.0)
+    parser.add_argument('--watch', action='store_true', help='Reload when models/ changes')
+    parser.add_argument('--check', action='store_true', help='Query a running service and exit')
+    args = parser.parse_args()
+
+    if args.check:
+        try:
+            health = InferenceClient(args.socket, timeout=5.0).request({'op': 'health'})
+        except InferenceServiceError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(json.dumps(health))
+        sys.exit(0 if health['healthy'] else 1)
+
+    try:
+        get_inference_engine(args.models_dir).smoke_test()
+    except Exception as e:
+        print(f"❌ Error loading models: {e}")
+        sys.exit(1)
+
+    watcher = ModelWatcher(args.models_dir) if args.watch else None
+    service = InferenceService(args.socket, args.models_dir, args.workers, args.timeout,
+                               args.health_interval, watcher)
+    try:
+        service.run()
+    except InferenceServiceError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
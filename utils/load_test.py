@@ -0,0 +1,397 @@
+"""
+Load Test Module
+Open-loop load generator simulating a fleet of patient devices and clinicians
+
+Each synthetic patient logs in once; requests then arrive as a Poisson
+process at the target rate (optionally ramping up), drawn from a route
+mix. Latency is measured from each request's scheduled start, so time
+spent queued behind a saturated server counts against it.
+
+Usage:
+    python -m utils.load_test --url http://localhost:8000 --generate 200 --rate 20 --duration 60
+    python -m utils.load_test --url http://localhost:8000 --rate 5 --ramp-to 100 --duration 300 --output load.json
+"""
+
+import argparse
+import glob
+import http.cookiejar
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Default share of traffic per route: devices upload, clinicians browse
+DEFAULT_MIX = {
+    'predict': 4,
+    'dashboard': 2,
+    'history': 2,
+    'report': 1,
+    'progress': 1
+}
+
+# A window is saturated when it misses any of these
+SATURATION_THROUGHPUT = 0.9
+SATURATION_ERROR_RATE = 0.01
+
+
+def parse_mix(spec):
+    """Parse "route=weight,route=weight" into a dict"""
+    mix = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        route, weight = item.split('=', 1)
+        route = route.strip()
+        if route not in DEFAULT_MIX:
+            raise ValueError(f"Unknown route '{route}', expected one of {', '.join(DEFAULT_MIX)}")
+        mix[route] = float(weight)
+    return mix
+
+
+class PatientSession:
+    """One logged-in synthetic patient with its own cookie jar"""
+
+    def __init__(self, base_url, patient, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.patient_id = patient['patient_id']
+        self.reports = patient['reports']
+        self.timeout = timeout
+        self.uploads = itertools.count(1)
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def send(self, method, path, payload=None):
+        """Return (status, parsed JSON or None); raises on transport errors"""
+        data = None
+        headers = {}
+        if payload is not None:
+            data = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers,
+                                         method=method)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                body = response.read()
+                status = response.status
+                content_type = response.headers.get('Content-Type', '')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+        if content_type.startswith('application/json'):
+            return status, json.loads(body)
+        return status, None
+
+    def login(self):
+        status, body = self.send('POST', '/login', {'patient_id': self.patient_id})
+        return status == 200 and bool(body and body.get('success'))
+
+    def next_upload(self):
+        """A new dated report, reusing a recorded reading as the device payload"""
+        report = dict(random.choice(self.reports))
+        report['report_id'] = f"{self.patient_id}_LT{next(self.uploads):06d}"
+        report['date'] = date.today().isoformat()
+        return report
+
+
+def route_request(route, session):
+    """(method, path, payload) for one request to a route"""
+    if route == 'predict':
+        return 'POST', '/api/predict', {'report_data': session.next_upload()}
+    if route == 'dashboard':
+        return 'GET', '/dashboard', None
+    if route == 'history':
+        return 'GET', '/api/patient/history', None
+    if route == 'report':
+        return 'GET', f"/report/{random.choice(session.reports)['report_id']}", None
+    return 'GET', '/progress', None
+
+
+def load_fleet(patients_dir, limit=None, patient_ids=None):
+    """Read patient files to drive the test"""
+    if patient_ids is not None:
+        paths = [os.path.join(patients_dir, f'patient_{patient_id}.json') for patient_id in patient_ids]
+    else:
+        paths = sorted(glob.glob(os.path.join(patients_dir, 'patient_*.json')))
+    patients = []
+    for path in paths:
+        with open(path, 'r') as f:
+            patient = json.load(f)
+        if patient['reports']:
+            patients.append(patient)
+        if limit and len(patients) >= limit:
+            break
+    return patients
+
+
+def percentiles(latencies):
+    """p50/p90/p99/max in milliseconds"""
+    if not latencies:
+        return {'p50': None, 'p90': None, 'p99': None, 'max': None}
+    values = np.array(latencies) * 1000
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'p50': round(float(p50), 1), 'p90': round(float(p90), 1),
+            'p99': round(float(p99), 1), 'max': round(float(values.max()), 1)}
+
+
+class Recorder:
+    """Collects per-route outcomes, split into fixed reporting windows"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._window = []
+        self._all = []
+
+    def record(self, route, latency, ok):
+        with self._lock:
+            self._window.append((route, latency, ok))
+
+    def roll(self):
+        """Return and reset the current window"""
+        with self._lock:
+            window, self._window = self._window, []
+            self._all.extend(window)
+        return window
+
+    @staticmethod
+    def summarize(samples, elapsed):
+        routes = {}
+        for route, latency, ok in samples:
+            entry = routes.setdefault(route, {'latencies': [], 'errors': 0})
+            entry['latencies'].append(latency)
+            entry['errors'] += not ok
+        summary = {}
+        for route, entry in sorted(routes.items()):
+            count = len(entry['latencies'])
+            summary[route] = dict(
+                percentiles(entry['latencies']),
+                count=count,
+                throughput=round(count / elapsed, 2) if elapsed else None,
+                error_rate=round(entry['errors'] / count, 4)
+            )
+        total = len(samples)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        overall = dict(
+            percentiles([latency for _, latency, _ in samples]),
+            count=total,
+            throughput=round(total / elapsed, 2) if elapsed else None,
+            error_rate=round(errors / total, 4) if total else 0.0
+        )
+        return {'overall': overall, 'routes': summary}
+
+    def totals(self, elapsed):
+        with self._lock:
+            samples = list(self._all)
+        return self.summarize(samples, elapsed)
+
+
+class LoadTest:
+    """Schedules requests at the target arrival rate and records the results"""
+
+    def __init__(self, sessions, mix, rate, duration, ramp_to=None, concurrency=64,
+                 interval=10.0, slo_ms=None):
+        self.sessions = sessions
+        self.routes = list(mix)
+        self.weights = [mix[route] for route in self.routes]
+        self.rate = rate
+        self.ramp_to = ramp_to if ramp_to is not None else rate
+        self.duration = duration
+        self.concurrency = concurrency
+        self.interval = interval
+        self.slo_ms = slo_ms
+        self.recorder = Recorder()
+        self.windows = []
+        self.dropped = 0
+        self._pending = 0
+        self.start = None
+        self._lock = threading.Lock()
+
+    def offered_rate(self, elapsed):
+        """Target arrivals per second at a point in the run (linear ramp)"""
+        fraction = min(1.0, elapsed / self.duration) if self.duration else 1.0
+        return self.rate + (self.ramp_to - self.rate) * fraction
+
+    def execute(self, route, session, scheduled):
+        method, path, payload = route_request(route, session)
+        try:
+            status, body = session.send(method, path, payload)
+            ok = status < 400 and (body is None or body.get('success', True) is not False)
+        except Exception:
+            ok = False
+        self.recorder.record(route, time.perf_counter() - scheduled, ok)
+        with self._lock:
+            self._pending -= 1
+
+    def run(self):
+        start = self.start = time.perf_counter()
+        next_arrival = start
+        window_start = start
+        window_arrivals = 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='load') as executor:
+            while True:
+                now = time.perf_counter()
+                elapsed = now - start
+                if elapsed >= self.duration:
+                    arrivals_end = now
+                    break
+
+                if now - window_start >= self.interval:
+                    self.close_window(window_start, now, window_arrivals)
+                    window_start, window_arrivals = now, 0
+
+                if now < next_arrival:
+                    time.sleep(min(next_arrival - now, 0.05))
+                    continue
+
+                # Shed at the client rather than queueing without bound
+                with self._lock:
+                    if self._pending >= self.concurrency * 10:
+                        self.dropped += 1
+                        admit = False
+                    else:
+                        self._pending += 1
+                        admit = True
+                if admit:
+                    route = random.choices(self.routes, self.weights)[0]
+                    executor.submit(self.execute, route, random.choice(self.sessions), next_arrival)
+                window_arrivals += 1
+                next_arrival += random.expovariate(self.offered_rate(elapsed))
+
+        end = time.perf_counter()
+        if end - window_start > self.interval / 4:
+            self.close_window(window_start, end, window_arrivals, arrivals_end)
+        else:
+            self.recorder.roll()
+        return self.report(end - start)
+
+    def close_window(self, window_start, window_end, arrivals, arrivals_end=None):
+        elapsed = window_end - window_start
+        summary = self.recorder.summarize(self.recorder.roll(), elapsed)
+        # The last window also drains in-flight requests after arrivals stop
+        summary['offered'] = round(arrivals / ((arrivals_end or window_end) - window_start), 2)
+        summary['t'] = round(window_end - self.start, 1)
+        self.windows.append(summary)
+        print_window(summary)
+
+    def is_saturated(self, window):
+        overall = window['overall']
+        if window['offered'] and (overall['throughput'] or 0) < SATURATION_THROUGHPUT * window['offered']:
+            return True
+        if overall['error_rate'] > SATURATION_ERROR_RATE:
+            return True
+        return bool(self.slo_ms and overall['p99'] is not None and overall['p99'] > self.slo_ms)
+
+    def report(self, elapsed):
+        saturation = None
+        for window in self.windows:
+            if self.is_saturated(window):
+                saturation = {'t': window['t'], 'offered': window['offered']}
+                break
+        sustained = []
+        for window in self.windows:
+            if self.is_saturated(window):
+                break
+            sustained.append(window['overall']['throughput'])
+        return {
+            'duration': round(elapsed, 1),
+            'dropped': self.dropped,
+            'totals': self.recorder.totals(elapsed),
+            'windows': self.windows,
+            'max_sustained_throughput': max(sustained) if sustained else None,
+            'saturation': saturation
+        }
+
+
+def print_window(window):
+    overall = window['overall']
+    print(f"[{window['t']:>6.1f}s] offered {window['offered']:>7.1f}/s  "
+          f"achieved {overall['throughput'] or 0:>7.1f}/s  "
+          f"errors {overall['error_rate'] * 100:5.1f}%  p99 {overall['p99']} ms")
+    for route, stats in window['routes'].items():
+        print(f"           {route:<10} n={stats['count']:<6} p50 {stats['p50']:>8} ms  "
+              f"p90 {stats['p90']:>8} ms  p99 {stats['p99']:>8} ms  "
+              f"errors {stats['error_rate'] * 100:5.1f}%")
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Load test a RehabSense deployment')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--patients-dir', default=os.path.join(PROJECT_ROOT, 'data', 'loadtest', 'patients'),
+                        help="The server's patient directory (generated patients are written here); "
+                             "serve it with REHABSENSE_DATA_DIR set to its parent and REHABSENSE_LOAD_TEST=1")
+    parser.add_argument('--generate', type=int, default=0, metavar='N',
+                        help='Generate N synthetic patients with utils/generate_data.py first')
+    parser.add_argument('--reports', type=int, default=12, help='Reports per generated patient')
+    parser.add_argument('--prefix', default='LT', help='Patient id prefix for generated patients')
+    parser.add_argument('--patients', type=int, default=None, help='Use at most this many patients')
+    parser.add_argument('--mix', default=','.join(f'{route}={weight}' for route, weight in DEFAULT_MIX.items()))
+    parser.add_argument('--rate', type=float, default=10.0, help='Requests per second')
+    parser.add_argument('--ramp-to', type=float, default=None,
+                        help='Ramp the rate linearly to this value over the run')
+    parser.add_argument('--duration', type=float, default=60.0, help='Seconds')
+    parser.add_argument('--concurrency', type=int, default=64, help='Maximum in-flight requests')
+    parser.add_argument('--interval', type=float, default=10.0, help='Reporting window (s)')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--slo-ms', type=float, default=None, help='p99 latency considered saturated')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None, help='Write the full report as JSON')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    patient_ids = None
+    if args.generate:
+        from utils.generate_data import generate_fleet
+        print(f"Generating {args.generate} patients in {args.patients_dir}...")
+        patient_ids = generate_fleet(args.patients_dir, args.generate, n_reports=args.reports,
+                                     prefix=args.prefix, seed=args.seed)
+
+    patients = load_fleet(args.patients_dir, args.patients, patient_ids)
+    if not patients:
+        print(f"❌ No patients found in {args.patients_dir}")
+        sys.exit(1)
+
+    sessions = [PatientSession(args.url, patient, args.timeout) for patient in patients]
+    with ThreadPoolExecutor(max_workers=min(32, len(sessions))) as executor:
+        logged_in = list(executor.map(PatientSession.login, sessions))
+    sessions = [session for session, ok in zip(sessions, logged_in) if ok]
+    if not sessions:
+        print(f"❌ No patient could log in at {args.url}")
+        sys.exit(1)
+    print(f"✅ {len(sessions)} of {len(patients)} patients logged in")
+
+    test = LoadTest(sessions, parse_mix(args.mix), args.rate, args.duration, args.ramp_to,
+                    args.concurrency, args.interval, args.slo_ms)
+    result = test.run()
+
+    totals = result['totals']['overall']
+    print(f"\nTotal: {totals['count']} requests in {result['duration']}s, "
+          f"{totals['throughput']}/s, errors {totals['error_rate'] * 100:.2f}%, "
+          f"p50 {totals['p50']} ms, p99 {totals['p99']} ms, dropped {result['dropped']}")
+    if result['saturation']:
+        print(f"⚠️  Saturated at ~{result['saturation']['offered']}/s offered "
+              f"(t={result['saturation']['t']}s); "
+              f"max sustained {result['max_sustained_throughput']}/s")
+    else:
+        print("✅ No saturation observed at the tested rates")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
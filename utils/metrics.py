@@ -0,0 +1,188 @@
+"""
+Metrics Module
+Lightweight Prometheus-style counters, histograms and stage timers
+"""
+
+import os
+import resource
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds (upper bounds, +Inf is implicit)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative rendering"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Record a single observation"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe store for counters, histograms, gauges and cache stats"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._caches = {}
+        self._help = {}
+
+    def describe(self, name, help_text):
+        """Attach HELP text to a metric family"""
+        self._help[name] = help_text
+
+    def inc(self, name, labels=(), value=1):
+        """Increment a counter"""
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        """Record a histogram observation"""
+        key = (name, tuple(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    def register_gauge(self, name, func, help_text=None):
+        """Register a callable evaluated at scrape time"""
+        self._gauges[name] = func
+        if help_text:
+            self._help[name] = help_text
+
+    def record_cache(self, cache, hit):
+        """Record a cache lookup outcome"""
+        with self._lock:
+            stats = self._caches.setdefault(cache, [0, 0])
+            stats[0 if hit else 1] += 1
+
+    def cache_stats(self, cache):
+        """Return (hits, misses) for a cache"""
+        with self._lock:
+            hits, misses = self._caches.get(cache, (0, 0))
+        return hits, misses
+
+    def render(self):
+        """Render all metrics in Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (hist.buckets, list(hist.counts), hist.total, hist.count)
+                          for key, hist in self._histograms.items()}
+            caches = {name: tuple(stats) for name, stats in self._caches.items()}
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name in seen:
+                return
+            seen.add(name)
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = labels + (('le', _format_value(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            inf_labels = labels + (('le', '+Inf'),)
+            lines.append(f"{name}_bucket{_format_labels(inf_labels)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for cache, (hits, misses) in sorted(caches.items()):
+            labels = (('cache', cache),)
+            header('rehabsense_cache_hits_total', 'counter')
+            lines.append(f"rehabsense_cache_hits_total{_format_labels(labels)} {hits}")
+            header('rehabsense_cache_misses_total', 'counter')
+            lines.append(f"rehabsense_cache_misses_total{_format_labels(labels)} {misses}")
+            header('rehabsense_cache_hit_ratio', 'gauge')
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            lines.append(f"rehabsense_cache_hit_ratio{_format_labels(labels)} {_format_value(ratio)}")
+
+        for name, func in sorted(self._gauges.items()):
+            try:
+                value = func()
+            except Exception:
+                continue
+            header(name, 'gauge')
+            if isinstance(value, dict):
+                for labels, sample in sorted(value.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(sample)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    """Format label pairs as {k="v",...}"""
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    """Format a sample value"""
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def process_rss_bytes():
+    """Current resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Fall back to peak RSS (kilobytes on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Shared registry instance
+registry = MetricsRegistry()
+registry.describe('rehabsense_http_requests_total', 'HTTP requests by route, method and status')
+registry.describe('rehabsense_http_request_duration_seconds', 'HTTP request latency by route')
+registry.describe('rehabsense_stage_duration_seconds', 'Time spent in each request stage')
+registry.register_gauge('rehabsense_process_resident_memory_bytes', process_rss_bytes,
+                        'Resident set size of the serving process')
+
+
+@contextmanager
+def time_stage(stage):
+    """Time a block of work as a named request stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('rehabsense_stage_duration_seconds',
+                         time.perf_counter() - start, (('stage', stage),))
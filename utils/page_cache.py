@@ -0,0 +1,135 @@
+"""
+Page Cache Module
+Byte-budgeted LRU cache for rendered HTML (or any encoded response body)
+with optional disk persistence
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from utils.metrics import registry as metrics
+
+
+class PageCache:
+    """LRU of rendered pages bounded by total encoded size"""
+
+    def __init__(self, name, max_bytes=32 * 1024 * 1024, persist_dir=None,
+                 max_disk_bytes=None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.persist_dir = persist_dir
+        self.max_disk_bytes = max_disk_bytes if max_disk_bytes is not None else 4 * max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = 0
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+            self._disk_bytes = sum(
+                entry.stat().st_size for entry in os.scandir(persist_dir)
+                if entry.name.endswith('.html')
+            )
+        metrics.register_gauge(f'rehabsense_{name}_cache_bytes', lambda: self._bytes,
+                               f'Bytes held in the in-memory {name} cache')
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached page or None"""
+        body = self.get_bytes(key)
+        return body.decode('utf-8') if body is not None else None
+
+    def put(self, key, html):
+        """Store a rendered page"""
+        self.put_bytes(key, html.encode('utf-8'))
+
+    def get_bytes(self, key):
+        """Return the cached body bytes or None"""
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+        if body is None and self.persist_dir:
+            body = self._read_disk(key)
+            if body is not None:
+                self._remember(key, body)
+        metrics.record_cache(self.name, body is not None)
+        return body
+
+    def put_bytes(self, key, body):
+        """Store an encoded body"""
+        self._remember(key, body)
+        if self.persist_dir:
+            self._write_disk(key, body)
+
+    def clear(self):
+        """Drop all in-memory entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remember(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _read_disk(self, key):
+        path = os.path.join(self.persist_dir, self._digest(key) + '.html')
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, body):
+        path = os.path.join(self.persist_dir, self._digest(key) + '.html')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            # Overwriting a file replaces its bytes rather than adding to them
+            self._disk_bytes += len(body) - previous
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Remove the least recently written files until under the disk budget"""
+        files = []
+        for entry in os.scandir(self.persist_dir):
+            if entry.name.endswith('.html'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = self.max_disk_bytes * 3 // 4
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
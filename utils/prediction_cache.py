@@ -0,0 +1,70 @@
+"""
+Prediction Cache Module
+LRU memo of single-report model results with a time-to-live
+
+Entries are keyed per modality by the model version and the report's
+feature vector as floats (exactly what the model sees), so a resubmitted
+reading skips the model even when other modalities in the same payload
+changed, and a model reload can never serve a stale result.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics import registry as metrics
+
+
+class PredictionCache:
+    """Bounded LRU of formatted results with per-entry expiry"""
+
+    def __init__(self, max_entries=4096, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        metrics.register_gauge('rehabsense_prediction_cache_entries', lambda: len(self._entries),
+                               'Results held in the prediction cache')
+
+    @classmethod
+    def from_env(cls):
+        """Build from REHABSENSE_PREDICT_CACHE_* settings; None when disabled"""
+        max_entries = int(os.environ.get('REHABSENSE_PREDICT_CACHE_SIZE', '4096'))
+        if max_entries <= 0:
+            return None
+        return cls(max_entries, float(os.environ.get('REHABSENSE_PREDICT_CACHE_TTL', '300')))
+
+    @staticmethod
+    def key(version, name, row):
+        """Canonical key for one modality's feature row, or None if it is not numeric"""
+        try:
+            return (version, name, tuple(float(value) for value in row))
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, key):
+        """Return a copy of the cached result or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache(f'prediction_{key[1]}', entry is not None)
+        return dict(entry[1]) if entry is not None else None
+
+    def put(self, key, result):
+        """Store a result until it expires or is evicted"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, dict(result))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
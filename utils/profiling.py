@@ -0,0 +1,277 @@
+"""
+Profiling Module
+Opt-in per-request CPU profiling and allocation tracing with rotating output
+"""
+
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+MODES = ('sample', 'cprofile')
+
+# Concurrent memory captures share one tracemalloc session, stopped with the last
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_started = False
+
+
+def acquire_tracemalloc():
+    """Join the shared tracemalloc session, starting it if needed; returns a snapshot"""
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        if not _tracemalloc_users and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            _tracemalloc_started = True
+        _tracemalloc_users += 1
+        return tracemalloc.take_snapshot()
+
+
+def release_tracemalloc():
+    """Take a final snapshot and leave the session, stopping it if this was the last user"""
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        snapshot = tracemalloc.take_snapshot()
+        _tracemalloc_users -= 1
+        if not _tracemalloc_users and _tracemalloc_started:
+            tracemalloc.stop()
+            _tracemalloc_started = False
+        return snapshot
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval"""
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+
+def collapse_pstats(stats, min_weight=1e-6, max_depth=64):
+    """Expand cProfile caller/callee edges into collapsed stacks (microseconds)"""
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge
+
+    def label(func):
+        filename, line, name = func
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    collapsed = Counter()
+
+    def walk(func, path, fraction, visiting):
+        _, _, tottime, cumtime, _ = stats[func]
+        if tottime * fraction * 1e6 >= 1:
+            collapsed[";".join(path)] += int(tottime * fraction * 1e6)
+        if len(path) >= max_depth:
+            return
+        for callee, edge in callees.get(func, {}).items():
+            callee_cumtime = stats[callee][3]
+            if callee in visiting or not callee_cumtime:
+                continue
+            share = fraction * edge[3] / callee_cumtime
+            if share * callee_cumtime < min_weight:
+                continue
+            visiting.add(callee)
+            walk(callee, path + [label(callee)], min(share, 1.0), visiting)
+            visiting.discard(callee)
+
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            walk(func, [label(func)], 1.0, {func})
+    return collapsed
+
+
+class ProfileSession:
+    """A single in-progress request capture"""
+
+    def __init__(self, profiler, mode, trace_memory):
+        self.profiler = profiler
+        self.mode = mode
+        self.trace_memory = trace_memory
+        self._sampler = None
+        self._cprofile = None
+        self._snapshot = None
+        self._start = None
+
+    def start(self):
+        if self.trace_memory:
+            self._snapshot = acquire_tracemalloc()
+        if self.mode == 'cprofile':
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), self.profiler.interval)
+            self._sampler.start()
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self, route, path, status=None):
+        """Stop capturing and write the output files; returns the capture metadata"""
+        duration = time.perf_counter() - self._start
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+
+        allocations = None
+        if self._snapshot is not None:
+            after = release_tracemalloc()
+            allocations = after.compare_to(self._snapshot, 'lineno')[:50]
+
+        if self._cprofile is not None:
+            stats = pstats.Stats(self._cprofile).stats
+            collapsed = collapse_pstats(stats)
+        else:
+            collapsed = self._sampler.stacks
+
+        return self.profiler.write_capture(
+            route, path, status, self.mode, duration,
+            collapsed, self._cprofile, allocations
+        )
+
+
+class RequestProfiler:
+    """Decides which requests to profile and manages the capture directory"""
+
+    def __init__(self, output_dir, token=None, routes=(), sample_rate=0.0,
+                 mode='sample', trace_memory=False, keep=50, interval=0.001):
+        self.output_dir = output_dir
+        self.token = token
+        self.routes = set(routes)
+        self.sample_rate = sample_rate
+        self.mode = mode if mode in MODES else 'sample'
+        self.trace_memory = trace_memory
+        self.keep = keep
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, output_dir):
+        """Build a profiler from REHABSENSE_PROFILE_* environment variables"""
+        routes = os.environ.get(
+            'REHABSENSE_PROFILE_ROUTES',
+            '/api/predict,/api/patient/history,/report/<report_id>'
+        )
+        return cls(
+            os.environ.get('REHABSENSE_PROFILE_DIR', output_dir),
+            token=os.environ.get('REHABSENSE_ADMIN_TOKEN') or None,
+            routes=[r.strip() for r in routes.split(',') if r.strip()],
+            sample_rate=float(os.environ.get('REHABSENSE_PROFILE_SAMPLE_RATE', '0')),
+            mode=os.environ.get('REHABSENSE_PROFILE_MODE', 'sample'),
+            trace_memory=os.environ.get('REHABSENSE_PROFILE_TRACEMALLOC', '0') == '1',
+            keep=int(os.environ.get('REHABSENSE_PROFILE_KEEP', '50')),
+            interval=float(os.environ.get('REHABSENSE_PROFILE_INTERVAL', '0.001'))
+        )
+
+    def maybe_start(self, route, flag=None, mode=None, trace_memory=None):
+        """Start a capture if the request is whitelisted and flagged or sampled"""
+        if route not in self.routes:
+            return None
+        flagged = (self.token is not None and flag is not None
+                   and hmac.compare_digest(str(flag).encode('utf-8'), self.token.encode('utf-8')))
+        if not flagged and not (self.sample_rate and random.random() < self.sample_rate):
+            return None
+        if not flagged:
+            mode, trace_memory = None, None
+        session = ProfileSession(
+            self,
+            mode if mode in MODES else self.mode,
+            self.trace_memory if trace_memory is None else trace_memory
+        )
+        return session.start()
+
+    def write_capture(self, route, path, status, mode, duration,
+                      collapsed, cprofile=None, allocations=None):
+        """Write capture files and rotate old captures"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        capture_id = f"{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        base = os.path.join(self.output_dir, capture_id)
+
+        files = [capture_id + '.collapsed']
+        with open(base + '.collapsed', 'w') as f:
+            for stack, weight in collapsed.most_common():
+                f.write(f"{stack} {weight}\n")
+        if cprofile is not None:
+            cprofile.dump_stats(base + '.prof')
+            files.append(capture_id + '.prof')
+        if allocations is not None:
+            with open(base + '.alloc.txt', 'w') as f:
+                for stat in allocations:
+                    f.write(f"{stat}\n")
+            files.append(capture_id + '.alloc.txt')
+
+        meta = {
+            'id': capture_id,
+            'route': route,
+            'path': path,
+            'status': status,
+            'mode': mode,
+            'duration_ms': round(duration * 1000, 3),
+            'created': time.time(),
+            'files': files
+        }
+        with open(base + '.json', 'w') as f:
+            json.dump(meta, f)
+
+        self._rotate()
+        return meta
+
+    def _rotate(self):
+        """Delete the oldest captures beyond the retention limit"""
+        with self._lock:
+            captures = sorted(
+                (name[:-5] for name in os.listdir(self.output_dir) if name.endswith('.json')),
+                reverse=True
+            )
+            for capture_id in captures[self.keep:]:
+                for suffix in ('.json', '.collapsed', '.prof', '.alloc.txt'):
+                    try:
+                        os.remove(os.path.join(self.output_dir, capture_id + suffix))
+                    except FileNotFoundError:
+                        pass
+
+    def list_captures(self, limit=50):
+        """Metadata for the most recent captures, newest first"""
+        if not os.path.isdir(self.output_dir):
+            return []
+        captures = []
+        names = sorted((n for n in os.listdir(self.output_dir) if n.endswith('.json')), reverse=True)
+        for name in names[:limit]:
+            try:
+                with open(os.path.join(self.output_dir, name), 'r') as f:
+                    captures.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return captures
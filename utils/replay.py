@@ -0,0 +1,237 @@
+"""
+Traffic Replay Module
+Re-drives a traffic capture against a running instance and diffs its
+predictions against the ones served when the traffic was captured
+
+Each pseudonymized patient is mapped to a local patient by a hash of the
+pseudonym and captured report ids to that patient's reports the same way,
+so repeated accesses in the capture stay repeated in the replay. Requests
+are sent at their captured offsets divided by --speed.
+
+Usage:
+    python -m utils.replay captures/ --url http://localhost:8000
+    python -m utils.replay captures/capture-*.ndjson.gz --speed 10 --output replay.json
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.load_test import PROJECT_ROOT, PatientSession, Recorder, load_fleet
+from utils.traffic_capture import CAPTURE_PREFIX, CAPTURE_SUFFIX, read_capture
+
+# Confidence changes below this are not reported as differences
+CONFIDENCE_TOLERANCE = 1e-6
+
+
+def capture_paths(targets):
+    """Expand capture directories and files into a list of capture files"""
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(glob.glob(os.path.join(target, f'{CAPTURE_PREFIX}*{CAPTURE_SUFFIX}')))
+        else:
+            paths.extend(glob.glob(target))
+    return paths
+
+
+def pick(key, choices):
+    """Deterministically map a key onto one of choices"""
+    digest = hashlib.sha256(key.encode('utf-8')).digest()
+    return choices[int.from_bytes(digest[:8], 'big') % len(choices)]
+
+
+class PredictionDiff:
+    """Compares replayed predictions with the captured ones per modality"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.compared = 0
+        self.versions = set()
+        self.modalities = {}
+
+    def compare(self, record, body):
+        captured = record.get('predictions')
+        replayed = (body or {}).get('predictions') if isinstance(body, dict) else None
+        if not captured or replayed is None:
+            return
+        with self._lock:
+            self.compared += 1
+            self.versions.add(record.get('version'))
+            for name, before in captured.items():
+                after = replayed.get(name) or {}
+                entry = self.modalities.setdefault(name, {
+                    'compared': 0, 'label_changes': 0, 'transitions': {},
+                    'confidence_changes': 0, 'max_confidence_delta': 0.0
+                })
+                entry['compared'] += 1
+                if before.get('prediction') != after.get('prediction'):
+                    entry['label_changes'] += 1
+                    transition = f"{before.get('prediction')}->{after.get('prediction')}"
+                    entry['transitions'][transition] = entry['transitions'].get(transition, 0) + 1
+                if before.get('confidence') is not None and after.get('confidence') is not None:
+                    delta = abs(after['confidence'] - before['confidence'])
+                    if delta > CONFIDENCE_TOLERANCE:
+                        entry['confidence_changes'] += 1
+                    entry['max_confidence_delta'] = max(entry['max_confidence_delta'], round(delta, 6))
+
+    def summary(self):
+        with self._lock:
+            modalities = {}
+            for name, entry in sorted(self.modalities.items()):
+                modalities[name] = dict(
+                    entry,
+                    label_change_rate=round(entry['label_changes'] / entry['compared'], 4)
+                )
+            return {
+                'compared': self.compared,
+                'captured_versions': sorted(version for version in self.versions if version),
+                'modalities': modalities
+            }
+
+
+class Replay:
+    """Schedules captured requests on their original timeline"""
+
+    def __init__(self, records, patients, base_url, speed=1.0, concurrency=64, timeout=30.0):
+        self.records = sorted(records, key=lambda record: record['ts'])
+        self.patients = sorted(patients, key=lambda patient: patient['patient_id'])
+        self.base_url = base_url
+        self.speed = speed
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.recorder = Recorder()
+        self.diff = PredictionDiff()
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+
+    def session_for(self, pseudonym):
+        """The logged-in local session standing in for a captured patient"""
+        with self._sessions_lock:
+            session = self._sessions.get(pseudonym)
+            if session is None:
+                session = PatientSession(self.base_url, pick(pseudonym, self.patients), self.timeout)
+                session.login()
+                self._sessions[pseudonym] = session
+        return session
+
+    def request_for(self, record, session):
+        """(method, path, payload) replaying one record on a local session"""
+        if record['route'] == '/report/<report_id>':
+            report_id = record['path'].rsplit('/', 1)[-1]
+            return 'GET', f"/report/{pick(report_id, session.reports)['report_id']}", None
+        if record['route'] == '/login':
+            return 'POST', '/login', {'patient_id': session.patient_id}
+        if record['route'] == '/api/predict':
+            return 'POST', '/api/predict', {'report_data': record.get('payload')}
+        return record['method'], record['path'], None
+
+    def execute(self, record, scheduled):
+        try:
+            session = self.session_for(record['patient'])
+            method, path, payload = self.request_for(record, session)
+            status, body = session.send(method, path, payload)
+            ok = status < 400 and (not isinstance(body, dict) or body.get('success', True) is not False)
+            if record['route'] == '/api/predict':
+                self.diff.compare(record, body)
+        except Exception:
+            ok = False
+        self.recorder.record(record['route'], time.perf_counter() - scheduled, ok)
+
+    def run(self):
+        if not self.records:
+            return self.report(0.0)
+        first = self.records[0]['ts']
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='replay') as executor:
+            for record in self.records:
+                if not self.speed:
+                    executor.submit(self.execute, record, time.perf_counter())
+                    continue
+                scheduled = start + (record['ts'] - first) / self.speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.execute, record, scheduled)
+        return self.report(time.perf_counter() - start)
+
+    def report(self, elapsed):
+        self.recorder.roll()
+        captured_span = self.records[-1]['ts'] - self.records[0]['ts'] if self.records else 0.0
+        return {
+            'records': len(self.records),
+            'patients': len({record['patient'] for record in self.records}),
+            'captured_seconds': round(captured_span, 1),
+            'replay_seconds': round(elapsed, 1),
+            'speed': self.speed,
+            'totals': self.recorder.totals(elapsed),
+            'prediction_diff': self.diff.summary()
+        }
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Replay captured RehabSense traffic')
+    parser.add_argument('captures', nargs='+', help='Capture files or directories')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--patients-dir', default=os.path.join(PROJECT_ROOT, 'data', 'patients'),
+                        help='Local patients standing in for the pseudonymized ones')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Replay rate relative to the capture (0 sends as fast as possible)')
+    parser.add_argument('--routes', nargs='+', default=None, help='Only replay these route rules')
+    parser.add_argument('--limit', type=int, default=None, help='Replay at most this many records')
+    parser.add_argument('--concurrency', type=int, default=64, help='Maximum in-flight requests')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--output', default=None, help='Write the full report as JSON')
+    args = parser.parse_args()
+
+    paths = capture_paths(args.captures)
+    records = [record for record in read_capture(paths)
+               if args.routes is None or record['route'] in args.routes]
+    records.sort(key=lambda record: record['ts'])
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print(f"❌ No captured requests in {', '.join(args.captures)}")
+        sys.exit(1)
+
+    patients = load_fleet(args.patients_dir)
+    if not patients:
+        print(f"❌ No patients found in {args.patients_dir}")
+        sys.exit(1)
+    print(f"Replaying {len(records)} requests from {len(paths)} files "
+          f"onto {len(patients)} local patients at {args.speed}x...")
+
+    result = Replay(records, patients, args.url, args.speed, args.concurrency, args.timeout).run()
+
+    totals = result['totals']['overall']
+    print(f"\nTotal: {totals['count']} requests in {result['replay_seconds']}s "
+          f"(captured over {result['captured_seconds']}s), {totals['throughput']}/s, "
+          f"errors {totals['error_rate'] * 100:.2f}%, p50 {totals['p50']} ms, p99 {totals['p99']} ms")
+    for route, stats in result['totals']['routes'].items():
+        print(f"  {route:<24} n={stats['count']:<6} p50 {stats['p50']:>8} ms  p99 {stats['p99']:>8} ms")
+
+    diff = result['prediction_diff']
+    if diff['compared']:
+        print(f"\nPredictions compared: {diff['compared']} "
+              f"(captured on {', '.join(diff['captured_versions']) or 'unknown'})")
+        for name, entry in diff['modalities'].items():
+            print(f"  {name:<10} label changes {entry['label_changes']:>5} "
+                  f"({entry['label_change_rate'] * 100:.2f}%)  "
+                  f"max confidence delta {entry['max_confidence_delta']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""
+Cohort Scoring CLI
+Scores every report of every patient in data/patients/ across a process pool
+
+Usage:
+    python -m utils.score_cohort --output cohort_scores.ndjson
+    python -m utils.score_cohort --format npz --output cohort_scores/ --resume
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.inference import ModelInference, MODEL_FEATURES
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Per-process engine, loaded once by the pool initializer
+_worker_engine = None
+
+
+def list_patient_files(patients_dir):
+    """Sorted patient JSON paths, so chunk numbering is stable across runs"""
+    with os.scandir(patients_dir) as entries:
+        return sorted(
+            entry.path for entry in entries
+            if entry.name.startswith('patient_') and entry.name.endswith('.json')
+        )
+
+
+def _init_worker(models_dir):
+    """Load the models once per worker process"""
+    global _worker_engine
+    _worker_engine = ModelInference(models_dir)
+
+
+def _load_chunk(paths):
+    """Load a chunk of patients and flatten their reports"""
+    owners = []
+    reports = []
+    for path in paths:
+        with open(path, 'r') as f:
+            patient = json.load(f)
+        for report in patient['reports']:
+            owners.append(patient['patient_id'])
+            reports.append(report)
+    return owners, reports
+
+
+def score_chunk_ndjson(paths):
+    """Score a chunk and return it serialized as NDJSON lines"""
+    owners, reports = _load_chunk(paths)
+    predictions = _worker_engine.predict_batch(reports)
+    lines = []
+    for patient_id, report, result in zip(owners, reports, predictions):
+        lines.append(json.dumps({
+            'patient_id': patient_id,
+            'report_id': report['report_id'],
+            'date': report['date'],
+            'predictions': result
+        }))
+    payload = "\n".join(lines) + "\n" if lines else ""
+    return payload.encode('utf-8'), len(paths), len(reports)
+
+
+def score_chunk_columns(paths):
+    """Score a chunk and return it as column arrays"""
+    owners, reports = _load_chunk(paths)
+    predictions = _worker_engine.predict_batch(reports)
+    n = len(reports)
+    columns = {
+        'patient_id': np.array(owners, dtype=str),
+        'report_id': np.array([r['report_id'] for r in reports], dtype=str),
+        'date': np.array([r['date'] for r in reports], dtype='datetime64[D]')
+    }
+    for name in MODEL_FEATURES:
+        prediction = np.full(n, -1, dtype=np.int8)
+        confidence = np.full(n, np.nan)
+        for i, result in enumerate(predictions):
+            if name in result:
+                prediction[i] = result[name]['prediction']
+                confidence[i] = result[name]['confidence']
+        columns[f'{name}.prediction'] = prediction
+        columns[f'{name}.confidence'] = confidence
+    columns['heartbeat.heart_rate'] = np.array(
+        [p['heartbeat']['heart_rate'] if 'heartbeat' in p else np.nan for p in predictions]
+    )
+    columns['posture.score'] = np.array(
+        [p['posture']['score'] if 'posture' in p else np.nan for p in predictions]
+    )
+    return columns, len(paths), n
+
+
+class Checkpoint:
+    """Tracks completed chunks so an interrupted run can resume"""
+
+    def __init__(self, path, total_patients, chunk_size, output_format):
+        self.path = path
+        self.state = {
+            'total_patients': total_patients,
+            'chunk_size': chunk_size,
+            'format': output_format,
+            'completed': [],
+            'bytes_written': 0,
+            'reports': 0
+        }
+
+    def load(self):
+        """Load a previous checkpoint, refusing one from a different run shape"""
+        with open(self.path, 'r') as f:
+            previous = json.load(f)
+        for key in ('total_patients', 'chunk_size', 'format'):
+            if previous.get(key) != self.state[key]:
+                raise ValueError(
+                    f"Checkpoint {self.path} was written with {key}={previous.get(key)!r}, "
+                    f"current run has {self.state[key]!r}"
+                )
+        self.state = previous
+
+    @property
+    def completed(self):
+        return set(self.state['completed'])
+
+    def mark(self, chunk_index, reports, bytes_written=None):
+        """Record a chunk as durably written"""
+        self.state['completed'].append(chunk_index)
+        self.state['reports'] += reports
+        if bytes_written is not None:
+            self.state['bytes_written'] = bytes_written
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+class ProgressReporter:
+    """Periodic progress and throughput lines on stderr"""
+
+    def __init__(self, total_chunks, done_chunks, interval=5.0):
+        self.total_chunks = total_chunks
+        self.done_chunks = done_chunks
+        self.patients = 0
+        self.reports = 0
+        self.interval = interval
+        self.start = time.perf_counter()
+        self._last = 0.0
+
+    def update(self, patients, reports):
+        """Count a finished chunk, printing at most once per interval"""
+        self.done_chunks += 1
+        self.patients += patients
+        self.reports += reports
+        if time.perf_counter() - self._last >= self.interval:
+            self.report()
+
+    def report(self):
+        """Print a progress line"""
+        now = self._last = time.perf_counter()
+        elapsed = now - self.start
+        rate = self.reports / elapsed if elapsed else 0.0
+        remaining = self.total_chunks - self.done_chunks
+        chunk_rate = self.done_chunks / elapsed if elapsed else 0.0
+        eta = remaining / chunk_rate if chunk_rate else 0.0
+        print(f"  chunks {self.done_chunks}/{self.total_chunks} | "
+              f"{self.patients} patients, {self.reports} reports | "
+              f"{rate:,.0f} reports/s | ETA {eta:,.0f}s",
+              file=sys.stderr, flush=True)
+
+
+def checkpoint_output_lost(checkpoint, output, output_format):
+    """Why the output a checkpoint vouches for is gone, or None if it is intact"""
+    if output_format == 'ndjson':
+        if not checkpoint.completed:
+            return None
+        if not os.path.exists(output):
+            return f"{output} no longer exists"
+        if os.path.getsize(output) < checkpoint.state['bytes_written']:
+            return f"{output} is shorter than the checkpointed {checkpoint.state['bytes_written']} bytes"
+        return None
+    missing = [i for i in sorted(checkpoint.completed)
+               if not os.path.exists(os.path.join(output, f'part-{i:06d}.npz'))]
+    if missing:
+        return f"{len(missing)} checkpointed shards are missing from {output}"
+    return None
+
+
+def score_cohort(patients_dir, models_dir, output, output_format='ndjson',
+                 workers=None, chunk_size=256, checkpoint_path=None, resume=False):
+    """Score all patients, streaming results to output"""
+    paths = list_patient_files(patients_dir)
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+    if checkpoint_path is None:
+        checkpoint_path = output.rstrip(os.sep) + '.checkpoint.json'
+    checkpoint = Checkpoint(checkpoint_path, len(paths), chunk_size, output_format)
+    if resume and os.path.exists(checkpoint_path):
+        checkpoint.load()
+        lost = checkpoint_output_lost(checkpoint, output, output_format)
+        if lost:
+            print(f"⚠️  Ignoring checkpoint {checkpoint_path}: {lost}; starting from scratch",
+                  file=sys.stderr, flush=True)
+            checkpoint = Checkpoint(checkpoint_path, len(paths), chunk_size, output_format)
+    completed = checkpoint.completed
+
+    if output_format == 'ndjson':
+        sink = open(output, 'r+b' if resume and completed else 'wb')
+        # Drop anything written after the last checkpointed chunk
+        sink.truncate(checkpoint.state['bytes_written'])
+        sink.seek(checkpoint.state['bytes_written'])
+        task = score_chunk_ndjson
+    else:
+        os.makedirs(output, exist_ok=True)
+        sink = None
+        task = score_chunk_columns
+
+    pending_chunks = [i for i in range(len(chunks)) if i not in completed]
+    workers = workers or os.cpu_count() or 1
+    progress = ProgressReporter(len(chunks), len(completed))
+    print(f"Scoring {len(paths)} patients in {len(chunks)} chunks "
+          f"({len(pending_chunks)} remaining) with {workers} workers...",
+          file=sys.stderr, flush=True)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(models_dir,)) as executor:
+            in_flight = {}
+            queue = iter(pending_chunks)
+            while True:
+                # Keep a bounded number of chunks in flight
+                while len(in_flight) < workers * 2:
+                    chunk_index = next(queue, None)
+                    if chunk_index is None:
+                        break
+                    in_flight[executor.submit(task, chunks[chunk_index])] = chunk_index
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_index = in_flight.pop(future)
+                    result, n_patients, n_reports = future.result()
+                    if sink is not None:
+                        sink.write(result)
+                        sink.flush()
+                        os.fsync(sink.fileno())
+                        checkpoint.mark(chunk_index, n_reports, sink.tell())
+                    else:
+                        shard = os.path.join(output, f'part-{chunk_index:06d}.npz')
+                        tmp_shard = shard + '.tmp.npz'
+                        np.savez(tmp_shard, **result)
+                        os.replace(tmp_shard, shard)
+                        checkpoint.mark(chunk_index, n_reports)
+                    progress.update(n_patients, n_reports)
+    finally:
+        if sink is not None:
+            sink.close()
+
+    progress.report()
+    return checkpoint.state
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Score every patient report in bulk')
+    parser.add_argument('--patients-dir', default=os.path.join(PROJECT_ROOT, 'data', 'patients'))
+    parser.add_argument('--models-dir', default=os.path.join(PROJECT_ROOT, 'models'))
+    parser.add_argument('--output', default='cohort_scores.ndjson',
+                        help='NDJSON file, or directory of .npz shards with --format npz')
+    parser.add_argument('--format', choices=['ndjson', 'npz'], default='ndjson')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=256, help='Patients per chunk')
+    parser.add_argument('--checkpoint', default=None)
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip chunks recorded in the checkpoint')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    state = score_cohort(
+        args.patients_dir, args.models_dir, args.output, args.format,
+        args.workers, args.chunk_size, args.checkpoint, args.resume
+    )
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Scored {state['reports']} reports in {elapsed:.1f}s -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+Similarity Module
+Trajectory embeddings of each patient's early rehabilitation and an exact
+k-nearest-neighbour search over them
+
+A patient's first HORIZON_WEEKS of reports are summarized into fixed time
+bins: heart rate and posture score are averaged per bin and resampled
+across empty bins, and emotion and breathing labels are counted as
+frequencies. Accumulators and embeddings live in contiguous arrays grown
+by doubling, so reports fold in one at a time in O(1) and a query is a
+few blocked matrix-vector products over a float32 matrix.
+
+The horizon starts at the patient's earliest report, whatever order
+reports arrive in: the reports inside it are kept, so one dated before
+the current start moves the horizon and the patient's row is refolded.
+"""
+
+import threading
+from datetime import date as Date
+
+import numpy as np
+
+HORIZON_WEEKS = 4
+TIME_BINS = 8
+
+# Centre and spread used to put each signal on a comparable scale
+HEART_RATE_SCALE = (75.0, 15.0)
+POSTURE_SCORE_SCALE = (70.0, 20.0)
+
+EMOTION_STATES = 4
+BREATHING_STATES = 4
+
+# Relative weight of the label frequencies against the resampled curves
+LABEL_WEIGHT = 2.0
+
+DIMENSIONS = 2 * TIME_BINS + EMOTION_STATES + BREATHING_STATES
+
+# Rows compared per matrix-vector product, bounding query temporaries
+QUERY_BLOCK_ROWS = 16384
+
+
+def _day(value):
+    return Date.fromisoformat(str(value)[:10]).toordinal()
+
+
+def _rounded(values, digits):
+    return [None if value != value else round(value, digits) for value in values.tolist()]
+
+
+def resample(sums, counts, fill):
+    """Per-bin means with empty bins interpolated from their neighbours"""
+    observed = counts > 0
+    if not observed.any():
+        return np.full(len(sums), fill)
+    positions = np.arange(len(sums))
+    return np.interp(positions, positions[observed], sums[observed] / counts[observed])
+
+
+class SimilarityIndex:
+    """Incrementally built trajectory embeddings with exact k-NN queries"""
+
+    def __init__(self, horizon_weeks=HORIZON_WEEKS, capacity=1024):
+        self.horizon_days = horizon_weeks * 7
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._ids = []
+        self._last = []
+        self._points = []
+        self._allocate(capacity)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _allocate(self, capacity):
+        """Grow every per-patient array to capacity rows, keeping existing rows"""
+        previous = getattr(self, '_embeddings', None)
+        n = len(self._ids)
+        arrays = {
+            '_embeddings': np.zeros((capacity, DIMENSIONS), dtype=np.float32),
+            '_norms': np.zeros(capacity, dtype=np.float32),
+            '_start_day': np.zeros(capacity, dtype=np.int64),
+            '_sums': np.zeros((capacity, 2, TIME_BINS)),
+            '_counts': np.zeros((capacity, 2, TIME_BINS)),
+            '_labels': np.zeros((capacity, EMOTION_STATES + BREATHING_STATES)),
+            '_latest': np.full((capacity, 5), np.nan)
+        }
+        for name, array in arrays.items():
+            if previous is not None:
+                array[:n] = getattr(self, name)[:n]
+            setattr(self, name, array)
+
+    def observe(self, patient_id, report_id, date, predictions):
+        """Fold a scored report into the patient's trajectory; reports already seen are ignored"""
+        day = _day(date)
+        heartbeat = predictions.get('heartbeat')
+        posture = predictions.get('posture')
+        emotion = predictions.get('emotion')
+        breathing = predictions.get('breathing')
+        # (day, heart rate, posture score, emotion, breathing), NaN when missing
+        point = (
+            day,
+            heartbeat['heart_rate'] if heartbeat else np.nan,
+            posture['score'] if posture else np.nan,
+            emotion['prediction'] if emotion else np.nan,
+            breathing['prediction'] if breathing else np.nan
+        )
+
+        with self._lock:
+            row = self._rows.get(patient_id)
+            if row is None:
+                if len(self._ids) == len(self._embeddings):
+                    self._allocate(2 * len(self._embeddings))
+                row = self._rows[patient_id] = len(self._ids)
+                self._ids.append(patient_id)
+                self._last.append(None)
+                self._points.append({})
+                self._start_day[row] = day
+
+            # Latest heart rate, posture score, emotion and breathing
+            latest = self._latest[row]
+            if self._last[row] is None or (date, report_id) > self._last[row]:
+                self._last[row] = (date, report_id)
+                for i, value in enumerate(point[1:], start=1):
+                    if value == value:
+                        latest[i] = value
+
+            points = self._points[row]
+            if report_id in points:
+                return
+            if day < self._start_day[row]:
+                # An earlier report moves the horizon; refold what still falls inside it
+                self._start_day[row] = day
+                self._points[row] = points = {
+                    kept_id: kept for kept_id, kept in points.items()
+                    if kept[0] - day < self.horizon_days
+                }
+                self._sums[row] = 0
+                self._counts[row] = 0
+                self._labels[row] = 0
+                for kept in points.values():
+                    self._fold(row, kept)
+            latest[0] = (_day(self._last[row][0]) - self._start_day[row]) / 7
+
+            if day - self._start_day[row] >= self.horizon_days:
+                return
+            points[report_id] = point
+            self._fold(row, point)
+            self._embed(row)
+
+    def _fold(self, row, point):
+        """Add one report inside the horizon to the accumulators (caller holds the lock)"""
+        day, heart_rate, posture_score, emotion, breathing = point
+        time_bin = (day - self._start_day[row]) * TIME_BINS // self.horizon_days
+        if heart_rate == heart_rate:
+            self._sums[row, 0, time_bin] += heart_rate
+            self._counts[row, 0, time_bin] += 1
+        if posture_score == posture_score:
+            self._sums[row, 1, time_bin] += posture_score
+            self._counts[row, 1, time_bin] += 1
+        if 0 <= emotion < EMOTION_STATES:
+            self._labels[row, int(emotion)] += 1
+        if 0 <= breathing < BREATHING_STATES:
+            self._labels[row, EMOTION_STATES + int(breathing)] += 1
+
+    def _embed(self, row):
+        """Recompute one patient's embedding from its accumulators (caller holds the lock)"""
+        sums, counts, labels = self._sums[row], self._counts[row], self._labels[row]
+        heart_rate = resample(sums[0], counts[0], HEART_RATE_SCALE[0])
+        posture = resample(sums[1], counts[1], POSTURE_SCORE_SCALE[0])
+        emotion = labels[:EMOTION_STATES]
+        breathing = labels[EMOTION_STATES:]
+        vector = np.concatenate([
+            (heart_rate - HEART_RATE_SCALE[0]) / HEART_RATE_SCALE[1],
+            (posture - POSTURE_SCORE_SCALE[0]) / POSTURE_SCORE_SCALE[1],
+            LABEL_WEIGHT * emotion / max(emotion.sum(), 1),
+            LABEL_WEIGHT * breathing / max(breathing.sum(), 1)
+        ])
+        self._embeddings[row] = vector
+        self._norms[row] = vector @ vector
+
+    def trajectory(self, patient_id):
+        """The patient's resampled curves and label frequencies, or None"""
+        with self._lock:
+            row = self._rows.get(patient_id)
+            if row is None:
+                return None
+            sums, counts = self._sums[row].copy(), self._counts[row].copy()
+            emotion = self._labels[row, :EMOTION_STATES].copy()
+            breathing = self._labels[row, EMOTION_STATES:].copy()
+        return {
+            'heart_rate': _rounded(resample(sums[0], counts[0], np.nan), 2),
+            'posture_score': _rounded(resample(sums[1], counts[1], np.nan), 2),
+            'emotion_frequencies': _rounded(emotion / max(emotion.sum(), 1), 3),
+            'breathing_frequencies': _rounded(breathing / max(breathing.sum(), 1), 3)
+        }
+
+    def _outcome(self, row):
+        """Latest known state of a patient, for judging how they recovered"""
+        weeks, heart_rate, posture_score, emotion, breathing = self._latest[row].tolist()
+        return {
+            'weeks_tracked': round(weeks, 1),
+            'heart_rate': None if heart_rate != heart_rate else round(heart_rate, 1),
+            'posture_score': None if posture_score != posture_score else round(posture_score, 1),
+            'emotion': None if emotion != emotion else int(emotion),
+            'breathing': None if breathing != breathing else int(breathing)
+        }
+
+    def similar(self, patient_id, k=10):
+        """Nearest patients to this one's trajectory, nearest first, or None if unknown"""
+        with self._lock:
+            row = self._rows.get(patient_id)
+            if row is None:
+                return None
+            n = len(self._ids)
+            embeddings, norms = self._embeddings, self._norms
+            query = embeddings[row].copy()
+        k = max(0, min(k, n - 1))
+        if not k:
+            return []
+
+        # ||q - x||^2 = ||x||^2 - 2 q.x + ||q||^2, keeping the k best per block
+        best_rows = np.empty(0, dtype=np.int64)
+        best_distances = np.empty(0, dtype=np.float32)
+        for start in range(0, n, QUERY_BLOCK_ROWS):
+            stop = min(start + QUERY_BLOCK_ROWS, n)
+            distances = norms[start:stop] - 2 * (embeddings[start:stop] @ query)
+            if start <= row < stop:
+                distances[row - start] = np.inf
+            take = min(k, stop - start)
+            candidates = np.argpartition(distances, take - 1)[:take]
+            best_rows = np.concatenate([best_rows, candidates + start])
+            best_distances = np.concatenate([best_distances, distances[candidates]])
+        order = np.argsort(best_distances, kind='stable')[:k]
+
+        query_norm = float(query @ query)
+        with self._lock:
+            return [
+                {
+                    'patient_id': self._ids[candidate],
+                    'distance': round(float(np.sqrt(max(distance + query_norm, 0.0))), 4),
+                    'outcome': self._outcome(candidate)
+                }
+                for candidate, distance in zip(best_rows[order].tolist(), best_distances[order].tolist())
+            ]
@@ -0,0 +1,64 @@
+"""
+Single-Flight Module
+Coalesces concurrent identical computations into one
+
+The first caller for a key runs the computation; callers arriving while
+it is in flight wait for and share its result (or its exception). The
+lock is never held while computing, and a thread that re-enters its own
+key runs the function directly instead of waiting on itself.
+"""
+
+import threading
+
+from utils.metrics import registry as metrics
+
+
+class _Call:
+    __slots__ = ('owner', 'done', 'result', 'error')
+
+    def __init__(self):
+        self.owner = threading.get_ident()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicates in-flight calls per key"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        metrics.describe('rehabsense_single_flight_shared_total',
+                         'Callers served by a computation already in flight')
+        metrics.register_gauge(f'rehabsense_{name}_in_flight', lambda: len(self._calls),
+                               f'Distinct {name} computations in flight')
+
+    def do(self, key, func):
+        """Return func(), sharing one execution among concurrent callers of key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.owner == threading.get_ident():
+                return func()
+            metrics.inc('rehabsense_single_flight_shared_total', (('flight', self.name),))
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
@@ -0,0 +1,178 @@
+"""
+Traffic Capture Module
+Opt-in recording of sampled production requests as rotating gzipped NDJSON
+
+Sampling is per patient (a keyed hash of the id), so a sampled patient's
+whole session is kept and the capture preserves real access skew. Patient
+ids, and the patient prefix of report ids, are replaced with keyed
+pseudonyms before anything is written. /api/predict records keep the
+device payload and the predictions served, so utils/replay.py can re-drive
+them and diff another model version against what production returned.
+"""
+
+import atexit
+import gzip
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import secrets
+import threading
+import time
+
+from utils.metrics import registry as metrics
+
+CAPTURE_PREFIX = 'capture-'
+CAPTURE_SUFFIX = '.ndjson.gz'
+
+# Seconds between background flushes, so readers see recent records before rotation
+FLUSH_INTERVAL = 1.0
+
+
+class TrafficCapture:
+    """Samples requests into rotating compressed NDJSON files"""
+
+    def __init__(self, directory, sample_rate=0.1, rotate_bytes=64 * 1024 * 1024, keep=20,
+                 key=None):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.rotate_bytes = rotate_bytes
+        self.keep = keep
+        # Without a configured key, pseudonyms are stable only for this process
+        self._key = (key or secrets.token_hex(16)).encode('utf-8')
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._written = 0
+        self._pid = None
+        self._dirty = False
+        self._flusher_pid = None
+        self._seq = itertools.count()
+        os.makedirs(directory, exist_ok=True)
+        metrics.describe('rehabsense_capture_records_total', 'Requests written to the traffic capture')
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls):
+        """Build from REHABSENSE_CAPTURE_* settings; None unless a directory is set"""
+        directory = os.environ.get('REHABSENSE_CAPTURE_DIR')
+        if not directory:
+            return None
+        return cls(
+            directory,
+            sample_rate=float(os.environ.get('REHABSENSE_CAPTURE_SAMPLE_RATE', '0.1')),
+            rotate_bytes=int(os.environ.get('REHABSENSE_CAPTURE_ROTATE_BYTES', 64 * 1024 * 1024)),
+            keep=int(os.environ.get('REHABSENSE_CAPTURE_KEEP', '20')),
+            key=os.environ.get('REHABSENSE_CAPTURE_KEY') or None
+        )
+
+    def _digest(self, patient_id):
+        return hmac.new(self._key, patient_id.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def pseudonym(self, patient_id):
+        return 'P' + self._digest(patient_id)[:12]
+
+    def pseudonymize_report_id(self, patient_id, report_id):
+        """Swap the patient prefix of a report id ("A_R001" -> "P1f3e..._R001")"""
+        if report_id.startswith(f"{patient_id}_"):
+            return self.pseudonym(patient_id) + report_id[len(patient_id):]
+        return 'R' + self._digest(f"{patient_id}/{report_id}")[:12]
+
+    def sampled(self, patient_id):
+        """Whether this patient's requests are captured"""
+        return int(self._digest(patient_id)[:8], 16) < self.sample_rate * 0x100000000
+
+    def record(self, patient_id, method, route, path, status, duration, version,
+               payload=None, predictions=None):
+        """Append one request, pseudonymized"""
+        entry = {
+            'ts': round(time.time(), 3),
+            'patient': self.pseudonym(patient_id),
+            'method': method,
+            'route': route,
+            'path': path,
+            'status': status,
+            'duration_ms': round(duration * 1000, 2),
+            'version': version
+        }
+        if payload is not None:
+            payload = dict(payload)
+            if isinstance(payload.get('report_id'), str):
+                payload['report_id'] = self.pseudonymize_report_id(patient_id, payload['report_id'])
+            entry['payload'] = payload
+        if predictions is not None:
+            entry['predictions'] = predictions
+        line = (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8')
+
+        with self._lock:
+            if self._file is None or self._pid != os.getpid() or self._written >= self.rotate_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._written += len(line)
+            self._dirty = True
+        metrics.inc('rehabsense_capture_records_total', (('route', route),))
+
+    def _rotate(self):
+        """Close the current file and start a new one (caller holds the lock)"""
+        # A pre-forked worker must not write into the parent's stream
+        if self._file is not None and self._pid == os.getpid():
+            self._file.close()
+        self._pid = os.getpid()
+        stamp = time.strftime('%Y%m%dT%H%M%S')
+        name = f"{CAPTURE_PREFIX}{stamp}-{self._pid}-{next(self._seq)}{CAPTURE_SUFFIX}"
+        self._path = os.path.join(self.directory, name)
+        self._file = gzip.open(self._path, 'ab', compresslevel=6)
+        self._written = 0
+        self._prune()
+        # Threads do not survive fork, so each process starts its own flusher
+        if self._flusher_pid != self._pid:
+            self._flusher_pid = self._pid
+            threading.Thread(target=self._flush_loop, daemon=True, name='capture-flush').start()
+
+    def _flush_loop(self):
+        """Flush written records every FLUSH_INTERVAL, even when traffic stops"""
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            with self._lock:
+                if self._file is not None and self._pid == os.getpid() and self._dirty:
+                    self._file.flush()
+                    self._dirty = False
+
+    def _prune(self):
+        """Keep only the newest capture files"""
+        paths = sorted(
+            (os.path.join(self.directory, name) for name in os.listdir(self.directory)
+             if name.startswith(CAPTURE_PREFIX) and name.endswith(CAPTURE_SUFFIX)),
+            key=lambda path: os.path.getmtime(path)
+        )
+        for path in paths[:-self.keep] if self.keep else []:
+            if path != self._path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def close(self):
+        """Finish the current file so it decompresses cleanly"""
+        with self._lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._file.close()
+            self._file = None
+            self._dirty = False
+
+
+def read_capture(paths):
+    """Yield records from capture files, oldest file first
+
+    Files still being written (or left by a crashed worker) end without a
+    gzip trailer; their complete lines are still returned.
+    """
+    for path in sorted(paths, key=os.path.getmtime):
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if line.endswith('\n'):
+                        yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile):
+            continue
@@ -0,0 +1,160 @@
+"""
+Triage Module
+Incrementally maintained top-K queue of the highest-risk patients
+"""
+
+import heapq
+import itertools
+import json
+import os
+import threading
+
+from recommendations.engine import is_issue
+
+# Risk weight per abnormal label; anything not listed contributes nothing
+RISK_WEIGHTS = {
+    'heartbeat': {'Bradycardia': 2.5, 'Tachycardia': 2.5, 'Irregular': 3.0},
+    'breathing': {'Shallow Breathing': 2.0, 'Irregular': 2.5, 'Apnea Risk': 3.0},
+    'glucose': {'Low': 1.5, 'High': 1.5},
+    'speech': {'Slurred/Slow': 1.0, 'Stressed Speech': 0.5},
+    'emotion': {'Stressed': 0.5, 'Sad': 1.0},
+    'posture': {'Forward Head Posture': 0.5, 'Slouched Sitting': 0.5}
+}
+
+# Field holding the label in each modality's prediction dict
+LABEL_FIELDS = {
+    'heartbeat': 'status',
+    'glucose': 'range',
+    'breathing': 'status',
+    'speech': 'pattern',
+    'emotion': 'state',
+    'posture': 'posture'
+}
+
+# Modalities where a sustained abnormality raises the score further
+DURATION_MODALITIES = ('heartbeat', 'breathing')
+DURATION_WEIGHT = 0.75
+MAX_DURATION_REPORTS = 4
+
+
+def risk_score(predictions, streaks):
+    """Score one patient's latest predictions given their abnormal streaks"""
+    score = 0.0
+    for modality, prediction in predictions.items():
+        label = prediction.get(LABEL_FIELDS.get(modality))
+        weight = RISK_WEIGHTS.get(modality, {}).get(label, 0.0)
+        score += weight * prediction.get('confidence', 1.0)
+    for modality in DURATION_MODALITIES:
+        extra_reports = min(streaks.get(modality, 0), MAX_DURATION_REPORTS + 1) - 1
+        if extra_reports > 0:
+            score += DURATION_WEIGHT * extra_reports
+    return round(score, 4)
+
+
+class TriageIndex:
+    """Heap-backed top-K of patients by risk, updated one report at a time"""
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._seqs = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._top = []
+        self._top_ids = set()
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def observe(self, patient_id, report_id, date, predictions):
+        """Fold a newly scored report into the index; older reports are ignored"""
+        with self._lock:
+            previous = self._entries.get(patient_id)
+            if previous is not None and (date, report_id) <= (previous['date'], previous['report_id']):
+                return previous
+
+            streaks = {}
+            issues = []
+            for modality, prediction in predictions.items():
+                if is_issue(modality, prediction):
+                    issues.append(modality)
+                    prior = previous['streaks'].get(modality, 0) if previous else 0
+                    streaks[modality] = prior + 1
+
+            entry = {
+                'patient_id': patient_id,
+                'report_id': report_id,
+                'date': date,
+                'score': risk_score(predictions, streaks),
+                'issues': issues,
+                'streaks': streaks
+            }
+            seq = next(self._counter)
+            self._entries[patient_id] = entry
+            self._seqs[patient_id] = seq
+            heapq.heappush(self._heap, (-entry['score'], seq, patient_id))
+
+            # The cached top-K only changes if this patient was in it or now beats it
+            if (patient_id in self._top_ids or len(self._top) < self.capacity
+                    or entry['score'] > self._top[-1]['score']):
+                self._dirty = True
+
+            if len(self._heap) > 2 * len(self._entries) + self.capacity:
+                self._compact()
+            return entry
+
+    def top(self, k=None):
+        """Highest-risk patients, highest first"""
+        k = self.capacity if k is None else min(k, self.capacity)
+        with self._lock:
+            if self._dirty:
+                self._rebuild_top()
+            return self._top[:k]
+
+    def _rebuild_top(self):
+        """Pop valid heap entries until the top-K is filled, dropping stale ones"""
+        top = []
+        valid = []
+        while self._heap and len(top) < self.capacity:
+            item = heapq.heappop(self._heap)
+            if self._seqs.get(item[2]) != item[1]:
+                continue
+            valid.append(item)
+            top.append(self._entries[item[2]])
+        for item in valid:
+            heapq.heappush(self._heap, item)
+        self._top = top
+        self._top_ids = {entry['patient_id'] for entry in top}
+        self._dirty = False
+
+    def _compact(self):
+        """Drop superseded heap entries"""
+        self._heap = [(-entry['score'], self._seqs[patient_id], patient_id)
+                      for patient_id, entry in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    def build(self, patients_dir, engine, chunk_size=256, observe=None):
+        """Seed the index from every patient file, scoring in batches
+
+        observe defaults to self.observe; pass a wrapper to feed other
+        per-report consumers from the same scoring pass.
+        """
+        observe = observe or self.observe
+        names = sorted(
+            name for name in os.listdir(patients_dir)
+            if name.startswith('patient_') and name.endswith('.json')
+        )
+        for start in range(0, len(names), chunk_size):
+            owners = []
+            reports = []
+            for name in names[start:start + chunk_size]:
+                with open(os.path.join(patients_dir, name), 'r') as f:
+                    patient = json.load(f)
+                ordered = sorted(patient['reports'], key=lambda r: (r['date'], r['report_id']))
+                owners.extend([patient['patient_id']] * len(ordered))
+                reports.extend(ordered)
+            for patient_id, report, predictions in zip(owners, reports, engine.predict_batch(reports)):
+                observe(patient_id, report['report_id'], report['date'], predictions)
+        return self